@@ -5,6 +5,57 @@ from pydantic_settings import BaseSettings, SettingsConfigDict
 class Settings(BaseSettings):
     DATABASE_URL: str
 
+    # Group-commit ingestion queue in front of log_attendance
+    ATTENDANCE_QUEUE_ENABLED: bool = False
+    ATTENDANCE_QUEUE_MAX_BATCH: int = 200
+    ATTENDANCE_QUEUE_MAX_WAIT_MS: int = 5
+    ATTENDANCE_QUEUE_DURABLE: bool = True
+
+    # Logs per committed chunk on the streaming NDJSON bulk upload
+    ATTENDANCE_STREAM_CHUNK_SIZE: int = 1000
+
+    # Rows fetched per server-side cursor batch on the attendance export
+    ATTENDANCE_EXPORT_BATCH_SIZE: int = 2000
+
+    # In-process response cache for polled admin read endpoints
+    RESPONSE_CACHE_ENABLED: bool = True
+    RESPONSE_CACHE_MAX_ENTRIES: int = 512
+    RESPONSE_CACHE_TTL_SECONDS: float = 10
+
+    # Live attendance feed (Server-Sent Events)
+    LIVE_FEED_HEARTBEAT_SECONDS: int = 15
+    LIVE_FEED_CLIENT_BUFFER: int = 1000
+
+    # Longest a device may hold a sync trigger long-poll open
+    SYNC_TRIGGER_MAX_WAIT_SECONDS: int = 55
+
+    # Heartbeats are buffered in memory and flushed to device_status in one
+    # upsert per interval; keep the interval well under OFFLINE_THRESHOLD_SECONDS
+    HEARTBEAT_BUFFER_ENABLED: bool = True
+    HEARTBEAT_FLUSH_INTERVAL_SECONDS: float = 5
+
+    # In-process user roster for slot/user_id lookups; how often a worker
+    # checks roster_version for writes made by other workers
+    USER_ROSTER_ENABLED: bool = True
+    USER_ROSTER_VERSION_CHECK_SECONDS: float = 2
+
+    # Background purge of a deleted user's attendance (delete_user ?background=true):
+    # rows per DELETE batch and the pause between batches
+    ATTENDANCE_PURGE_BATCH_SIZE: int = 5000
+    ATTENDANCE_PURGE_PAUSE_SECONDS: float = 0.2
+
+    # Monthly attendance_records partitions: how many future months to keep
+    # created, and retention (0 keeps every month; mode "detach" or "drop")
+    ATTENDANCE_PARTITION_MONTHS_AHEAD: int = 3
+    ATTENDANCE_PARTITION_CHECK_HOURS: float = 6
+    ATTENDANCE_RETENTION_MONTHS: int = 0
+    ATTENDANCE_RETENTION_MODE: str = "detach"
+
+    # Months of attendance kept in the table before they move to the columnar
+    # archive under ATTENDANCE_ARCHIVE_DIR (0 never archives)
+    ATTENDANCE_ARCHIVE_AFTER_MONTHS: int = 0
+    ATTENDANCE_ARCHIVE_DIR: str = "archive/attendance"
+
     model_config = SettingsConfigDict(
         env_file=".env",
         env_file_encoding="utf-8",
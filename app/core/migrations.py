@@ -0,0 +1,655 @@
+from sqlalchemy import text
+from app.core.database import Base
+
+# Import models so every table is registered on Base.metadata
+from app.models import attendance, device, upload, user  # noqa: F401
+
+
+# ==================== SCHEMA MIGRATIONS ====================
+# create_all() only creates missing tables, it never alters existing ones.
+# Every statement below must be idempotent: it runs once against databases
+# that predate the change and once against freshly created tables.
+
+# attendance_events notifications: JSON arrays of events, cut at 7500 bytes
+# because a payload over 8000 fails pg_notify and with it the write that
+# fired the trigger. Names and device ids are capped so one event always fits.
+ATTENDANCE_NOTIFY_FUNCTION = """
+CREATE OR REPLACE FUNCTION attendance_notify()
+RETURNS trigger AS $$
+DECLARE
+    event TEXT;
+    payload TEXT := '';
+BEGIN
+    FOR event IN EXECUTE format($sql$
+        SELECT json_build_object(
+            'event', %L,
+            'user_id', n.user_id,
+            'name', left(n.name, 1000),
+            'date', n.date,
+            'checked_in_time', n.checked_in_time,
+            'checked_out_time', n.checked_out_time,
+            'device_id', left(n.device_id, 200)
+        )::text
+        FROM %s
+    $sql$,
+        CASE TG_OP WHEN 'INSERT' THEN 'checked_in' ELSE 'checked_out' END,
+        CASE TG_OP
+            WHEN 'INSERT' THEN 'new_rows n'
+            ELSE 'new_rows n JOIN old_rows o USING (id)
+                  WHERE n.checked_out_time IS DISTINCT FROM o.checked_out_time'
+        END
+    ) LOOP
+        IF payload <> '' AND octet_length(payload) + octet_length(event) + 3 > 7500 THEN
+            PERFORM pg_notify('attendance_events', '[' || payload || ']');
+            payload := '';
+        END IF;
+        payload := CASE WHEN payload = '' THEN event ELSE payload || ',' || event END;
+    END LOOP;
+
+    IF payload <> '' THEN
+        PERFORM pg_notify('attendance_events', '[' || payload || ']');
+    END IF;
+    RETURN NULL;
+END $$ LANGUAGE plpgsql
+"""
+
+# A slot repeated within one user's array is indexed once; only a slot
+# owned by another user fails the write on the primary key
+FINGERPRINT_SLOTS_SYNC_FUNCTION = """
+CREATE OR REPLACE FUNCTION fingerprint_slots_sync()
+RETURNS trigger AS $$
+BEGIN
+    IF TG_OP = 'DELETE' THEN
+        DELETE FROM fingerprint_slots WHERE user_id = OLD.user_id;
+        RETURN NULL;
+    END IF;
+
+    IF TG_OP = 'UPDATE' THEN
+        -- NEW.user_id too: ON UPDATE CASCADE may already have moved the rows
+        DELETE FROM fingerprint_slots WHERE user_id IN (OLD.user_id, NEW.user_id);
+    END IF;
+
+    INSERT INTO fingerprint_slots (slot_id, user_id)
+    SELECT DISTINCT slot, NEW.user_id FROM unnest(NEW.slot_id) AS slot;
+    RETURN NULL;
+END $$ LANGUAGE plpgsql
+"""
+
+MIGRATIONS = [
+    (
+        "0001_attendance_unique_user_date",
+        [
+            # Drop duplicate (user_id, date) rows left behind by concurrent taps
+            """
+            DELETE FROM attendance_records a
+            USING attendance_records b
+            WHERE a.user_id = b.user_id
+              AND a.date = b.date
+              AND a.id > b.id
+            """,
+            """
+            DO $$
+            BEGIN
+                IF NOT EXISTS (
+                    SELECT 1 FROM pg_constraint WHERE conname = 'uq_attendance_user_date'
+                ) THEN
+                    ALTER TABLE attendance_records
+                        ADD CONSTRAINT uq_attendance_user_date UNIQUE (user_id, date);
+                END IF;
+            END $$
+            """,
+        ],
+    ),
+    (
+        "0002_attendance_typed_date_time",
+        [
+            # DD/MM -> DATE; the year comes from created_at, minus one when the
+            # result would lie after the day the record was written.
+            # DD/MM/YYYY and YYYY-MM-DD are taken as they are. NULL when the
+            # value cannot be parsed.
+            """
+            CREATE OR REPLACE FUNCTION pg_temp.attendance_wire_date(value TEXT, written TIMESTAMP)
+            RETURNS DATE AS $$
+            DECLARE
+                written_on DATE := coalesce(written, now())::date;
+                parts TEXT[] := string_to_array(replace(trim(value), '-', '/'), '/');
+                parsed DATE;
+            BEGIN
+                IF cardinality(parts) = 3 AND length(parts[1]) = 4 THEN
+                    RETURN make_date(parts[1]::int, parts[2]::int, parts[3]::int);
+                ELSIF cardinality(parts) = 3 THEN
+                    RETURN make_date(parts[3]::int, parts[2]::int, parts[1]::int);
+                ELSIF cardinality(parts) <> 2 THEN
+                    RETURN NULL;
+                END IF;
+
+                parsed := make_date(extract(year FROM written_on)::int, parts[2]::int, parts[1]::int);
+                IF parsed > written_on + 1 THEN
+                    parsed := parsed - interval '1 year';
+                END IF;
+                RETURN parsed;
+            EXCEPTION WHEN others THEN
+                RETURN NULL;
+            END $$ LANGUAGE plpgsql
+            """,
+            """
+            CREATE OR REPLACE FUNCTION pg_temp.attendance_wire_time(value TEXT)
+            RETURNS TIME AS $$
+            BEGIN
+                RETURN nullif(trim(value), '')::time;
+            EXCEPTION WHEN others THEN
+                RETURN NULL;
+            END $$ LANGUAGE plpgsql
+            """,
+            # Rows that do not convert are set aside in attendance_records_unparsed
+            # (original strings kept) instead of failing the ALTER, and with it start-up
+            """
+            DO $$
+            DECLARE
+                moved INTEGER;
+            BEGIN
+                IF (
+                    SELECT data_type FROM information_schema.columns
+                    WHERE table_name = 'attendance_records' AND column_name = 'date'
+                ) <> 'date' THEN
+                    CREATE TABLE IF NOT EXISTS attendance_records_unparsed AS
+                        SELECT * FROM attendance_records WITH NO DATA;
+
+                    WITH unparsed AS (
+                        DELETE FROM attendance_records
+                        WHERE pg_temp.attendance_wire_date(date, created_at) IS NULL
+                           OR (nullif(trim(checked_in_time), '') IS NOT NULL
+                               AND pg_temp.attendance_wire_time(checked_in_time) IS NULL)
+                           OR (nullif(trim(checked_out_time), '') IS NOT NULL
+                               AND pg_temp.attendance_wire_time(checked_out_time) IS NULL)
+                        RETURNING *
+                    )
+                    INSERT INTO attendance_records_unparsed SELECT * FROM unparsed;
+
+                    GET DIAGNOSTICS moved = ROW_COUNT;
+                    IF moved > 0 THEN
+                        RAISE WARNING '% attendance records with an unparseable date or time moved to attendance_records_unparsed', moved;
+                    END IF;
+
+                    ALTER TABLE attendance_records
+                        ALTER COLUMN date TYPE DATE
+                            USING pg_temp.attendance_wire_date(date, created_at),
+                        ALTER COLUMN checked_in_time TYPE TIME
+                            USING pg_temp.attendance_wire_time(checked_in_time),
+                        ALTER COLUMN checked_out_time TYPE TIME
+                            USING pg_temp.attendance_wire_time(checked_out_time);
+                END IF;
+            END $$
+            """,
+            "DROP INDEX IF EXISTS ix_attendance_records_date",
+            "CREATE INDEX IF NOT EXISTS ix_attendance_date_user ON attendance_records (date, user_id)",
+        ],
+    ),
+    (
+        "0003_keyset_pagination_indexes",
+        [
+            "CREATE INDEX IF NOT EXISTS ix_user_created_id ON user_information (created_at, id)",
+            "CREATE INDEX IF NOT EXISTS ix_device_last_seen_id ON device_status (last_seen, id)",
+            "CREATE INDEX IF NOT EXISTS ix_attendance_date_checkin_id ON attendance_records (date, checked_in_time, id)",
+        ],
+    ),
+    (
+        "0004_attendance_device_id",
+        [
+            "ALTER TABLE attendance_records ADD COLUMN IF NOT EXISTS device_id VARCHAR",
+            "CREATE INDEX IF NOT EXISTS ix_attendance_records_device_id ON attendance_records (device_id)",
+        ],
+    ),
+    (
+        "0005_daily_attendance_summary",
+        [
+            # Statement-level triggers see every changed row at once through
+            # transition tables, so a bulk merge folds into one upsert per date.
+            # (user_id, date) is unique, so each record is one distinct user.
+            """
+            CREATE OR REPLACE FUNCTION attendance_summary_apply()
+            RETURNS trigger AS $$
+            DECLARE
+                delta TEXT := CASE TG_OP
+                    WHEN 'INSERT' THEN 'SELECT date, checked_in_time, checked_out_time, 1 AS sign FROM new_rows'
+                    WHEN 'DELETE' THEN 'SELECT date, checked_in_time, checked_out_time, -1 AS sign FROM old_rows'
+                    ELSE 'SELECT date, checked_in_time, checked_out_time, 1 AS sign FROM new_rows
+                          UNION ALL
+                          SELECT date, checked_in_time, checked_out_time, -1 AS sign FROM old_rows'
+                END;
+            BEGIN
+                EXECUTE format($sql$
+                    INSERT INTO daily_attendance_summary AS s (
+                        date, total_records, checked_in, checked_out, distinct_users, updated_at
+                    )
+                    SELECT date, records, checked_in, checked_out, records, now()
+                    FROM (
+                        SELECT
+                            date,
+                            sum(sign) AS records,
+                            coalesce(sum(sign) FILTER (WHERE checked_in_time IS NOT NULL), 0) AS checked_in,
+                            coalesce(sum(sign) FILTER (WHERE checked_out_time IS NOT NULL), 0) AS checked_out
+                        FROM (%s) d
+                        GROUP BY date
+                    ) deltas
+                    -- A check-out that only moves the time changes no count
+                    WHERE records <> 0 OR checked_in <> 0 OR checked_out <> 0
+                    ORDER BY date
+                    ON CONFLICT (date) DO UPDATE SET
+                        total_records = s.total_records + excluded.total_records,
+                        checked_in = s.checked_in + excluded.checked_in,
+                        checked_out = s.checked_out + excluded.checked_out,
+                        distinct_users = s.distinct_users + excluded.distinct_users,
+                        updated_at = excluded.updated_at
+                $sql$, delta);
+                RETURN NULL;
+            END $$ LANGUAGE plpgsql
+            """,
+            "DROP TRIGGER IF EXISTS attendance_summary_insert ON attendance_records",
+            "DROP TRIGGER IF EXISTS attendance_summary_update ON attendance_records",
+            "DROP TRIGGER IF EXISTS attendance_summary_delete ON attendance_records",
+            """
+            CREATE TRIGGER attendance_summary_insert
+                AFTER INSERT ON attendance_records
+                REFERENCING NEW TABLE AS new_rows
+                FOR EACH STATEMENT EXECUTE FUNCTION attendance_summary_apply()
+            """,
+            """
+            CREATE TRIGGER attendance_summary_update
+                AFTER UPDATE ON attendance_records
+                REFERENCING OLD TABLE AS old_rows NEW TABLE AS new_rows
+                FOR EACH STATEMENT EXECUTE FUNCTION attendance_summary_apply()
+            """,
+            """
+            CREATE TRIGGER attendance_summary_delete
+                AFTER DELETE ON attendance_records
+                REFERENCING OLD TABLE AS old_rows
+                FOR EACH STATEMENT EXECUTE FUNCTION attendance_summary_apply()
+            """,
+            # Backfill from the records written before the triggers existed
+            """
+            INSERT INTO daily_attendance_summary (
+                date, total_records, checked_in, checked_out, distinct_users, updated_at
+            )
+            SELECT
+                date,
+                count(*),
+                count(checked_in_time),
+                count(checked_out_time),
+                count(DISTINCT user_id),
+                now()
+            FROM attendance_records
+            GROUP BY date
+            ON CONFLICT (date) DO UPDATE SET
+                total_records = excluded.total_records,
+                checked_in = excluded.checked_in,
+                checked_out = excluded.checked_out,
+                distinct_users = excluded.distinct_users,
+                updated_at = excluded.updated_at
+            """,
+        ],
+    ),
+    (
+        "0006_attendance_notify",
+        [
+            # Check-ins and check-outs are published on the attendance_events
+            # channel when their transaction commits (see app/utils/attendance_events.py)
+            ATTENDANCE_NOTIFY_FUNCTION,
+            "DROP TRIGGER IF EXISTS attendance_notify_insert ON attendance_records",
+            "DROP TRIGGER IF EXISTS attendance_notify_update ON attendance_records",
+            """
+            CREATE TRIGGER attendance_notify_insert
+                AFTER INSERT ON attendance_records
+                REFERENCING NEW TABLE AS new_rows
+                FOR EACH STATEMENT EXECUTE FUNCTION attendance_notify()
+            """,
+            """
+            CREATE TRIGGER attendance_notify_update
+                AFTER UPDATE ON attendance_records
+                REFERENCING OLD TABLE AS old_rows NEW TABLE AS new_rows
+                FOR EACH STATEMENT EXECUTE FUNCTION attendance_notify()
+            """,
+        ],
+    ),
+    (
+        "0007_sync_trigger_notify",
+        [
+            # Wakes long-polling devices (see app/utils/sync_trigger_waits.py)
+            """
+            CREATE OR REPLACE FUNCTION sync_trigger_notify()
+            RETURNS trigger AS $$
+            BEGIN
+                PERFORM pg_notify(
+                    'sync_triggers',
+                    CASE WHEN TG_OP = 'DELETE' THEN OLD.device_id ELSE NEW.device_id END
+                );
+                RETURN NULL;
+            END $$ LANGUAGE plpgsql
+            """,
+            "DROP TRIGGER IF EXISTS sync_trigger_notify ON attendance_sync_triggers",
+            """
+            CREATE TRIGGER sync_trigger_notify
+                AFTER INSERT OR UPDATE OF status OR DELETE ON attendance_sync_triggers
+                FOR EACH ROW EXECUTE FUNCTION sync_trigger_notify()
+            """,
+        ],
+    ),
+    (
+        "0008_fingerprint_slots",
+        [
+            # Rewrite a user's slot rows whenever their slot_id array changes.
+            # A slot owned by another user fails the write on the primary key.
+            FINGERPRINT_SLOTS_SYNC_FUNCTION,
+            "DROP TRIGGER IF EXISTS fingerprint_slots_sync ON user_information",
+            """
+            CREATE TRIGGER fingerprint_slots_sync
+                AFTER INSERT OR UPDATE OF slot_id, user_id OR DELETE ON user_information
+                FOR EACH ROW EXECUTE FUNCTION fingerprint_slots_sync()
+            """,
+            # Backfill; a slot already shared by several users stays with the oldest one
+            """
+            INSERT INTO fingerprint_slots (slot_id, user_id)
+            SELECT DISTINCT ON (slot) slot, u.user_id
+            FROM user_information u, unnest(u.slot_id) AS slot
+            ORDER BY slot, u.id
+            ON CONFLICT (slot_id) DO NOTHING
+            """,
+        ],
+    ),
+    (
+        "0009_roster_version",
+        [
+            # Moves on every statement that writes user_information, so each
+            # worker's in-process roster (app/utils/user_roster.py) can tell it is stale
+            """
+            CREATE TABLE IF NOT EXISTS roster_version (
+                id INTEGER PRIMARY KEY CHECK (id = 1),
+                version BIGINT NOT NULL
+            )
+            """,
+            "INSERT INTO roster_version (id, version) VALUES (1, 0) ON CONFLICT (id) DO NOTHING",
+            """
+            CREATE OR REPLACE FUNCTION roster_version_bump()
+            RETURNS trigger AS $$
+            BEGIN
+                UPDATE roster_version SET version = version + 1 WHERE id = 1;
+                RETURN NULL;
+            END $$ LANGUAGE plpgsql
+            """,
+            "DROP TRIGGER IF EXISTS roster_version_bump ON user_information",
+            """
+            CREATE TRIGGER roster_version_bump
+                AFTER INSERT OR UPDATE OR DELETE OR TRUNCATE ON user_information
+                FOR EACH STATEMENT EXECUTE FUNCTION roster_version_bump()
+            """,
+        ],
+    ),
+    (
+        "0010_attendance_partitions",
+        [
+            # One partition per month, named attendance_records_pYYYYMM. A new
+            # partition takes over its month's rows from the default partition,
+            # which only catches dates no month partition covered yet.
+            """
+            CREATE OR REPLACE FUNCTION attendance_create_partition(month DATE)
+            RETURNS BOOLEAN AS $$
+            DECLARE
+                start_date DATE := date_trunc('month', month)::date;
+                end_date DATE := (date_trunc('month', month) + interval '1 month')::date;
+                part TEXT := 'attendance_records_p' || to_char(month, 'YYYYMM');
+            BEGIN
+                PERFORM pg_advisory_xact_lock(hashtext('attendance_create_partition'));
+
+                IF to_regclass(part) IS NOT NULL THEN
+                    RETURN FALSE;
+                END IF;
+
+                EXECUTE format('CREATE TABLE %I (LIKE attendance_records INCLUDING DEFAULTS)', part);
+                IF to_regclass('attendance_records_default') IS NOT NULL THEN
+                    EXECUTE format(
+                        'WITH moved AS (DELETE FROM attendance_records_default WHERE date >= %L AND date < %L RETURNING *)
+                         INSERT INTO %I SELECT * FROM moved',
+                        start_date, end_date, part
+                    );
+                END IF;
+                EXECUTE format(
+                    'ALTER TABLE attendance_records ATTACH PARTITION %I FOR VALUES FROM (%L) TO (%L)',
+                    part, start_date, end_date
+                );
+                RETURN TRUE;
+            END $$ LANGUAGE plpgsql
+            """,
+            # Rebuild a plain table as a partitioned one. Fresh databases got
+            # the partitioned table from create_all() and skip this.
+            """
+            DO $$
+            DECLARE
+                month DATE;
+            BEGIN
+                IF (SELECT relkind FROM pg_class WHERE oid = to_regclass('attendance_records')) IS DISTINCT FROM 'r' THEN
+                    RETURN;
+                END IF;
+
+                ALTER TABLE attendance_records RENAME TO attendance_records_unpartitioned;
+                CREATE TABLE attendance_records (LIKE attendance_records_unpartitioned INCLUDING DEFAULTS)
+                    PARTITION BY RANGE (date);
+                ALTER SEQUENCE attendance_records_id_seq OWNED BY attendance_records.id;
+
+                FOR month IN SELECT DISTINCT date_trunc('month', date)::date FROM attendance_records_unpartitioned LOOP
+                    PERFORM attendance_create_partition(month);
+                END LOOP;
+
+                -- Triggers stay on the old table, so the rollup is not counted twice
+                INSERT INTO attendance_records SELECT * FROM attendance_records_unpartitioned;
+                DROP TABLE attendance_records_unpartitioned;
+
+                -- Unique keys of a partitioned table must include the partition key
+                ALTER TABLE attendance_records ADD CONSTRAINT attendance_records_pkey PRIMARY KEY (id, date);
+                ALTER TABLE attendance_records ADD CONSTRAINT uq_attendance_user_date UNIQUE (user_id, date);
+                CREATE INDEX ix_attendance_records_id ON attendance_records (id);
+                CREATE INDEX ix_attendance_records_user_id ON attendance_records (user_id);
+                CREATE INDEX ix_attendance_records_device_id ON attendance_records (device_id);
+                CREATE INDEX ix_attendance_date_user ON attendance_records (date, user_id);
+                CREATE INDEX ix_attendance_date_checkin_id ON attendance_records (date, checked_in_time, id);
+            END $$
+            """,
+            "CREATE TABLE IF NOT EXISTS attendance_records_default PARTITION OF attendance_records DEFAULT",
+            """
+            SELECT attendance_create_partition(month::date)
+            FROM generate_series(
+                date_trunc('month', current_date),
+                date_trunc('month', current_date) + interval '3 months',
+                interval '1 month'
+            ) AS month
+            """,
+            # Statement triggers from 0005 and 0006, on the partitioned table
+            "DROP TRIGGER IF EXISTS attendance_summary_insert ON attendance_records",
+            "DROP TRIGGER IF EXISTS attendance_summary_update ON attendance_records",
+            "DROP TRIGGER IF EXISTS attendance_summary_delete ON attendance_records",
+            "DROP TRIGGER IF EXISTS attendance_notify_insert ON attendance_records",
+            "DROP TRIGGER IF EXISTS attendance_notify_update ON attendance_records",
+            """
+            CREATE TRIGGER attendance_summary_insert
+                AFTER INSERT ON attendance_records
+                REFERENCING NEW TABLE AS new_rows
+                FOR EACH STATEMENT EXECUTE FUNCTION attendance_summary_apply()
+            """,
+            """
+            CREATE TRIGGER attendance_summary_update
+                AFTER UPDATE ON attendance_records
+                REFERENCING OLD TABLE AS old_rows NEW TABLE AS new_rows
+                FOR EACH STATEMENT EXECUTE FUNCTION attendance_summary_apply()
+            """,
+            """
+            CREATE TRIGGER attendance_summary_delete
+                AFTER DELETE ON attendance_records
+                REFERENCING OLD TABLE AS old_rows
+                FOR EACH STATEMENT EXECUTE FUNCTION attendance_summary_apply()
+            """,
+            """
+            CREATE TRIGGER attendance_notify_insert
+                AFTER INSERT ON attendance_records
+                REFERENCING NEW TABLE AS new_rows
+                FOR EACH STATEMENT EXECUTE FUNCTION attendance_notify()
+            """,
+            """
+            CREATE TRIGGER attendance_notify_update
+                AFTER UPDATE ON attendance_records
+                REFERENCING OLD TABLE AS old_rows NEW TABLE AS new_rows
+                FOR EACH STATEMENT EXECUTE FUNCTION attendance_notify()
+            """,
+        ],
+    ),
+    (
+        "0011_attendance_presence",
+        [
+            # Inserts OR their days in; deletes and is_present changes recompute
+            # the touched (user, month) bitmaps from the records left
+            """
+            CREATE OR REPLACE FUNCTION attendance_presence_apply()
+            RETURNS trigger AS $$
+            BEGIN
+                IF TG_OP = 'INSERT' THEN
+                    INSERT INTO attendance_presence AS p (user_id, month, days)
+                    SELECT user_id, date_trunc('month', date)::date, bit_or(1 << (extract(day FROM date)::int - 1))
+                    FROM new_rows
+                    WHERE is_present
+                    GROUP BY 1, 2
+                    ORDER BY 1, 2
+                    ON CONFLICT (user_id, month) DO UPDATE SET days = p.days | excluded.days;
+                    RETURN NULL;
+                END IF;
+
+                EXECUTE format($sql$
+                    WITH touched AS (%s)
+                    INSERT INTO attendance_presence AS p (user_id, month, days)
+                    SELECT
+                        t.user_id,
+                        t.month,
+                        coalesce(bit_or(1 << (extract(day FROM a.date)::int - 1)) FILTER (WHERE a.is_present), 0)
+                    FROM touched t
+                    LEFT JOIN attendance_records a
+                        ON a.user_id = t.user_id
+                       AND a.date >= t.month
+                       AND a.date < (t.month + interval '1 month')::date
+                    GROUP BY t.user_id, t.month
+                    ORDER BY 1, 2
+                    ON CONFLICT (user_id, month) DO UPDATE SET days = excluded.days
+                $sql$, CASE TG_OP
+                    WHEN 'DELETE' THEN
+                        'SELECT DISTINCT user_id, date_trunc(''month'', date)::date AS month FROM old_rows'
+                    ELSE
+                        'SELECT DISTINCT n.user_id, date_trunc(''month'', n.date)::date AS month
+                         FROM new_rows n JOIN old_rows o USING (id)
+                         WHERE n.is_present IS DISTINCT FROM o.is_present'
+                END);
+                RETURN NULL;
+            END $$ LANGUAGE plpgsql
+            """,
+            "DROP TRIGGER IF EXISTS attendance_presence_insert ON attendance_records",
+            "DROP TRIGGER IF EXISTS attendance_presence_update ON attendance_records",
+            "DROP TRIGGER IF EXISTS attendance_presence_delete ON attendance_records",
+            """
+            CREATE TRIGGER attendance_presence_insert
+                AFTER INSERT ON attendance_records
+                REFERENCING NEW TABLE AS new_rows
+                FOR EACH STATEMENT EXECUTE FUNCTION attendance_presence_apply()
+            """,
+            """
+            CREATE TRIGGER attendance_presence_update
+                AFTER UPDATE ON attendance_records
+                REFERENCING OLD TABLE AS old_rows NEW TABLE AS new_rows
+                FOR EACH STATEMENT EXECUTE FUNCTION attendance_presence_apply()
+            """,
+            """
+            CREATE TRIGGER attendance_presence_delete
+                AFTER DELETE ON attendance_records
+                REFERENCING OLD TABLE AS old_rows
+                FOR EACH STATEMENT EXECUTE FUNCTION attendance_presence_apply()
+            """,
+            # Backfill from the table; archived months need the rebuild command
+            """
+            INSERT INTO attendance_presence (user_id, month, days)
+            SELECT user_id, date_trunc('month', date)::date, bit_or(1 << (extract(day FROM date)::int - 1))
+            FROM attendance_records
+            WHERE is_present
+            GROUP BY 1, 2
+            ON CONFLICT (user_id, month) DO UPDATE SET days = excluded.days
+            """,
+        ],
+    ),
+    (
+        "0012_attendance_checkin_sort_index",
+        [
+            # The day listing pages on coalesce(checked_in_time, midnight), id
+            # so records without a check-in time are not skipped after page 1
+            """
+            CREATE INDEX IF NOT EXISTS ix_attendance_date_checkin_sort_id
+                ON attendance_records (date, coalesce(checked_in_time, TIME '00:00'), id)
+            """,
+            "DROP INDEX IF EXISTS ix_attendance_date_checkin_id",
+        ],
+    ),
+    (
+        "0013_attendance_notify_payload_size",
+        [
+            # 0006 packed 40 events per notification, which can pass 8000 bytes
+            ATTENDANCE_NOTIFY_FUNCTION,
+        ],
+    ),
+    (
+        "0014_fingerprint_slots_distinct",
+        [
+            # 0008 inserted a repeated slot twice and failed on the primary key
+            FINGERPRINT_SLOTS_SYNC_FUNCTION,
+        ],
+    ),
+]
+
+# Arbitrary key for pg_advisory_xact_lock so concurrent workers migrate one at a time
+MIGRATION_LOCK_KEY = 7231001
+
+
+def run_migrations(engine):
+    """
+    Create missing tables, then apply pending migrations in order
+    Applied versions are recorded in schema_migrations
+    """
+    with engine.begin() as conn:
+        conn.execute(text("SELECT pg_advisory_xact_lock(:key)"), {"key": MIGRATION_LOCK_KEY})
+
+        Base.metadata.create_all(bind=conn)
+
+        conn.execute(text(
+            """
+            CREATE TABLE IF NOT EXISTS schema_migrations (
+                version VARCHAR PRIMARY KEY,
+                applied_at TIMESTAMP NOT NULL DEFAULT now()
+            )
+            """
+        ))
+
+        applied = {
+            row[0] for row in conn.execute(text("SELECT version FROM schema_migrations"))
+        }
+
+        # Migrations report rows they had to set aside with RAISE WARNING
+        notices = conn.connection.dbapi_connection.notices
+
+        for version, statements in MIGRATIONS:
+            if version in applied:
+                continue
+
+            del notices[:]
+            for statement in statements:
+                conn.execute(text(statement))
+
+            for notice in notices:
+                if notice.startswith("WARNING"):
+                    print(f"⚠ Migration {version}: {notice.split(':', 1)[1].strip()}")
+
+            conn.execute(
+                text("INSERT INTO schema_migrations (version) VALUES (:version)"),
+                {"version": version}
+            )
+            print(f"✓ Applied migration {version}")
@@ -943,19 +943,47 @@
 
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
-from app.core.database import Base, engine, SessionLocal
-from app.routers import device, user, attendance
+from app.core.database import engine, SessionLocal
+from app.core.migrations import run_migrations
+from app.routers import device, user, attendance, upload
 from app.routers.user import seed_default_admin
+from app.utils.ingest_queue import attendance_queue
+from app.utils.pg_listener import pg_listener
+from app.utils.heartbeat_buffer import heartbeat_buffer
+from app.utils.outage_sweeper import outage_sweeper
+from app.utils.attendance_purge import attendance_purger
+from app.utils.attendance_partitions import partition_maintainer
 from contextlib import asynccontextmanager
 
-Base.metadata.create_all(bind=engine)
+run_migrations(engine)
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Start watching device heartbeats for outages
+    outage_sweeper.start()
+    # Resume attendance purges left pending by a previous run
+    attendance_purger.start()
+    # Create upcoming attendance partitions and apply retention
+    partition_maintainer.start()
+    yield
+    outage_sweeper.close()
+    attendance_purger.close()
+    partition_maintainer.close()
+    # Flush scans still waiting in the group-commit queue
+    attendance_queue.close()
+    # Write out buffered device heartbeats
+    heartbeat_buffer.close()
+    # Stop the LISTEN thread behind the live feed and sync trigger waits
+    pg_listener.close()
 
 
 # ==================== FASTAPI APP ====================
 app = FastAPI(
     title="ESP32 Attendance System API",
     description="REST API for Fingerprint Attendance System",
-    version="1.0.0"
+    version="1.0.0",
+    lifespan=lifespan
 )
 
 
@@ -971,6 +999,7 @@ app.add_middleware(
 app.include_router(device.router)
 app.include_router(user.router)
 app.include_router(attendance.router)
+app.include_router(upload.router)
 
 @app.get("/")
 def root():
@@ -1,22 +1,49 @@
-from sqlalchemy import Column, Integer, String, DateTime, Boolean
+from sqlalchemy import Column, Integer, String, DateTime, Date, Time, Boolean, Index, UniqueConstraint, text
 from sqlalchemy.dialects.postgresql import ARRAY
 from datetime import datetime
 from app.core.database import Base
 
 class AttendanceRecordDB(Base):
     __tablename__ = "attendance_records"
+    __table_args__ = (
+        # One record per user per day; scans upsert against this key
+        UniqueConstraint("user_id", "date", name="uq_attendance_user_date"),
+        # Day and date-range reads
+        Index("ix_attendance_date_user", "date", "user_id"),
+        # Keyset pagination of one day ordered by check-in (NULL sorts as midnight)
+        Index("ix_attendance_date_checkin_sort_id", "date", text("coalesce(checked_in_time, TIME '00:00')"), "id"),
+        # One partition per month (migration 0010, app/utils/attendance_partitions.py)
+        {"postgresql_partition_by": "RANGE (date)"},
+    )
     
-    id = Column(Integer, primary_key=True, index=True)
+    # The partition key has to be part of the primary key
+    id = Column(Integer, primary_key=True, autoincrement=True, index=True)
     name = Column(String, nullable=False)
     user_id = Column(Integer, nullable=False, index=True)
     slot_id = Column(ARRAY(Integer), nullable=False)  # Added slot_id as array
-    date = Column(String, nullable=False, index=True)
-    checked_in_time = Column(String, nullable=True)
-    checked_out_time = Column(String, nullable=True)
+    date = Column(Date, primary_key=True)  # Devices send DD/MM, see app/utils/wire_format.py
+    checked_in_time = Column(Time, nullable=True)
+    checked_out_time = Column(Time, nullable=True)
     is_present = Column(Boolean, default=False, nullable=False)
+    device_id = Column(String, nullable=True, index=True)  # Device of the check-in scan, if known
     created_at = Column(DateTime, default=datetime.now)
     updated_at = Column(DateTime, default=datetime.now, onupdate=datetime.now)
 
+class DailyAttendanceSummaryDB(Base):
+    """
+    Per-date rollup of attendance_records for the dashboard and trend views
+    Maintained by triggers on attendance_records (migration 0005), in the
+    same transaction as the write that changed the records
+    """
+    __tablename__ = "daily_attendance_summary"
+
+    date = Column(Date, primary_key=True)
+    total_records = Column(Integer, nullable=False, default=0)
+    checked_in = Column(Integer, nullable=False, default=0)
+    checked_out = Column(Integer, nullable=False, default=0)
+    distinct_users = Column(Integer, nullable=False, default=0)
+    updated_at = Column(DateTime, default=datetime.now, onupdate=datetime.now)
+
 class AttendanceSyncTriggerDB(Base):
     __tablename__ = "attendance_sync_triggers"
     
@@ -27,4 +54,36 @@ class AttendanceSyncTriggerDB(Base):
     triggered_at = Column(DateTime, nullable=False)
     completed_at = Column(DateTime, nullable=True)
     logs_synced = Column(Integer, default=0)
-    error_message = Column(String, nullable=True)
\ No newline at end of file
+    error_message = Column(String, nullable=True)
+
+class AttendancePurgeJobDB(Base):
+    """
+    Background deletion of a deleted user's attendance history
+    Only records up to max_record_id are purged, so attendance of a user
+    re-created under the same id afterwards is left alone
+    """
+    __tablename__ = "attendance_purge_jobs"
+
+    id = Column(Integer, primary_key=True, index=True)
+    user_id = Column(Integer, nullable=False, index=True)
+    max_record_id = Column(Integer, nullable=False)
+    status = Column(String, nullable=False, default="pending")  # 'pending', 'completed', 'failed'
+    total_records = Column(Integer, nullable=False, default=0)  # Counted when the job was queued
+    records_deleted = Column(Integer, nullable=False, default=0)
+    error_message = Column(String, nullable=True)
+    created_at = Column(DateTime, default=datetime.now)
+    updated_at = Column(DateTime, default=datetime.now, onupdate=datetime.now)
+    completed_at = Column(DateTime, nullable=True)
+
+
+class AttendancePresenceDB(Base):
+    """
+    Presence bitmap per user per month: bit d-1 of days is set when the
+    user was present on day d. Maintained by triggers on attendance_records
+    (migration 0011); see app/utils/presence_index.py
+    """
+    __tablename__ = "attendance_presence"
+
+    user_id = Column(Integer, primary_key=True, autoincrement=False)
+    month = Column(Date, primary_key=True)  # First day of the month
+    days = Column(Integer, nullable=False, default=0)
@@ -1,13 +1,40 @@
-from sqlalchemy import Column, Integer, String, DateTime
+from sqlalchemy import Column, Integer, String, DateTime, Index, text
 from datetime import datetime
 from app.core.database import Base
 
 class DeviceStatusDB(Base):
     __tablename__ = "device_status"
+    __table_args__ = (
+        # Keyset pagination of get_all_devices_status (most recently seen first)
+        Index("ix_device_last_seen_id", "last_seen", "id"),
+    )
     
     id = Column(Integer, primary_key=True, index=True)
     device_id = Column(String, unique=True, nullable=False, index=True)
     status = Column(String, nullable=False)
     last_seen = Column(DateTime, nullable=False)
     created_at = Column(DateTime, default=datetime.now)
-    updated_at = Column(DateTime, default=datetime.now, onupdate=datetime.now)
\ No newline at end of file
+    updated_at = Column(DateTime, default=datetime.now, onupdate=datetime.now)
+
+class DeviceOutageDB(Base):
+    """
+    One row per outage: started_at is the last heartbeat before the device
+    went silent, ended_at the first one after (NULL while still offline)
+    """
+    __tablename__ = "device_outages"
+    __table_args__ = (
+        # Uptime reads: a device's outages overlapping a time window
+        Index("ix_device_outage_device_start", "device_id", "started_at"),
+        # At most one open outage per device, whichever worker detects it
+        Index(
+            "uq_device_open_outage",
+            "device_id",
+            unique=True,
+            postgresql_where=text("ended_at IS NULL")
+        ),
+    )
+
+    id = Column(Integer, primary_key=True, index=True)
+    device_id = Column(String, nullable=False)
+    started_at = Column(DateTime, nullable=False)
+    ended_at = Column(DateTime, nullable=True)
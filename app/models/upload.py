@@ -0,0 +1,32 @@
+from sqlalchemy import Column, Integer, String, DateTime, ForeignKey, JSON, UniqueConstraint
+from datetime import datetime
+from app.core.database import Base
+
+class UploadSessionDB(Base):
+    __tablename__ = "upload_sessions"
+    
+    id = Column(Integer, primary_key=True, index=True)
+    device_id = Column(String, nullable=False, index=True)
+    kind = Column(String, nullable=False)  # 'attendance' or 'users'
+    trigger_id = Column(Integer, nullable=True, index=True)  # AttendanceSyncTriggerDB.id
+    total_chunks = Column(Integer, nullable=True)
+    status = Column(String, nullable=False, default="open")  # 'open', 'completed', 'failed'
+    rows_applied = Column(Integer, nullable=False, default=0)
+    created_at = Column(DateTime, default=datetime.now)
+    updated_at = Column(DateTime, default=datetime.now, onupdate=datetime.now)
+    completed_at = Column(DateTime, nullable=True)
+
+class UploadChunkDB(Base):
+    __tablename__ = "upload_chunks"
+    __table_args__ = (
+        # A chunk is applied at most once per session
+        UniqueConstraint("session_id", "chunk_index", name="uq_upload_chunk_index"),
+    )
+    
+    id = Column(Integer, primary_key=True, index=True)
+    session_id = Column(Integer, ForeignKey("upload_sessions.id", ondelete="CASCADE"), nullable=False)
+    chunk_index = Column(Integer, nullable=False)
+    content_hash = Column(String, nullable=False)  # SHA-256 of the raw chunk body
+    row_count = Column(Integer, nullable=False)
+    result = Column(JSON, nullable=True)  # Counters returned when the chunk was applied
+    created_at = Column(DateTime, default=datetime.now)
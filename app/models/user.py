@@ -1,10 +1,14 @@
-from sqlalchemy import Column, Integer, String, DateTime,Numeric
+from sqlalchemy import Column, Integer, String, DateTime, Numeric, Index, ForeignKey
 from sqlalchemy.dialects.postgresql import ARRAY
 from datetime import datetime
 from app.core.database import Base
 
 class UserInformationDB(Base):
     __tablename__ = "user_information"
+    __table_args__ = (
+        # Keyset pagination of get_all_users (newest first)
+        Index("ix_user_created_id", "created_at", "id"),
+    )
     
     id = Column(Integer, primary_key=True, index=True)
     name = Column(String, nullable=False)
@@ -15,6 +19,22 @@ class UserInformationDB(Base):
     salary = Column(Numeric, nullable=True, default=None) 
     created_at = Column(DateTime, default=datetime.now)
 
+class FingerprintSlotDB(Base):
+    """
+    One row per fingerprint slot, mirroring user_information.slot_id
+    Kept in sync by a trigger on user_information (migration 0008); the
+    primary key makes assigning a slot to two users impossible
+    """
+    __tablename__ = "fingerprint_slots"
+
+    slot_id = Column(Integer, primary_key=True, autoincrement=False)
+    user_id = Column(
+        Integer,
+        ForeignKey("user_information.user_id", ondelete="CASCADE", onupdate="CASCADE"),
+        nullable=False,
+        index=True
+    )
+
 class AdminInformationDB(Base):
     __tablename__ = "admin_information"
     
@@ -1,11 +1,26 @@
-from fastapi import APIRouter, Depends, HTTPException
+import asyncio
+from fastapi import APIRouter, Depends, HTTPException, Query, Request
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import StreamingResponse
+from sqlalchemy import func, literal_column
 from sqlalchemy.orm import Session
-from sqlalchemy import tuple_
-from datetime import datetime
-from app.core.database import get_db
-from app.models.user import UserInformationDB
+from datetime import datetime, time
+from typing import List, Optional
+from app.core.config import settings
+from app.core.database import SessionLocal, get_db
 from app.models.attendance import AttendanceRecordDB,AttendanceSyncTriggerDB
-from app.schemas.attendance import (AttendanceLogRequest,AttendanceLogResponse,AttendanceBulkRequest,TriggerAttendanceSyncRequest,TriggerAttendanceSyncResponse,SyncTriggerCheck,CompleteSyncTriggerRequest,CompleteSyncTriggerResponse)
+from app.utils.attendance_ingest import (build_scan_upsert,scan_row,attendance_record_dict,AttendanceRow,ingest_attendance_rows)
+from app.utils.attendance_events import OVERFLOW, attendance_events, sse_message
+from app.utils.attendance_export import EXPORT_FORMATS, export_query, stream_attendance_export
+from app.utils.attendance_archive import attendance_archive
+from app.utils.ingest_queue import attendance_queue
+from app.utils.ndjson import iter_ndjson
+from app.utils.pagination import DEFAULT_PAGE_SIZE, MAX_PAGE_SIZE, paginate
+from app.utils.payload_codecs import decode_attendance_payload
+from app.utils.response_cache import attendance_date_tags, attendance_row_tags, cached_response, response_cache
+from app.utils.sync_trigger_waits import sync_trigger_waits
+from app.utils.wire_format import format_wire_date, format_wire_time, parse_wire_date, parse_wire_range
+from app.schemas.attendance import (AttendanceLogRequest,AttendanceScanRequest,AttendanceLogResponse,TriggerAttendanceSyncRequest,TriggerAttendanceSyncResponse,SyncTriggerCheck,CompleteSyncTriggerRequest,CompleteSyncTriggerResponse)
 
 router = APIRouter(prefix="/esp32/attendance", tags=["Attendance"])
 
@@ -15,76 +30,62 @@ router = APIRouter(prefix="/esp32/attendance", tags=["Attendance"])
 
 @router.post("/esp32/attendance", response_model=AttendanceLogResponse)
 def log_attendance(
-    data: AttendanceLogRequest,
+    data: AttendanceScanRequest,
     db: Session = Depends(get_db)
 ):
     """
     POST endpoint for ESP32 to log attendance
     Now stores slot_id array with attendance record
+
+    One INSERT ... ON CONFLICT (user_id, date) DO UPDATE round trip per scan:
+    the first scan of the day checks in, later scans move the check-out time.
+    With ATTENDANCE_QUEUE_ENABLED, scans are group-committed by attendance_queue.
     """
     try:
-        existing_record = db.query(AttendanceRecordDB).filter_by(
-            user_id=data.id,
-            date=data.date
-        ).first()
-        
-        if existing_record:
-            # Update check-out time
-            existing_record.checked_out_time = data.time
-            existing_record.updated_at = datetime.now()
-            
-            db.commit()
-            db.refresh(existing_record)
-            
-            return AttendanceLogResponse(
-                success=True,
-                message=f"Check-out time updated for {data.name}",
-                action="checked_out",
-                attendance_record={
-                    "name": existing_record.name,
-                    "user_id": existing_record.user_id,
-                    "slot_id": existing_record.slot_id,
-                    "date": existing_record.date,
-                    "checked_in_time": existing_record.checked_in_time,
-                    "checked_out_time": existing_record.checked_out_time,
-                    "is_present": existing_record.is_present
-                }
-            )
-        else:
-            # First log - check-in
-            new_record = AttendanceRecordDB(
-                name=data.name,
-                user_id=data.id,
-                slot_id=data.slot_id,  # Store slot array
-                date=data.date,
-                checked_in_time=data.time,
-                checked_out_time=None,
-                is_present=True
-            )
-            
-            db.add(new_record)
-            db.commit()
-            db.refresh(new_record)
-            
-            return AttendanceLogResponse(
-                success=True,
-                message=f"{data.name} checked in successfully",
-                action="checked_in",
-                attendance_record={
-                    "name": new_record.name,
-                    "user_id": new_record.user_id,
-                    "slot_id": new_record.slot_id,
-                    "date": new_record.date,
-                    "checked_in_time": new_record.checked_in_time,
-                    "checked_out_time": new_record.checked_out_time,
-                    "is_present": new_record.is_present
-                }
-            )
+        if settings.ATTENDANCE_QUEUE_ENABLED:
+            future = attendance_queue.submit(data)
+
+            if not settings.ATTENDANCE_QUEUE_DURABLE:
+                # Write-behind: answer now, the flusher commits within max wait
+                return AttendanceLogResponse(
+                    success=True,
+                    message=f"Attendance for {data.name} queued",
+                    action="queued",
+                    attendance_record=None
+                )
+
+            action, attendance_record = future.result()
+            return _attendance_log_response(data.name, action, attendance_record)
+
+        # A single statement is atomic on its own, so skip BEGIN/COMMIT round trips
+        conn = db.connection(execution_options={"isolation_level": "AUTOCOMMIT"})
+
+        record = conn.execute(build_scan_upsert([
+            scan_row(data.name, data.id, data.slot_id, data.date, data.time, device_id=data.device_id)
+        ])).one()
+
+        response_cache.invalidate(*attendance_date_tags(record.date))
+
+        action = "checked_in" if record.inserted else "checked_out"
+        return _attendance_log_response(data.name, action, attendance_record_dict(record))
         
     except Exception as e:
         db.rollback()
         raise HTTPException(status_code=500, detail=f"Attendance logging error: {str(e)}")
 
+def _attendance_log_response(name, action, attendance_record):
+    if action == "checked_in":
+        message = f"{name} checked in successfully"
+    else:
+        message = f"Check-out time updated for {name}"
+
+    return AttendanceLogResponse(
+        success=True,
+        message=message,
+        action=action,
+        attendance_record=attendance_record
+    )
+
 @router.get("/esp32/attendance/{user_id}/{date}")
 def get_attendance_by_user_date(
     user_id: int,
@@ -92,9 +93,14 @@ def get_attendance_by_user_date(
     db: Session = Depends(get_db)
 ):
     """GET endpoint to retrieve attendance record for a specific user and date"""
+    try:
+        record_date = parse_wire_date(date)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
     record = db.query(AttendanceRecordDB).filter_by(
         user_id=user_id,
-        date=date
+        date=record_date
     ).first()
     
     if not record:
@@ -106,149 +112,242 @@ def get_attendance_by_user_date(
     return {
         "name": record.name,
         "user_id": record.user_id,
-        "date": record.date,
-        "checked_in_time": record.checked_in_time,
-        "checked_out_time": record.checked_out_time,
+        "date": format_wire_date(record.date),
+        "iso_date": record.date.isoformat(),
+        "checked_in_time": format_wire_time(record.checked_in_time),
+        "checked_out_time": format_wire_time(record.checked_out_time),
         "is_present": record.is_present,
         "created_at": record.created_at.isoformat(),
         "updated_at": record.updated_at.isoformat()
     }
 
+# Matches ix_attendance_date_checkin_sort_id; a record without a check-in
+# time sorts as midnight instead of dropping out of the keyset comparison
+CHECKIN_SORT_KEY = func.coalesce(AttendanceRecordDB.checked_in_time, literal_column("TIME '00:00'"))
+
+def _attendance_date_tags(date, **_):
+    try:
+        return (f"attendance:{parse_wire_date(date).isoformat()}",)
+    except ValueError:
+        return ("attendance",)
+
 @router.get("/esp32/attendance/date/{date}")
-def get_attendance_by_date(date: str, db: Session = Depends(get_db)):
-    """GET endpoint to retrieve all attendance records for a specific date"""
-    records = db.query(AttendanceRecordDB).filter_by(date=date).order_by(
-        AttendanceRecordDB.checked_in_time
-    ).all()
+@cached_response(_attendance_date_tags)
+def get_attendance_by_date(
+    date: str,
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    cursor: Optional[str] = None,
+    db: Session = Depends(get_db)
+):
+    """
+    GET endpoint to retrieve all attendance records for a specific date
+    Ordered by check-in time, one page at a time; pass next_cursor back as cursor
+    """
+    try:
+        record_date = parse_wire_date(date)
+
+        records, next_cursor = paginate(
+            db.query(AttendanceRecordDB).filter_by(date=record_date),
+            [CHECKIN_SORT_KEY, AttendanceRecordDB.id],
+            [time.fromisoformat, int],
+            limit,
+            cursor,
+            key=lambda record: (record.checked_in_time or time.min, record.id)
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
     
     attendance_list = []
     for record in records:
         attendance_list.append({
             "name": record.name,
             "user_id": record.user_id,
-            "date": record.date,
-            "checked_in_time": record.checked_in_time,
-            "checked_out_time": record.checked_out_time,
+            "date": format_wire_date(record.date),
+            "iso_date": record.date.isoformat(),
+            "checked_in_time": format_wire_time(record.checked_in_time),
+            "checked_out_time": format_wire_time(record.checked_out_time),
             "is_present": record.is_present
         })
     
-    present_count = sum(1 for r in attendance_list if r['is_present'])
+    # Totals cover the whole day, not just this page
+    total_records, present_count = db.query(
+        func.count(AttendanceRecordDB.id),
+        func.count(AttendanceRecordDB.id).filter(AttendanceRecordDB.is_present.is_(True))
+    ).filter(AttendanceRecordDB.date == record_date).one()
     
     return {
-        "date": date,
-        "total_records": len(attendance_list),
+        "date": format_wire_date(record_date),
+        "iso_date": record_date.isoformat(),
+        "total_records": total_records,
         "present_count": present_count,
-        "absent_count": len(attendance_list) - present_count,
-        "records": attendance_list
+        "absent_count": total_records - present_count,
+        "records": attendance_list,
+        "limit": limit,
+        "next_cursor": next_cursor
     }
 
-@router.post("/esp32/attendance/bulk")
-def log_bulk_attendance(
-    data: AttendanceBulkRequest,
-    db: Session = Depends(get_db)
+@router.get("/esp32/attendance/export")
+def export_attendance(
+    start_date: str,
+    end_date: str,
+    format: str = Query("csv", pattern="^(csv|ndjson)$"),
+    user_ids: Optional[List[int]] = Query(None),
+    device_id: Optional[str] = None,
+    gzip: bool = False
 ):
     """
-    Bulk attendance upload with automatic slot_id fixing
+    Stream attendance for payroll/HR as CSV or NDJSON
+
+    Filters by date range (DD/MM or YYYY-MM-DD), optionally by user_ids
+    (repeat the parameter) and device_id. Rows are read from a server-side
+    cursor and written out batch by batch; gzip=true compresses the stream.
     """
     try:
-        logs = data.logs
+        start, end = parse_wire_range(start_date, end_date)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
 
-        if not logs:
-            return {"success": True, "message": "No logs received", "processed": 0}
+    # Months moved to cold storage are merged in from the archive files;
+    # table rows for those dates replace the archived ones
+    query = export_query(start, end, user_ids, device_id)
+    boundary = attendance_archive.boundary()
+    archived = None
+    if boundary is not None and start < boundary:
+        db = SessionLocal()
+        try:
+            exclude = attendance_archive.superseded(db, start, end, boundary)
+        finally:
+            db.close()
+        archived = attendance_archive.records(start, end, user_ids, device_id, exclude=exclude)
 
-        # Preload all users for slot_id lookup
-        all_users = db.query(UserInformationDB).all()
-        user_slots_map = {user.user_id: user.slot_id for user in all_users}
+    filename = f"attendance_{start.isoformat()}_{end.isoformat()}.{format}"
+    media_type = EXPORT_FORMATS[format]
+    if gzip:
+        filename += ".gz"
+        media_type = "application/gzip"
 
-        # Preload existing records
-        user_date_pairs = {(log.id, log.date) for log in logs}
+    return StreamingResponse(
+        stream_attendance_export(
+            query,
+            export_format=format,
+            compress=gzip,
+            batch_size=settings.ATTENDANCE_EXPORT_BATCH_SIZE,
+            archived=archived
+        ),
+        media_type=media_type,
+        headers={"Content-Disposition": f'attachment; filename="{filename}"'}
+    )
 
-        existing_records = db.query(AttendanceRecordDB).filter(
-            tuple_(
-                AttendanceRecordDB.user_id,
-                AttendanceRecordDB.date
-            ).in_(user_date_pairs)
-        ).all()
+@router.get("/esp32/attendance/live")
+async def live_attendance_feed(request: Request, date: Optional[str] = None):
+    """
+    Server-Sent Events feed of check-ins and check-outs for one day (default today)
 
-        record_map = {
-            (r.user_id, r.date): r for r in existing_records
-        }
+    Opens with a `snapshot` event holding the day's records, then streams a
+    `checked_in` / `checked_out` event as each write commits, on any worker.
+    Events that race the snapshot may repeat a record it already holds;
+    clients key records by user_id. An `overflow` event means the client
+    fell behind and should reconnect.
+    """
+    try:
+        feed_date = parse_wire_date(date) if date else datetime.now().date()
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
 
-        created = 0
-        updated = 0
-        skipped = 0
-        fixed = 0
-
-        for log in logs:
-            key = (log.id, log.date)
-            
-            # ========== AUTO-FIX MISSING SLOT_ID ==========
-            slot_ids = log.slot_id
-            
-            # Check if slot_id is missing, None, or empty
-            needs_fix = (
-                slot_ids is None or 
-                slot_ids == [] or 
-                (isinstance(slot_ids, list) and len(slot_ids) == 0)
-            )
-            
-            if needs_fix:
-                # Look up in preloaded user map
-                if log.id in user_slots_map:
-                    slot_ids = user_slots_map[log.id]
-                    fixed += 1
-                    print(f"✓ Fixed slot_id for user {log.id} ({log.name}): {slot_ids}")
-                else:
-                    # User not found - skip this log
-                    skipped += 1
-                    print(f"✗ SKIP: User {log.id} ({log.name}) not in database")
-                    continue
-            
-            # Validate slot_ids before using
-            if not slot_ids or len(slot_ids) == 0:
-                skipped += 1
-                print(f"✗ SKIP: User {log.id} ({log.name}) has empty slot_ids")
-                continue
-            
-            # Process the log
-            try:
-                if key in record_map:
-                    # Update checkout time
-                    record = record_map[key]
-                    record.checked_out_time = log.time
-                    record.updated_at = datetime.now()
-                    updated += 1
-                else:
-                    # Create new record
-                    new_record = AttendanceRecordDB(
-                        name=log.name,
-                        user_id=log.id,
-                        slot_id=slot_ids,
-                        date=log.date,
-                        checked_in_time=log.time,
-                        checked_out_time=None,
-                        is_present=True
+    # Subscribe before reading the snapshot so no commit falls in between
+    queue = attendance_events.subscribe(settings.LIVE_FEED_CLIENT_BUFFER)
+
+    async def stream():
+        try:
+            records = await run_in_threadpool(_attendance_snapshot, feed_date)
+            yield sse_message("snapshot", {
+                "date": format_wire_date(feed_date),
+                "iso_date": feed_date.isoformat(),
+                "records": records
+            })
+
+            while True:
+                try:
+                    iso_date, message = await asyncio.wait_for(
+                        queue.get(), timeout=settings.LIVE_FEED_HEARTBEAT_SECONDS
                     )
-                    db.add(new_record)
-                    record_map[key] = new_record
-                    created += 1
-            except Exception as e:
-                print(f"✗ Error processing log for user {log.id}: {str(e)}")
-                skipped += 1
+                except asyncio.TimeoutError:
+                    if await request.is_disconnected():
+                        break
+                    yield ": keep-alive\n\n"
+                    continue
+
+                if (iso_date, message) == OVERFLOW:
+                    yield message
+                    break
+
+                if iso_date == feed_date.isoformat():
+                    yield message
+        finally:
+            attendance_events.unsubscribe(queue)
 
+    return StreamingResponse(
+        stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+def _attendance_snapshot(feed_date):
+    db = SessionLocal()
+    try:
+        records = db.query(AttendanceRecordDB).filter_by(date=feed_date).order_by(
+            AttendanceRecordDB.checked_in_time,
+            AttendanceRecordDB.id
+        ).all()
+        return [attendance_record_dict(record) for record in records]
+    finally:
+        db.close()
+
+async def attendance_upload_rows(request: Request):
+    """Decode a bulk attendance body according to its Content-Type"""
+    body = await request.body()
+    try:
+        return decode_attendance_payload(request.headers.get("content-type"), body)
+    except ValueError as e:
+        raise HTTPException(status_code=422, detail=f"Invalid bulk attendance body: {str(e)}")
+
+@router.post("/esp32/attendance/bulk")
+def log_bulk_attendance(
+    logs: list = Depends(attendance_upload_rows),
+    device_id: Optional[str] = None,
+    db: Session = Depends(get_db)
+):
+    """
+    Bulk attendance upload with automatic slot_id fixing
+
+    Logs are staged with COPY and merged set-based (see ingest_attendance_rows).
+    Accepts application/json (AttendanceBulkRequest), columnar JSON
+    (application/vnd.attendance.columnar+json) or columnar MessagePack
+    (application/msgpack); see app/utils/payload_codecs.py.
+    Pass ?device_id= to record the uploading device on new records.
+    """
+    try:
+        if not logs:
+            return {"success": True, "message": "No logs received", "processed": 0}
+
+        counters = ingest_attendance_rows(db, logs, device_id=device_id)
         db.commit()
+        response_cache.invalidate(*attendance_row_tags(logs))
 
-        message = f"Processed: {created} created, {updated} updated, {fixed} auto-fixed, {skipped} skipped"
+        message = (
+            f"Processed: {counters['created']} created, {counters['updated']} updated, "
+            f"{counters['fixed']} auto-fixed, {counters['skipped']} skipped"
+        )
         print(f"Bulk attendance: {message}")
 
         return {
             "success": True,
             "message": message,
             "total_logs": len(logs),
-            "created_records": created,
-            "updated_records": updated,
-            "fixed_records": fixed,
-            "skipped_records": skipped
+            "created_records": counters["created"],
+            "updated_records": counters["updated"],
+            "fixed_records": counters["fixed"],
+            "skipped_records": counters["skipped"]
         }
 
     except Exception as e:
@@ -261,6 +360,95 @@ def log_bulk_attendance(
         )
     
 
+@router.post("/esp32/attendance/bulk/stream")
+async def log_bulk_attendance_stream(
+    request: Request,
+    device_id: Optional[str] = None,
+    db: Session = Depends(get_db)
+):
+    """
+    Streaming bulk attendance upload (NDJSON, one AttendanceLogRequest per line)
+
+    Send Content-Encoding: gzip for a compressed body. Logs are parsed as the
+    body arrives and committed every ATTENDANCE_STREAM_CHUNK_SIZE logs, so
+    memory stays bounded however long the sync is.
+    """
+    chunk_size = settings.ATTENDANCE_STREAM_CHUNK_SIZE
+    totals = {"created": 0, "updated": 0, "fixed": 0, "skipped": 0}
+    chunks = []
+    invalid_lines = 0
+    error_details = []
+    total_logs = 0
+    rows = []
+
+    async def flush():
+        counters = await run_in_threadpool(_ingest_chunk, db, rows, device_id)
+        for key in totals:
+            totals[key] += counters[key]
+        chunks.append({"chunk": len(chunks) + 1, "logs": len(rows), **counters})
+        rows.clear()
+
+    try:
+        async for line_number, item in iter_ndjson(request):
+            try:
+                if isinstance(item, Exception):
+                    raise item
+                log = AttendanceLogRequest.model_validate(item)
+            except ValueError as e:
+                invalid_lines += 1
+                if len(error_details) < 20:
+                    error_details.append({"line": line_number, "error": str(e)})
+                continue
+
+            rows.append(AttendanceRow(log.name, log.id, log.slot_id, log.date, log.time))
+            total_logs += 1
+
+            if len(rows) >= chunk_size:
+                await flush()
+
+        if rows:
+            await flush()
+
+    except ValueError as e:
+        db.rollback()
+        raise HTTPException(
+            status_code=400,
+            detail=f"Malformed upload after {len(chunks)} committed chunks: {str(e)}"
+        )
+    except Exception as e:
+        db.rollback()
+        print(f"❌ Streaming bulk attendance error after {len(chunks)} chunks: {str(e)}")
+        raise HTTPException(
+            status_code=500,
+            detail=f"Streaming bulk attendance error after {len(chunks)} committed chunks: {str(e)}"
+        )
+
+    message = (
+        f"Processed: {totals['created']} created, {totals['updated']} updated, "
+        f"{totals['fixed']} auto-fixed, {totals['skipped']} skipped in {len(chunks)} chunks"
+    )
+    print(f"Streaming bulk attendance: {message}")
+
+    return {
+        "success": True,
+        "message": message,
+        "total_logs": total_logs,
+        "created_records": totals["created"],
+        "updated_records": totals["updated"],
+        "fixed_records": totals["fixed"],
+        "skipped_records": totals["skipped"],
+        "invalid_lines": invalid_lines,
+        "error_details": error_details or None,
+        "chunks": chunks
+    }
+
+def _ingest_chunk(db, rows, device_id=None):
+    counters = ingest_attendance_rows(db, rows, device_id=device_id)
+    db.commit()
+    response_cache.invalidate(*attendance_row_tags(rows))
+    return counters
+    
+
 # ==================== TRIGGER ENDPOINT ====================
 @router.post("/esp32/trigger-attendance-sync", response_model=TriggerAttendanceSyncResponse)
 def trigger_attendance_sync(
@@ -274,6 +462,8 @@ def trigger_attendance_sync(
     attendance logs from the last N days.
     
     The trigger is stored in database, and ESP32 polls for it.
+    Devices long-polling check-sync-trigger/{device_id}/wait are woken
+    as soon as the trigger commits.
     """
     try:
         # Store the trigger request in a sync_triggers table
@@ -310,7 +500,47 @@ def check_sync_trigger(
     
     ESP32 polls this endpoint every 30 seconds to see if frontend
     has requested an N-days sync.
+    The answer is cached until the device's triggers change, so repeated
+    polls do not hit the database; newer firmware should use the /wait
+    long-poll below instead.
+    """
+    pending = sync_trigger_waits.lookup(
+        device_id, lambda device: _pending_sync_trigger(db, device)
+    )
+    return _sync_trigger_check(pending)
+
+@router.get("/esp32/check-sync-trigger/{device_id}/wait", response_model=SyncTriggerCheck)
+async def wait_for_sync_trigger(
+    device_id: str,
+    timeout: int = Query(25, ge=0, le=settings.SYNC_TRIGGER_MAX_WAIT_SECONDS)
+):
     """
+    Long-poll for a pending sync trigger
+
+    Answers at once if a trigger is pending, otherwise holds the request
+    until trigger_attendance_sync creates one for this device (on any
+    worker, via LISTEN/NOTIFY) or `timeout` seconds pass. Devices re-poll
+    straight away after a has_trigger=false answer.
+    """
+    # Register before looking so a trigger created in between still wakes us
+    changed = sync_trigger_waits.register(device_id)
+    try:
+        pending = await run_in_threadpool(sync_trigger_waits.lookup, device_id, _fetch_sync_trigger)
+
+        if pending is None and timeout:
+            try:
+                await asyncio.wait_for(changed.wait(), timeout)
+            except asyncio.TimeoutError:
+                pass
+            else:
+                pending = await run_in_threadpool(sync_trigger_waits.lookup, device_id, _fetch_sync_trigger)
+    finally:
+        sync_trigger_waits.unregister(device_id, changed)
+
+    return _sync_trigger_check(pending)
+
+def _pending_sync_trigger(db, device_id):
+    """(trigger_id, days_to_sync) of the latest pending trigger, or None"""
     # Find the latest pending trigger for this device
     trigger = db.query(AttendanceSyncTriggerDB).filter_by(
         device_id=device_id,
@@ -319,12 +549,24 @@ def check_sync_trigger(
         AttendanceSyncTriggerDB.triggered_at.desc()
     ).first()
     
-    if trigger:
+    return (trigger.id, trigger.days_to_sync) if trigger else None
+
+def _fetch_sync_trigger(device_id):
+    # Own session: the long-poll holds no pooled connection while it waits
+    db = SessionLocal()
+    try:
+        return _pending_sync_trigger(db, device_id)
+    finally:
+        db.close()
+
+def _sync_trigger_check(pending):
+    if pending:
+        trigger_id, days_to_sync = pending
         return SyncTriggerCheck(
             has_trigger=True,
-            days_to_sync=trigger.days_to_sync,
-            trigger_id=trigger.id,
-            message=f"Sync requested for last {trigger.days_to_sync} days"
+            days_to_sync=days_to_sync,
+            trigger_id=trigger_id,
+            message=f"Sync requested for last {days_to_sync} days"
         )
     else:
         return SyncTriggerCheck(
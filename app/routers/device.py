@@ -1,6 +1,8 @@
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Query
+from sqlalchemy import func
 from sqlalchemy.orm import Session
-from datetime import datetime
+from datetime import datetime, time, timedelta
+from typing import Optional
 
 from app.core.database import get_db
 from app.models.device import DeviceStatusDB
@@ -9,8 +11,13 @@ from app.schemas.device import (
     StatusResponse,
     DeviceStatusInfo
 )
-from app.utils.device_status import calculate_device_status
-from app.core.config import OFFLINE_THRESHOLD_SECONDS
+from app.utils.device_status import calculate_device_status, device_status_dict, device_status_query
+from app.utils.device_outages import close_outages, outages_in_window
+from app.utils.heartbeat_buffer import heartbeat_buffer
+from app.utils.outage_sweeper import outage_sweeper
+from app.utils.pagination import DEFAULT_PAGE_SIZE, MAX_PAGE_SIZE, paginate
+from app.utils.wire_format import format_wire_date, parse_wire_range
+from app.core.config import settings
 
 router = APIRouter(prefix="/esp32", tags=["Device"])
 
@@ -22,6 +29,21 @@ def update_device_status(
 ):
     try:
         current_time = datetime.now()
+        outage_sweeper.heartbeat(data.device_id, current_time)
+
+        if settings.HEARTBEAT_BUFFER_ENABLED:
+            # No database work per heartbeat; heartbeat_buffer flushes in batches
+            heartbeat_buffer.record(data.device_id, current_time)
+
+            return StatusResponse(
+                success=True,
+                message="Heartbeat received",
+                device_id=data.device_id,
+                status="Online",
+                last_seen=current_time,
+                last_seen_seconds_ago=0,
+                is_online=True
+            )
 
         device = db.query(DeviceStatusDB).filter_by(
             device_id=data.device_id
@@ -39,6 +61,7 @@ def update_device_status(
             )
             db.add(device)
 
+        close_outages(db, {data.device_id: current_time})
         db.commit()
         db.refresh(device)
 
@@ -62,49 +85,124 @@ def get_device_status(
     device_id: str,
     db: Session = Depends(get_db)
 ):
-    device = db.query(DeviceStatusDB).filter_by(
-        device_id=device_id
-    ).first()
+    """Status computed in SQL from last_seen; reads never write"""
+    buffered = heartbeat_buffer.last_seen(device_id)
+    query, _ = device_status_query(db, {device_id: buffered} if buffered else None)
 
-    if not device:
-        raise HTTPException(status_code=404, detail="Device not found")
+    row = query.filter(DeviceStatusDB.device_id == device_id).first()
 
-    status_info = calculate_device_status(device)
+    if not row:
+        if buffered is None:
+            raise HTTPException(status_code=404, detail="Device not found")
 
-    # OPTIONAL: sync DB if stale
-    if device.status != status_info["status"]:
-        device.status = status_info["status"]
-        db.commit()
+        # First heartbeat not flushed yet
+        return DeviceStatusInfo(**calculate_device_status(
+            DeviceStatusDB(device_id=device_id, status="Online", last_seen=buffered)
+        ))
 
-    return DeviceStatusInfo(**status_info)
+    return DeviceStatusInfo(**device_status_dict(row))
 
 
 @router.get("/esp32/status")
-def get_all_devices_status(db: Session = Depends(get_db)):
-    devices = db.query(DeviceStatusDB).order_by(
-        DeviceStatusDB.last_seen.desc()
-    ).all()
+def get_all_devices_status(
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    cursor: Optional[str] = None,
+    status: Optional[str] = Query(None, pattern="^(online|offline)$"),
+    db: Session = Depends(get_db)
+):
+    """
+    Most recently seen devices first, one page at a time;
+    pass next_cursor back as cursor
+    status=online|offline filters on last_seen against
+    OFFLINE_THRESHOLD_SECONDS. Status, seconds-ago and counts are computed
+    in SQL (buffered heartbeats included) and the request writes nothing;
+    order follows the flushed last_seen. Not cached: seconds-ago and
+    online/offline move with the clock, not only with heartbeats.
+    """
+    query, online = device_status_query(db, heartbeat_buffer.snapshot())
+
+    if status == "online":
+        query = query.filter(online)
+    elif status == "offline":
+        query = query.filter(~online)
+
+    try:
+        rows, next_cursor = paginate(
+            query,
+            [DeviceStatusDB.last_seen, DeviceStatusDB.id],
+            [datetime.fromisoformat, int],
+            limit,
+            cursor,
+            descending=True
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
 
-    device_list = []
-    online_count = 0
+    # Counts cover every device, not just this page
+    total_devices, online_count = db.query(
+        func.count(DeviceStatusDB.id),
+        func.count(DeviceStatusDB.id).filter(online)
+    ).one()
 
-    for device in devices:
-        status_info = calculate_device_status(device)
+    return {
+        "total_devices": total_devices,
+        "online_devices": online_count,
+        "offline_devices": total_devices - online_count,
+        "devices": [device_status_dict(row) for row in rows],
+        "limit": limit,
+        "next_cursor": next_cursor
+    }
 
-        # Optional DB sync
-        if device.status != status_info["status"]:
-            device.status = status_info["status"]
 
-        if status_info["is_online"]:
-            online_count += 1
+@router.get("/esp32/status/{device_id}/uptime")
+def get_device_uptime(
+    device_id: str,
+    start_date: str,
+    end_date: str,
+    db: Session = Depends(get_db)
+):
+    """
+    Availability of a device between two dates (inclusive)
 
-        device_list.append(status_info)
+    Read from the device's outage intervals only; time before the device
+    was first seen and after now is left out of the window.
+    """
+    try:
+        start, end = parse_wire_range(start_date, end_date)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    device = db.query(DeviceStatusDB).filter_by(device_id=device_id).first()
+    if not device:
+        raise HTTPException(status_code=404, detail="Device not found")
+
+    now = datetime.now()
+    window_start = datetime.combine(start, time.min)
+    if device.created_at and device.created_at > window_start:
+        window_start = device.created_at
+    window_end = min(datetime.combine(end + timedelta(days=1), time.min), now)
 
-    db.commit()
+    total_seconds = max((window_end - window_start).total_seconds(), 0)
+    outages = outages_in_window(db, device_id, window_start, window_end, now) if total_seconds else []
+    offline_seconds = sum(float(outage.offline_seconds) for outage in outages)
 
     return {
-        "total_devices": len(device_list),
-        "online_devices": online_count,
-        "offline_devices": len(device_list) - online_count,
-        "devices": device_list
+        "device_id": device_id,
+        "start_date": format_wire_date(start),
+        "end_date": format_wire_date(end),
+        "window_start": window_start,
+        "window_end": window_end,
+        "total_seconds": int(total_seconds),
+        "offline_seconds": int(offline_seconds),
+        "online_seconds": int(total_seconds - offline_seconds),
+        "availability_percent": round(100 * (1 - offline_seconds / total_seconds), 3) if total_seconds else None,
+        "outages": [
+            {
+                "started_at": outage.started_at,
+                "ended_at": outage.ended_at,
+                "ongoing": outage.ended_at is None,
+                "offline_seconds": int(outage.offline_seconds)
+            }
+            for outage in outages
+        ]
     }
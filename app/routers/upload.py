@@ -0,0 +1,317 @@
+import hashlib
+from fastapi import APIRouter, Depends, HTTPException, Header, Path, Request
+from sqlalchemy import func
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+from datetime import datetime
+from typing import Optional
+from app.core.database import get_db
+from app.models.attendance import AttendanceSyncTriggerDB
+from app.models.upload import UploadSessionDB, UploadChunkDB
+from app.schemas.upload import (OpenUploadSessionRequest,UploadSessionResponse,UploadChunkResponse,CompleteUploadSessionRequest)
+from app.utils.attendance_ingest import ingest_attendance_rows
+from app.utils.payload_codecs import decode_attendance_payload, decode_user_payload
+from app.utils.response_cache import attendance_row_tags, response_cache
+from app.utils.user_roster import user_roster
+from app.utils.user_sync import sync_users
+
+router = APIRouter(prefix="/esp32/upload", tags=["Upload"])
+
+
+async def read_raw_body(request: Request) -> bytes:
+    return await request.body()
+
+
+# ==================== UPLOAD SESSION ENDPOINTS ====================
+
+@router.post("/session", response_model=UploadSessionResponse)
+def open_upload_session(
+    data: OpenUploadSessionRequest,
+    db: Session = Depends(get_db)
+):
+    """
+    POST endpoint for ESP32 to open a chunked upload session
+
+    When trigger_id is given and an open session already exists for it, that
+    session is returned instead so an interrupted sync resumes at next_chunk.
+    """
+    try:
+        if data.trigger_id is not None:
+            trigger = db.query(AttendanceSyncTriggerDB).filter_by(
+                id=data.trigger_id
+            ).first()
+
+            if not trigger:
+                raise HTTPException(status_code=404, detail="Trigger not found")
+
+            existing = db.query(UploadSessionDB).filter_by(
+                device_id=data.device_id,
+                kind=data.kind,
+                trigger_id=data.trigger_id,
+                status="open"
+            ).order_by(UploadSessionDB.id.desc()).first()
+
+            if existing:
+                return _session_response(db, existing, f"Resuming upload session {existing.id}")
+
+        session = UploadSessionDB(
+            device_id=data.device_id,
+            kind=data.kind,
+            trigger_id=data.trigger_id,
+            total_chunks=data.total_chunks,
+            status="open",
+            rows_applied=0
+        )
+
+        db.add(session)
+        db.commit()
+        db.refresh(session)
+
+        return _session_response(db, session, f"Upload session {session.id} opened")
+
+    except HTTPException:
+        raise
+    except Exception as e:
+        db.rollback()
+        raise HTTPException(status_code=500, detail=f"Upload session error: {str(e)}")
+
+@router.get("/session/{session_id}", response_model=UploadSessionResponse)
+def get_upload_session(
+    session_id: int,
+    db: Session = Depends(get_db)
+):
+    """GET endpoint to read acknowledged chunks and the next chunk to send"""
+    session = db.query(UploadSessionDB).filter_by(id=session_id).first()
+
+    if not session:
+        raise HTTPException(status_code=404, detail="Upload session not found")
+
+    return _session_response(db, session, f"Upload session {session.id} is {session.status}")
+
+@router.put("/session/{session_id}/chunk/{chunk_index}", response_model=UploadChunkResponse)
+def upload_chunk(
+    session_id: int,
+    chunk_index: int = Path(..., ge=0),
+    body: bytes = Depends(read_raw_body),
+    x_content_sha256: Optional[str] = Header(None),
+    content_type: Optional[str] = Header(None),
+    db: Session = Depends(get_db)
+):
+    """
+    PUT endpoint for ESP32 to upload one numbered chunk
+
+    Body is {"logs": [...]} for attendance sessions or {"users": [...]} for
+    user sessions, or the columnar JSON / MessagePack forms of either. The SHA-256 of the body is the chunk's content hash; send it
+    in X-Content-SHA256 to have the server verify it. A chunk that was already
+    applied with the same hash is acknowledged without touching the data.
+    """
+    content_hash = hashlib.sha256(body).hexdigest()
+
+    if x_content_sha256 and x_content_sha256.lower() != content_hash:
+        raise HTTPException(status_code=400, detail="Content hash mismatch, resend the chunk")
+
+    session = db.query(UploadSessionDB).filter_by(id=session_id).first()
+
+    if not session:
+        raise HTTPException(status_code=404, detail="Upload session not found")
+
+    existing = db.query(UploadChunkDB).filter_by(
+        session_id=session_id,
+        chunk_index=chunk_index
+    ).first()
+
+    if existing:
+        return _acknowledge_existing(session, existing, content_hash)
+
+    if session.status != "open":
+        raise HTTPException(status_code=409, detail=f"Upload session is {session.status}")
+
+    if session.total_chunks is not None and chunk_index >= session.total_chunks:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Chunk {chunk_index} out of range (total_chunks={session.total_chunks})"
+        )
+
+    try:
+        rows = _parse_chunk(session.kind, content_type, body)
+    except ValueError as e:
+        raise HTTPException(status_code=422, detail=f"Invalid chunk body: {str(e)}")
+
+    # Claim the chunk first; a concurrent retry of the same chunk blocks here
+    chunk = UploadChunkDB(
+        session_id=session_id,
+        chunk_index=chunk_index,
+        content_hash=content_hash,
+        row_count=len(rows)
+    )
+    db.add(chunk)
+    try:
+        db.flush()
+    except IntegrityError:
+        # Another request applied the same chunk first
+        db.rollback()
+        existing = db.query(UploadChunkDB).filter_by(
+            session_id=session_id,
+            chunk_index=chunk_index
+        ).first()
+        if not existing:
+            raise HTTPException(status_code=409, detail=f"Chunk {chunk_index} could not be claimed")
+        db.refresh(session)
+        return _acknowledge_existing(session, existing, content_hash)
+    except Exception as e:
+        db.rollback()
+        raise HTTPException(status_code=500, detail=f"Chunk upload error: {str(e)}")
+
+    try:
+        if session.kind == "attendance":
+            result = ingest_attendance_rows(db, rows, device_id=session.device_id)
+        else:
+            result = sync_users(db, rows)
+
+        chunk.result = result
+
+        session.rows_applied = UploadSessionDB.rows_applied + len(rows)
+        session.updated_at = datetime.now()
+
+        if session.trigger_id is not None:
+            # Trigger progress moves chunk by chunk
+            db.query(AttendanceSyncTriggerDB).filter_by(
+                id=session.trigger_id
+            ).update({
+                AttendanceSyncTriggerDB.logs_synced: func.coalesce(AttendanceSyncTriggerDB.logs_synced, 0) + len(rows)
+            }, synchronize_session=False)
+
+        db.commit()
+        db.refresh(session)
+
+        if session.kind == "attendance":
+            response_cache.invalidate(*attendance_row_tags(rows))
+        else:
+            response_cache.invalidate("users")
+            user_roster.invalidate()
+
+        return UploadChunkResponse(
+            success=True,
+            message=f"Chunk {chunk_index} applied ({len(rows)} rows)",
+            session_id=session_id,
+            chunk_index=chunk_index,
+            duplicate=False,
+            row_count=len(rows),
+            result=result,
+            rows_applied=session.rows_applied
+        )
+
+    except Exception as e:
+        # Ingestion errors, IntegrityError included, are not a duplicate chunk
+        db.rollback()
+        raise HTTPException(status_code=500, detail=f"Chunk upload error: {str(e)}")
+
+@router.post("/session/{session_id}/complete", response_model=UploadSessionResponse)
+def complete_upload_session(
+    session_id: int,
+    data: CompleteUploadSessionRequest,
+    db: Session = Depends(get_db)
+):
+    """
+    POST endpoint for ESP32 to close an upload session
+    Also completes the linked sync trigger with the total rows uploaded
+    """
+    try:
+        session = db.query(UploadSessionDB).filter_by(id=session_id).first()
+
+        if not session:
+            raise HTTPException(status_code=404, detail="Upload session not found")
+
+        if data.success and session.total_chunks is not None:
+            acknowledged = set(_acknowledged_chunks(db, session_id))
+            missing = [i for i in range(session.total_chunks) if i not in acknowledged]
+
+            if missing:
+                raise HTTPException(
+                    status_code=409,
+                    detail=f"Missing chunks: {missing}"
+                )
+
+        session.status = "completed" if data.success else "failed"
+        session.completed_at = datetime.now()
+
+        if session.trigger_id is not None:
+            trigger = db.query(AttendanceSyncTriggerDB).filter_by(
+                id=session.trigger_id
+            ).first()
+
+            if trigger:
+                trigger.status = session.status
+                trigger.completed_at = session.completed_at
+                trigger.logs_synced = session.rows_applied
+                trigger.error_message = data.error_message if not data.success else None
+
+        db.commit()
+        db.refresh(session)
+
+        return _session_response(db, session, f"Upload session {session.id} marked as {session.status}")
+
+    except HTTPException:
+        raise
+    except Exception as e:
+        db.rollback()
+        raise HTTPException(status_code=500, detail=f"Upload completion error: {str(e)}")
+
+
+# ==================== HELPERS ====================
+
+def _parse_chunk(kind, content_type, body):
+    if kind == "attendance":
+        return decode_attendance_payload(content_type, body)
+
+    return decode_user_payload(content_type, body)
+
+def _acknowledged_chunks(db, session_id):
+    return [
+        index for (index,) in db.query(UploadChunkDB.chunk_index).filter_by(
+            session_id=session_id
+        ).order_by(UploadChunkDB.chunk_index)
+    ]
+
+def _acknowledge_existing(session, chunk, content_hash):
+    if chunk.content_hash != content_hash:
+        raise HTTPException(
+            status_code=409,
+            detail=f"Chunk {chunk.chunk_index} was already applied with different content"
+        )
+
+    return UploadChunkResponse(
+        success=True,
+        message=f"Chunk {chunk.chunk_index} already applied",
+        session_id=session.id,
+        chunk_index=chunk.chunk_index,
+        duplicate=True,
+        row_count=chunk.row_count,
+        result=chunk.result,
+        rows_applied=session.rows_applied
+    )
+
+def _session_response(db, session, message):
+    acknowledged = _acknowledged_chunks(db, session.id)
+
+    # Lowest chunk index not yet acknowledged
+    next_chunk = 0
+    for index in acknowledged:
+        if index != next_chunk:
+            break
+        next_chunk += 1
+
+    return UploadSessionResponse(
+        success=True,
+        message=message,
+        session_id=session.id,
+        device_id=session.device_id,
+        kind=session.kind,
+        trigger_id=session.trigger_id,
+        status=session.status,
+        total_chunks=session.total_chunks,
+        rows_applied=session.rows_applied,
+        acknowledged_chunks=acknowledged,
+        next_chunk=next_chunk,
+        created_at=session.created_at
+    )
@@ -1,11 +1,25 @@
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Query, Request
+from sqlalchemy import func
+from sqlalchemy.exc import IntegrityError
 from sqlalchemy.orm import Session
 from app.core.database import get_db
-from app.models.user import UserInformationDB,AdminInformationDB
-from app.models.attendance import AttendanceRecordDB
+from app.models.user import UserInformationDB,AdminInformationDB,FingerprintSlotDB
+from app.models.attendance import AttendanceRecordDB,DailyAttendanceSummaryDB,AttendancePurgeJobDB
 from app.utils.admin import *
-from app.schemas.user import (UserInfoResponse,CreateUserRequest,DeleteUserResponse,DeleteUserRequest,UserInfo,BulkSyncResponse,BulkSyncRequest,BulkUserSyncDeleteResponse,BulkUserSyncDeleteRequest,AdminCreateRequest,AdminLoginRequest,AdminLoginResponse,AdminUpdateRequest,UpdateUserRequest)
-from datetime import datetime
+from app.utils.user_sync import reconcile_users, sync_users
+from app.utils.attendance_purge import attendance_purger, delete_user_attendance, purge_job_dict
+from app.utils.attendance_archive import attendance_archive, paginate_with_archive
+from app.utils.payroll import compute_payroll, payroll_month_cache
+from app.utils.presence_index import month_range, parse_month, perfect_attendance, roster_presence, user_presence
+from app.utils.payload_codecs import decode_user_payload
+from app.utils.wire_format import format_wire_date, format_wire_time, parse_wire_range
+from app.utils.pagination import DEFAULT_PAGE_SIZE, MAX_PAGE_SIZE, paginate
+from app.utils.response_cache import attendance_date_tags, cached_response, response_cache
+from app.utils.user_roster import user_roster
+from app.core.config import settings
+from app.schemas.user import (UserInfoResponse,CreateUserRequest,DeleteUserResponse,DeleteUserRequest,UserInfo,BulkSyncResponse,BulkUserSyncDeleteResponse,BulkUserSyncDeleteRequest,AdminCreateRequest,AdminLoginRequest,AdminLoginResponse,AdminUpdateRequest,UpdateUserRequest)
+from datetime import date, datetime, timedelta
+from typing import Optional
 router = APIRouter(prefix="/esp32/user", tags=["User"])
 
 
@@ -33,19 +47,15 @@ def create_user(
                 user=None
             )
         
-        # Check if ANY of the slot IDs are already occupied
-        for slot in data.slot_id:
-            # Query for users where slot_id array contains this slot
-            existing_slot = db.query(UserInformationDB).filter(
-                UserInformationDB.slot_id.contains([slot])
-            ).first()
-            
-            if existing_slot:
-                return UserInfoResponse(
-                    success=False,
-                    message=f"Slot ID {slot} is already occupied by {existing_slot.name}",
-                    user=None
-                )
+        # Check if ANY of the slot IDs are already occupied (one primary-key lookup)
+        occupied = _occupied_slot(db, data.slot_id)
+        
+        if occupied:
+            return UserInfoResponse(
+                success=False,
+                message=f"Slot ID {occupied.slot_id} is already occupied by {occupied.name}",
+                user=None
+            )
         
         # Create new user with slot_id array
         new_user = UserInformationDB(
@@ -58,8 +68,19 @@ def create_user(
         )
         
         db.add(new_user)
-        db.commit()
+        try:
+            db.commit()
+        except IntegrityError:
+            # Lost a race for the user_id or a slot; fingerprint_slots enforces it
+            db.rollback()
+            return UserInfoResponse(
+                success=False,
+                message=f"User {data.id} or one of slots {data.slot_id} was taken concurrently",
+                user=None
+            )
         db.refresh(new_user)
+        response_cache.invalidate("users")
+        user_roster.patch(db, upsert=[new_user])
         
         return UserInfoResponse(
             success=True,
@@ -78,14 +99,34 @@ def create_user(
         db.rollback()
         raise HTTPException(status_code=500, detail=f"Database error: {str(e)}")
 
+def _occupied_slot(db, slot_ids, exclude_user_id=None):
+    """First of slot_ids already assigned (to a user other than exclude_user_id), with its owner's name"""
+    query = db.query(
+        FingerprintSlotDB.slot_id,
+        UserInformationDB.name
+    ).join(
+        UserInformationDB,
+        UserInformationDB.user_id == FingerprintSlotDB.user_id
+    ).filter(
+        FingerprintSlotDB.slot_id.in_(slot_ids)
+    )
+
+    if exclude_user_id is not None:
+        query = query.filter(FingerprintSlotDB.user_id != exclude_user_id)
+
+    return query.order_by(FingerprintSlotDB.slot_id).first()
+
 @router.delete("/esp32/user/delete", response_model=DeleteUserResponse)
 def delete_user(
     data: DeleteUserRequest,
+    background: bool = False,
     db: Session = Depends(get_db)
 ):
     """
     DELETE endpoint for ESP32 to delete user from database
     Deletes user with all 4 fingerprint templates and attendance records
+    With ?background=true the user is removed at once and the attendance
+    is purged in batches; follow it at /admin/purges/{purge_job_id}
     """
     try:
         user_to_delete = db.query(UserInformationDB).filter_by(
@@ -118,25 +159,36 @@ def delete_user(
             "salary": user_to_delete.salary
         }
         
-        # Delete all attendance records
-        attendance_records = db.query(AttendanceRecordDB).filter_by(
-            user_id=data.user_id
-        ).all()
-        
-        attendance_count = len(attendance_records)
-        
-        for record in attendance_records:
-            db.delete(record)
+        if background:
+            # Attendance goes later in bounded batches
+            job = attendance_purger.enqueue(db, data.user_id)
+            per_date = []
+        else:
+            # Delete all attendance records in one statement
+            job = None
+            per_date = delete_user_attendance(db, data.user_id)
         
         # Delete user
         db.delete(user_to_delete)
         db.commit()
+        response_cache.invalidate("users", *attendance_date_tags(*(d for d, _ in per_date)))
+        user_roster.patch(db, remove=[data.user_id])
+
+        if job is not None:
+            attendance_purger.start()
+            return DeleteUserResponse(
+                success=True,
+                message=f"User {deleted_user_info['name']} deleted; purging {job.total_records} attendance logs in the background",
+                deleted_user=deleted_user_info,
+                attendance_logs_deleted=0,
+                purge_job_id=job.id
+            )
         
         return DeleteUserResponse(
             success=True,
             message=f"User {deleted_user_info['name']} and all {len(data.slot_id)} fingerprint templates deleted successfully",
             deleted_user=deleted_user_info,
-            attendance_logs_deleted=attendance_count
+            attendance_logs_deleted=sum(count for _, count in per_date)
         )
         
     except Exception as e:
@@ -151,10 +203,14 @@ def get_user_by_id(
 ):
     """
     GET endpoint to retrieve user information by user_id
+    Served from the in-process roster when USER_ROSTER_ENABLED
     """
-    user = db.query(UserInformationDB).filter_by(
-        user_id=user_id
-    ).first()
+    if settings.USER_ROSTER_ENABLED:
+        user = user_roster.by_user_id(user_id)
+    else:
+        user = db.query(UserInformationDB).filter_by(
+            user_id=user_id
+        ).first()
     
     if not user:
         raise HTTPException(
@@ -165,7 +221,7 @@ def get_user_by_id(
     return UserInfo(
         name=user.name,
         user_id=user.user_id,
-        slot_id=user.slot_id,
+        slot_id=list(user.slot_id),
         date=user.date,
         time=user.time,
         salary=user.salary,
@@ -179,13 +235,19 @@ def get_user_by_slot(
 ):
     """
     GET endpoint to retrieve user information by ANY slot_id
-    Searches through slot_id arrays to find which user owns this slot
+    Looks the slot up in the in-process roster, or in fingerprint_slots
+    (primary key) when USER_ROSTER_ENABLED is off
     Useful when fingerprint is detected and you need user details
     """
-    # Find user where slot_id array contains this slot
-    user = db.query(UserInformationDB).filter(
-        UserInformationDB.slot_id.contains([slot_id])
-    ).first()
+    if settings.USER_ROSTER_ENABLED:
+        user = user_roster.by_slot(slot_id)
+    else:
+        user = db.query(UserInformationDB).join(
+            FingerprintSlotDB,
+            FingerprintSlotDB.user_id == UserInformationDB.user_id
+        ).filter(
+            FingerprintSlotDB.slot_id == slot_id
+        ).first()
     
     if not user:
         raise HTTPException(
@@ -196,7 +258,7 @@ def get_user_by_slot(
     return {
         "name": user.name,
         "user_id": user.user_id,
-        "slot_id": user.slot_id,
+        "slot_id": list(user.slot_id),
         "scanned_slot": slot_id,  # Which specific slot was scanned
         "date": user.date,
         "time": user.time,
@@ -204,97 +266,41 @@ def get_user_by_slot(
         "created_at": user.created_at.isoformat()
     }
 
+async def user_upload_rows(request: Request):
+    """Decode a user sync body according to its Content-Type"""
+    body = await request.body()
+    try:
+        return decode_user_payload(request.headers.get("content-type"), body)
+    except ValueError as e:
+        raise HTTPException(status_code=422, detail=f"Invalid user sync body: {str(e)}")
+
 @router.post("/esp32/users/usersync", response_model=BulkSyncResponse)
 def bulk_sync_users(
-    data: BulkSyncRequest,
+    users: list = Depends(user_upload_rows),
     db: Session = Depends(get_db)
 ):
     """
     POST endpoint for ESP32 to sync all users from SD card to database
     Handles users with multiple fingerprint templates (slot_id as array)
+    Accepts application/json (BulkSyncRequest), columnar JSON or columnar
+    MessagePack; see app/utils/payload_codecs.py.
     """
     try:
-        total_received = len(data.users)
-        new_users_added = 0
-        existing_users_skipped = 0
-        errors = 0
-        error_details = []
-        
-        # Get all existing user_ids
-        existing_user_ids = set(
-            uid[0] for uid in db.query(UserInformationDB.user_id).all()
-        )
-        
-        # Get all existing slot IDs (flattened from arrays)
-        all_existing_slots = set()
-        all_slot_arrays = db.query(UserInformationDB.slot_id).all()
-        for slot_array in all_slot_arrays:
-            if slot_array[0]:  # Check if not None
-                all_existing_slots.update(slot_array[0])
-        
-        new_users_to_add = []
-        
-        for idx, user_data in enumerate(data.users):
-            try:
-                # Check if user already exists
-                if user_data.id in existing_user_ids:
-                    existing_users_skipped += 1
-                    continue
-                
-                # Check if ANY slot is already occupied
-                slot_conflict = False
-                for slot in user_data.slot_id:
-                    if slot in all_existing_slots:
-                        errors += 1
-                        error_details.append({
-                            "index": idx,
-                            "user_id": user_data.id,
-                            "name": user_data.name,
-                            "error": f"Slot {slot} already occupied"
-                        })
-                        slot_conflict = True
-                        break
-                
-                if slot_conflict:
-                    continue
-                
-                # Prepare new user
-                new_user = UserInformationDB(
-                    name=user_data.name,
-                    user_id=user_data.id,
-                    slot_id=user_data.slot_id,  # Array of slots
-                    date=user_data.date,
-                    time=user_data.time,
-                    salary=None
-                )
-                new_users_to_add.append(new_user)
-                
-                # Update tracking
-                existing_user_ids.add(user_data.id)
-                all_existing_slots.update(user_data.slot_id)
-                
-            except Exception as e:
-                errors += 1
-                error_details.append({
-                    "index": idx,
-                    "user_id": user_data.id if hasattr(user_data, 'id') else None,
-                    "error": str(e)
-                })
-        
-        # Bulk insert
-        if new_users_to_add:
-            db.bulk_save_objects(new_users_to_add)
-            db.commit()
-            new_users_added = len(new_users_to_add)
+        result = sync_users(db, users)
+        db.commit()
+        response_cache.invalidate("users")
+        user_roster.invalidate()
+
+        new_users_added = result["new_users_added"]
         
         return BulkSyncResponse(
             success=True,
             message=f"Sync complete: {new_users_added} new users with {new_users_added * 4} templates added",
-            total_received=total_received,
+            total_received=result["total_received"],
             new_users_added=new_users_added,
-            existing_users_skipped=existing_users_skipped,
-            errors=errors,
-            error_details=error_details if error_details else None
+            existing_users_skipped=result["existing_users_skipped"],
+            errors=result["errors"],
+            error_details=result["error_details"] or None
         )
         
     except Exception as e:
@@ -302,14 +308,29 @@ def bulk_sync_users(
         raise HTTPException(status_code=500, detail=f"Bulk sync error: {str(e)}")
 
 @router.get("/esp32/users")
-def get_all_users(db: Session = Depends(get_db)):
+@cached_response(("users",))
+def get_all_users(
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    cursor: Optional[str] = None,
+    db: Session = Depends(get_db)
+):
     """
     GET endpoint to retrieve all enrolled users
     Now includes slot_id arrays
+
+    Newest first, one page at a time; pass next_cursor back as cursor
     """
-    users = db.query(UserInformationDB).order_by(
-        UserInformationDB.created_at.desc()
-    ).all()
+    try:
+        users, next_cursor = paginate(
+            db.query(UserInformationDB),
+            [UserInformationDB.created_at, UserInformationDB.id],
+            [datetime.fromisoformat, int],
+            limit,
+            cursor,
+            descending=True
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
     
     user_list = []
     for user in users:
@@ -324,17 +345,23 @@ def get_all_users(db: Session = Depends(get_db)):
             "created_at": user.created_at.isoformat()
         })
     
-    total_templates = sum(len(user.slot_id) for user in users)
+    total_users, total_templates = db.query(
+        func.count(UserInformationDB.id),
+        func.coalesce(func.sum(func.cardinality(UserInformationDB.slot_id)), 0)
+    ).one()
     
     return {
-        "total_users": len(user_list),
+        "total_users": total_users,
         "total_fingerprint_templates": total_templates,
-        "users": user_list
+        "users": user_list,
+        "limit": limit,
+        "next_cursor": next_cursor
     }
 
 @router.delete("/esp32/users/sync-delete", response_model=BulkUserSyncDeleteResponse)
 def bulk_sync_delete_users(
     data: BulkUserSyncDeleteRequest,
+    dry_run: bool = False,
     db: Session = Depends(get_db)
 ):
     """
@@ -342,55 +369,43 @@ def bulk_sync_delete_users(
 
     ESP32 sends ALL users currently present on SD card.
     Any user existing in DB but missing from SD card is DELETED.
+    With ?dry_run=true nothing is deleted; the response reports what would be.
     """
 
-    try:
-        sd_users = data.users
-
-        # Safety check
-        if not sd_users:
-            raise HTTPException(
-                status_code=400,
-                detail="SD user list is empty. Aborting for safety."
-            )
-
-        # -------- Step 1: Build lookup from SD card --------
-        sd_user_ids = {user.id for user in sd_users}
-
-        # -------- Step 2: Fetch all DB users --------
-        db_users = db.query(UserInformationDB).all()
-
-        users_to_delete = []
-        attendance_to_delete = 0
-
-        for db_user in db_users:
-            if db_user.user_id not in sd_user_ids:
-                users_to_delete.append(db_user)
+    sd_users = data.users
 
-        # -------- Step 4: Delete attendance + users --------
-        for user in users_to_delete:
-            # Delete attendance records
-            attendance_records = db.query(AttendanceRecordDB).filter_by(
-                user_id=user.user_id
-            ).all()
-
-            attendance_to_delete += len(attendance_records)
+    # Safety check
+    if not sd_users:
+        raise HTTPException(
+            status_code=400,
+            detail="SD user list is empty. Aborting for safety."
+        )
 
-            for record in attendance_records:
-                db.delete(record)
+    try:
+        total_db_users = db.query(func.count(UserInformationDB.id)).scalar()
 
-            # Delete user
-            db.delete(user)
+        # One anti-join DELETE for attendance, one for users
+        result = reconcile_users(db, [user.id for user in sd_users], dry_run=dry_run)
 
-        db.commit()
+        if dry_run:
+            db.rollback()
+        else:
+            db.commit()
+            response_cache.invalidate("users", *attendance_date_tags(*result["attendance_dates"]))
+            user_roster.invalidate()
 
         return BulkUserSyncDeleteResponse(
             success=True,
-            message="Database reconciled successfully with SD card",
-            total_db_users=len(db_users),
+            message=(
+                "Dry run: nothing deleted" if dry_run
+                else "Database reconciled successfully with SD card"
+            ),
+            total_db_users=total_db_users,
             total_sd_users=len(sd_users),
-            users_deleted=len(users_to_delete),
-            attendance_logs_deleted=attendance_to_delete
+            users_deleted=len(result["user_ids"]),
+            attendance_logs_deleted=result["attendance_logs"],
+            dry_run=dry_run,
+            deleted_user_ids=result["user_ids"]
         )
 
     except Exception as e:
@@ -564,13 +579,27 @@ def update_admin(
         raise HTTPException(status_code=500, detail=f"Admin update error: {str(e)}")
 
 @router.get("/admin/list")
-def list_admins(db: Session = Depends(get_db)):
+def list_admins(
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    cursor: Optional[str] = None,
+    db: Session = Depends(get_db)
+):
     """
     Get all admin accounts
+    Ordered by id, one page at a time; pass next_cursor back as cursor
     """
     try:
-        admins = db.query(AdminInformationDB).all()
-        
+        admins, next_cursor = paginate(
+            db.query(AdminInformationDB),
+            [AdminInformationDB.id],
+            [int],
+            limit,
+            cursor
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    try:
         admin_list = []
         for admin in admins:
             admin_list.append({
@@ -580,9 +609,14 @@ def list_admins(db: Session = Depends(get_db)):
                 "created_at": admin.created_at.isoformat()
             })
         
+        # Counts every admin, not just this page
+        total_admins = db.query(func.count(AdminInformationDB.id)).scalar()
+
         return {
-            "total_admins": len(admin_list),
-            "admins": admin_list
+            "total_admins": total_admins,
+            "admins": admin_list,
+            "limit": limit,
+            "next_cursor": next_cursor
         }
         
     except Exception as e:
@@ -614,17 +648,13 @@ def update_user_admin(
             user.name = data.name
 
         if data.slot_id is not None:
-            for slot in data.slot_id:
-                existing_slot = db.query(UserInformationDB).filter(
-                    UserInformationDB.slot_id.contains([slot]),
-                    UserInformationDB.user_id != data.user_id
-                ).first()
-
-                if existing_slot:
-                    return {
-                        "success": False,
-                        "message": f"Slot {slot} is already used by {existing_slot.name}"
-                    }
+            occupied = _occupied_slot(db, data.slot_id, exclude_user_id=data.user_id)
+
+            if occupied:
+                return {
+                    "success": False,
+                    "message": f"Slot {occupied.slot_id} is already used by {occupied.name}"
+                }
 
             user.slot_id = data.slot_id
 
@@ -638,8 +668,17 @@ def update_user_admin(
         if data.salary is not None:
             user.salary = data.salary
 
-        db.commit()
+        try:
+            db.commit()
+        except IntegrityError:
+            db.rollback()
+            return {
+                "success": False,
+                "message": f"One of slots {data.slot_id} was assigned to another user concurrently"
+            }
         db.refresh(user)
+        response_cache.invalidate("users")
+        user_roster.patch(db, upsert=[user])
 
         return {
             "success": True,
@@ -662,44 +701,203 @@ def update_user_admin(
 # ==================== DASHBOARD STATS ENDPOINT ====================
 
 @router.get("/admin/stats/dashboard")
+@cached_response(lambda **_: ("users", f"attendance:{date.today().isoformat()}"))
 def get_dashboard_statistics(db: Session = Depends(get_db)):
     """
     Get dashboard statistics for admin panel
     Returns: total users, today's attendance stats
+
+    Today's counts come from the daily_attendance_summary rollup row
     """
     try:
         # Total users
         total_users = db.query(UserInformationDB).count()
         
-        # Today's date in DD/MM format
-        today = datetime.now().strftime("%d/%m")
-        
-        # Today's attendance records
-        today_records = db.query(AttendanceRecordDB).filter_by(
-            date=today
-        ).all()
+        today = datetime.now().date()
         
-        # Count check-ins and check-outs
-        checked_in = 0
-        checked_out = 0
-        
-        for record in today_records:
-            if record.checked_in_time:
-                checked_in += 1
-            if record.checked_out_time:
-                checked_out += 1
+        summary = db.query(DailyAttendanceSummaryDB).filter_by(date=today).first()
         
         return {
             "total_users": total_users,
-            "today_records": len(today_records),
-            "checked_in": checked_in,
-            "checked_out": checked_out,
-            "date": today
+            "today_records": summary.total_records if summary else 0,
+            "checked_in": summary.checked_in if summary else 0,
+            "checked_out": summary.checked_out if summary else 0,
+            "distinct_users": summary.distinct_users if summary else 0,
+            "date": format_wire_date(today)
         }
         
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Stats error: {str(e)}")
 
+@router.get("/admin/stats/cache")
+def get_cache_statistics():
+    """Response cache hit/miss counters, user roster and payroll month cache state"""
+    return {
+        "enabled": settings.RESPONSE_CACHE_ENABLED,
+        **response_cache.stats(),
+        "user_roster": {"enabled": settings.USER_ROSTER_ENABLED, **user_roster.stats()},
+        "payroll_months": payroll_month_cache.stats()
+    }
+
+@router.get("/admin/purges/{job_id}")
+def get_purge_progress(job_id: int, db: Session = Depends(get_db)):
+    """Progress of a background attendance purge started by delete_user"""
+    job = db.query(AttendancePurgeJobDB).filter_by(id=job_id).first()
+    if not job:
+        raise HTTPException(status_code=404, detail=f"Purge job {job_id} not found")
+    return purge_job_dict(job)
+
+@router.get("/admin/payroll")
+def get_payroll(
+    start_date: str,
+    end_date: str,
+    db: Session = Depends(get_db)
+):
+    """
+    Days present, hours worked and gross pay of every user for a date range
+    salary is the daily rate; gross pay is days present x rate (null without a rate)
+    """
+    try:
+        start, end = parse_wire_range(start_date, end_date)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    if (end - start).days > 366:
+        raise HTTPException(status_code=400, detail="Date range cannot exceed one year")
+
+    try:
+        users, summary = compute_payroll(db, start, end)
+        return {
+            "start_date": format_wire_date(start),
+            "end_date": format_wire_date(end),
+            "iso_start_date": start.isoformat(),
+            "iso_end_date": end.isoformat(),
+            "summary": summary,
+            "users": users
+        }
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Payroll error: {str(e)}")
+
+def _presence_months(start_month, end_month):
+    """Validated month list for the presence endpoints"""
+    try:
+        start = parse_month(start_month)
+        end = parse_month(end_month) if end_month else start
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    months = month_range(start, end)
+    if not months:
+        raise HTTPException(status_code=400, detail="end_month is before start_month")
+    if len(months) > 24:
+        raise HTTPException(status_code=400, detail="Month range cannot exceed 24 months")
+    return months
+
+@router.get("/admin/presence/user/{user_id}")
+def get_user_presence(
+    user_id: int,
+    start_month: str,
+    end_month: Optional[str] = None,
+    db: Session = Depends(get_db)
+):
+    """
+    Days present, which days, and longest streak per month for one user
+    Months are YYYY-MM; read from the presence bitmap index
+    """
+    months = _presence_months(start_month, end_month)
+    try:
+        return {"user_id": user_id, "months": user_presence(db, user_id, months)}
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Presence query error: {str(e)}")
+
+@router.get("/admin/presence/roster")
+def get_roster_presence(
+    start_month: str,
+    end_month: Optional[str] = None,
+    db: Session = Depends(get_db)
+):
+    """Days present and longest streak of every user over a month range"""
+    months = _presence_months(start_month, end_month)
+    try:
+        return {
+            "start_month": months[0].strftime("%Y-%m"),
+            "end_month": months[-1].strftime("%Y-%m"),
+            **roster_presence(db, months)
+        }
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Presence query error: {str(e)}")
+
+@router.get("/admin/presence/perfect")
+def get_perfect_attendance(
+    start_month: str,
+    end_month: Optional[str] = None,
+    db: Session = Depends(get_db)
+):
+    """
+    Users present on every working day of a month range
+    A working day is any day on which at least one user was present
+    """
+    months = _presence_months(start_month, end_month)
+    try:
+        return {
+            "start_month": months[0].strftime("%Y-%m"),
+            "end_month": months[-1].strftime("%Y-%m"),
+            **perfect_attendance(db, months)
+        }
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Presence query error: {str(e)}")
+
+@router.get("/admin/stats/daily")
+def get_daily_statistics(
+    start_date: str,
+    end_date: str,
+    db: Session = Depends(get_db)
+):
+    """
+    Per-day attendance counts for a date range (trend view)
+    Dates with no records are returned with zero counts
+    """
+    try:
+        start, end = parse_wire_range(start_date, end_date)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    if (end - start).days > 366:
+        raise HTTPException(status_code=400, detail="Date range cannot exceed one year")
+
+    try:
+        summaries = {
+            summary.date: summary
+            for summary in db.query(DailyAttendanceSummaryDB).filter(
+                DailyAttendanceSummaryDB.date >= start,
+                DailyAttendanceSummaryDB.date <= end
+            )
+        }
+
+        days = []
+        for offset in range((end - start).days + 1):
+            day = start + timedelta(days=offset)
+            summary = summaries.get(day)
+            days.append({
+                "date": format_wire_date(day),
+                "iso_date": day.isoformat(),
+                "total_records": summary.total_records if summary else 0,
+                "checked_in": summary.checked_in if summary else 0,
+                "checked_out": summary.checked_out if summary else 0,
+                "distinct_users": summary.distinct_users if summary else 0
+            })
+
+        return {
+            "start_date": format_wire_date(start),
+            "end_date": format_wire_date(end),
+            "iso_start_date": start.isoformat(),
+            "iso_end_date": end.isoformat(),
+            "days": days
+        }
+
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Stats error: {str(e)}")
+
 # ==================== INITIALIZATION ENDPOINT ====================
 
 @router.post("/admin/init")
@@ -748,45 +946,78 @@ def initialize_default_admin(db: Session = Depends(get_db)):
 def get_attendance_range(
     start_date: str,
     end_date: str,
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    cursor: Optional[str] = None,
     db: Session = Depends(get_db)
 ):
     """
     Get attendance records for a date range
     
     Args:
-        start_date: Start date in DD/MM format
+        start_date: Start date in DD/MM format (DD/MM/YYYY and YYYY-MM-DD also accepted)
         end_date: End date in DD/MM format
     
+        limit: Page size
+        cursor: next_cursor from the previous page
+    
     Returns:
-        All attendance records in the range
+        One page of attendance records in the range, ordered by (date, user_id)
+        and read through the matching index; total_records counts the whole range
     """
     try:
-        # Since dates are stored as strings (DD/MM), we need to fetch and filter
-        all_records = db.query(AttendanceRecordDB).order_by(
-            AttendanceRecordDB.date
-        ).all()
-        
-        # Filter records (simple string comparison for DD/MM format)
+        start, end = parse_wire_range(start_date, end_date)
+
+        # Months moved to cold storage are read from the archive files
+        records, next_cursor = paginate_with_archive(
+            attendance_archive,
+            db.query(AttendanceRecordDB).filter(
+                AttendanceRecordDB.date >= start,
+                AttendanceRecordDB.date <= end
+            ),
+            start,
+            end,
+            limit,
+            cursor
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    try:
+        # Totals cover the whole range, not just this page; archived rows
+        # count unless the table holds the same (user_id, date)
+        total_records = db.query(func.count(AttendanceRecordDB.id)).filter(
+            AttendanceRecordDB.date >= start,
+            AttendanceRecordDB.date <= end
+        ).scalar()
+        boundary = attendance_archive.boundary()
+        if boundary and start < boundary:
+            exclude = attendance_archive.superseded(db, start, end, boundary)
+            total_records += attendance_archive.count(start, end, exclude=exclude)
+
         filtered_records = []
         
-        for record in all_records:
-            if start_date <= record.date <= end_date:
-                filtered_records.append({
-                    "name": record.name,
-                    "user_id": record.user_id,
-                    "slot_id": record.slot_id,
-                    "date": record.date,
-                    "checked_in_time": record.checked_in_time,
-                    "checked_out_time": record.checked_out_time,
-                    "is_present": record.is_present
-                })
+        for record in records:
+            filtered_records.append({
+                "name": record.name,
+                "user_id": record.user_id,
+                "slot_id": record.slot_id,
+                "date": format_wire_date(record.date),
+                "iso_date": record.date.isoformat(),
+                "checked_in_time": format_wire_time(record.checked_in_time),
+                "checked_out_time": format_wire_time(record.checked_out_time),
+                "is_present": record.is_present
+            })
         
         return {
             "start_date": start_date,
             "end_date": end_date,
-            "total_records": len(filtered_records),
-            "records": filtered_records
+            "iso_start_date": start.isoformat(),
+            "iso_end_date": end.isoformat(),
+            "total_records": total_records,
+            "records": filtered_records,
+            "limit": limit,
+            "next_cursor": next_cursor
         }
         
     except Exception as e:
-        raise HTTPException(status_code=500, detail=f"Range query error: {str(e)}")
+        raise HTTPException(status_code=500, detail=f"Range query error: {str(e)}")
\ No newline at end of file
@@ -1,6 +1,7 @@
-from pydantic import BaseModel,Field
+from pydantic import BaseModel,Field,field_validator
 from typing import List, Optional
 from datetime import datetime
+from app.utils.wire_format import parse_wire_date, parse_wire_time
 
 class AttendanceLogRequest(BaseModel):
     name: str = Field(..., description="User's full name")
@@ -8,11 +9,27 @@ class AttendanceLogRequest(BaseModel):
     slot_id: Optional[List[int]] = Field(None, description="Fingerprint slot IDs (optional)")
     date: str = Field(..., description="Date (DD/MM format)")
     time: str = Field(..., description="Time (HH:MM format)")
+    device_id: Optional[str] = Field(None, description="Device that took the scan (optional)")
+
+class AttendanceScanRequest(AttendanceLogRequest):
+    # Only the single-scan endpoint rejects a bad date or time up front;
+    # bulk uploads count such logs as skipped instead
+    @field_validator("date")
+    @classmethod
+    def check_date(cls, value):
+        parse_wire_date(value)
+        return value
+
+    @field_validator("time")
+    @classmethod
+    def check_time(cls, value):
+        parse_wire_time(value)
+        return value
 
 class AttendanceLogResponse(BaseModel):
     success: bool
     message: str
-    action: str  # "checked_in", "checked_out", or "updated_checkout"
+    action: str  # "checked_in", "checked_out", "updated_checkout" or "queued"
     attendance_record: Optional[dict] = None
 
 class AttendanceBulkRequest(BaseModel):
@@ -0,0 +1,37 @@
+from pydantic import BaseModel, Field
+from typing import List, Optional
+from datetime import datetime
+
+class OpenUploadSessionRequest(BaseModel):
+    device_id: str = Field(default="ESP32_MAIN", description="Uploading device")
+    kind: str = Field(..., pattern="^(attendance|users)$", description="'attendance' or 'users'")
+    trigger_id: Optional[int] = Field(None, description="Sync trigger this upload answers (optional)")
+    total_chunks: Optional[int] = Field(None, ge=1, description="Number of chunks, if known up front")
+
+class UploadSessionResponse(BaseModel):
+    success: bool
+    message: str
+    session_id: int
+    device_id: str
+    kind: str
+    trigger_id: Optional[int] = None
+    status: str
+    total_chunks: Optional[int] = None
+    rows_applied: int
+    acknowledged_chunks: List[int]
+    next_chunk: int
+    created_at: datetime
+
+class UploadChunkResponse(BaseModel):
+    success: bool
+    message: str
+    session_id: int
+    chunk_index: int
+    duplicate: bool  # True when the chunk was already applied and nothing was written
+    row_count: int
+    result: Optional[dict] = None
+    rows_applied: int
+
+class CompleteUploadSessionRequest(BaseModel):
+    success: bool = Field(default=True, description="Whether the device finished the upload")
+    error_message: str = Field(default="", description="Error message if failed")
@@ -20,6 +20,7 @@ class DeleteUserResponse(BaseModel):
     message: str
     deleted_user: Optional[dict] = None
     attendance_logs_deleted: int = 0
+    purge_job_id: Optional[int] = None  # Set when attendance is purged in the background
 
 class UserInfoResponse(BaseModel):
     success: bool
@@ -73,6 +74,8 @@ class BulkUserSyncDeleteResponse(BaseModel):
     total_sd_users: int
     users_deleted: int
     attendance_logs_deleted: int
+    dry_run: bool = False
+    deleted_user_ids: Optional[List[int]] = None  # Would be deleted, on a dry run
 
 class AdminLoginRequest(BaseModel):
     username: str = Field(..., description="Admin username")
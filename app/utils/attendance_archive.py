@@ -0,0 +1,509 @@
+import heapq
+import itertools
+import json
+import os
+import shutil
+import threading
+import uuid
+from datetime import date, datetime, time, timedelta
+from typing import List, NamedTuple, Optional
+import numpy as np
+from sqlalchemy import text, tuple_
+from app.core.config import settings
+from app.models.attendance import AttendanceRecordDB
+from app.utils.pagination import decode_cursor, encode_cursor, paginate
+
+# ==================== ATTENDANCE COLD ARCHIVE ====================
+# Months older than ATTENDANCE_ARCHIVE_AFTER_MONTHS move out of
+# attendance_records into ATTENDANCE_ARCHIVE_DIR/YYYY-MM/: one .npy file per
+# column plus meta.json, written last so its presence marks a complete
+# month. Rows are sorted by (date, user_id) and the files are opened with
+# mmap, so a range read only pages in the slice it needs.
+#
+# Range reads merge the table over the archive. Archived months all lie
+# before boundary() (the first day after the newest archived month); table
+# rows dated before it (late scans for an archived month, a month that was
+# never archived) replace archived rows with the same (user_id, date) until
+# the next run folds them in.
+
+ARCHIVE_FORMAT_VERSION = 1
+
+# Any value; one worker at a time moves a month out of the table
+ARCHIVE_LOCK_KEY = 7231023
+
+ARCHIVABLE_MONTHS_SQL = """
+    SELECT DISTINCT date_trunc('month', date)::date AS month
+    FROM attendance_records
+    WHERE date < :before
+    ORDER BY month
+"""
+
+# Compared before and after the month is taken out of the table, so a write
+# that landed while the files were being written is never lost
+MONTH_FINGERPRINT_SQL = """
+    SELECT count(*), max(id), max(updated_at)
+    FROM attendance_records
+    WHERE date >= :start AND date < :end
+"""
+
+TABLE_KEYS_SQL = """
+    SELECT date, user_id
+    FROM attendance_records
+    WHERE date >= :start AND date <= :end
+"""
+
+PARTITION_ATTACHED_SQL = """
+    SELECT 1 FROM pg_inherits
+    WHERE inhrelid = to_regclass(:name) AND inhparent = 'attendance_records'::regclass
+"""
+
+
+class ArchivedRecord(NamedTuple):
+    """An attendance row read back from the archive (same fields as AttendanceRecordDB)"""
+    id: int
+    name: str
+    user_id: int
+    slot_id: List[int]
+    date: date
+    checked_in_time: Optional[time]
+    checked_out_time: Optional[time]
+    is_present: bool
+    device_id: Optional[str]
+    created_at: Optional[datetime]
+    updated_at: Optional[datetime]
+
+
+def next_month(month):
+    return date(month.year + month.month // 12, month.month % 12 + 1, 1)
+
+
+def row_keys(dates, user_ids):
+    """One int64 per (date, user_id) pair, ordered like the pairs"""
+    days = np.asarray(dates, dtype="datetime64[D]").astype(np.int64)
+    return (days << 32) + (np.asarray(user_ids, dtype=np.int64) + 2 ** 31)
+
+
+def record_key(row):
+    return (row.date, row.user_id)
+
+
+def _time_to_micros(value):
+    if value is None:
+        return -1
+    return ((value.hour * 60 + value.minute) * 60 + value.second) * 1_000_000 + value.microsecond
+
+
+def _micros_to_time(value):
+    if value < 0:
+        return None
+    seconds, micros = divmod(int(value), 1_000_000)
+    return time(seconds // 3600, seconds // 60 % 60, seconds % 60, micros)
+
+
+def encode_month(rows):
+    """Column arrays and meta for rows sorted by (date, user_id)"""
+    names = sorted({row.name for row in rows})
+    devices = sorted({row.device_id for row in rows if row.device_id is not None})
+    name_codes = {name: code for code, name in enumerate(names)}
+    device_codes = {device: code for code, device in enumerate(devices)}
+
+    slot_lengths = [len(row.slot_id or ()) for row in rows]
+
+    columns = {
+        "id": np.array([row.id for row in rows], dtype=np.int64),
+        "user_id": np.array([row.user_id for row in rows], dtype=np.int32),
+        "date": np.array([row.date for row in rows], dtype="datetime64[D]"),
+        # Microseconds since midnight, -1 for NULL
+        "checked_in_time": np.array([_time_to_micros(row.checked_in_time) for row in rows], dtype=np.int64),
+        "checked_out_time": np.array([_time_to_micros(row.checked_out_time) for row in rows], dtype=np.int64),
+        "is_present": np.array([bool(row.is_present) for row in rows], dtype=np.bool_),
+        # Dictionary codes into meta["names"] / meta["devices"], -1 for NULL
+        "name": np.array([name_codes[row.name] for row in rows], dtype=np.int32),
+        "device_id": np.array(
+            [device_codes[row.device_id] if row.device_id is not None else -1 for row in rows],
+            dtype=np.int32
+        ),
+        "created_at": np.array([row.created_at for row in rows], dtype="datetime64[us]"),
+        "updated_at": np.array([row.updated_at for row in rows], dtype="datetime64[us]"),
+        # slot_id arrays flattened; row i owns slot_values[slot_offsets[i]:slot_offsets[i + 1]]
+        "slot_offsets": np.concatenate(([0], np.cumsum(slot_lengths, dtype=np.int64))),
+        "slot_values": np.array([slot for row in rows for slot in (row.slot_id or ())], dtype=np.int32),
+    }
+
+    meta = {
+        "version": ARCHIVE_FORMAT_VERSION,
+        "rows": len(rows),
+        "names": names,
+        "devices": devices,
+        "archived_at": datetime.now().isoformat()
+    }
+    return columns, meta
+
+
+class ArchivedMonth:
+    """One archived month; columns are memory-mapped on first use"""
+
+    def __init__(self, path):
+        self.path = path
+        with open(os.path.join(path, "meta.json")) as f:
+            self.meta = json.load(f)
+        self.rows = self.meta["rows"]
+        self._columns = {}
+        self._keys = None
+
+    def column(self, name):
+        array = self._columns.get(name)
+        if array is None:
+            array = np.load(os.path.join(self.path, f"{name}.npy"), mmap_mode="r")
+            self._columns[name] = array
+        return array
+
+    def keys(self):
+        """row_keys of every row, ascending"""
+        if self._keys is None:
+            self._keys = row_keys(self.column("date"), self.column("user_id"))
+        return self._keys
+
+    def select(self, start, end, user_ids=None, device_id=None, after=None, exclude=None):
+        """
+        Positions of the rows in [start, end] matching the filters, in (date, user_id) order
+        exclude holds row_keys to leave out (rows superseded by the table)
+        """
+        if not self.rows:
+            return np.empty(0, dtype=np.int64)
+
+        dates = self.column("date")
+        lo = np.searchsorted(dates, np.datetime64(start, "D"), side="left")
+        hi = np.searchsorted(dates, np.datetime64(end, "D"), side="right")
+        if after is not None:
+            lo = max(lo, np.searchsorted(dates, np.datetime64(after[0], "D"), side="left"))
+        if lo >= hi:
+            return np.empty(0, dtype=np.int64)
+
+        keep = np.ones(hi - lo, dtype=np.bool_)
+        if after is not None:
+            # Keyset "(date, user_id) > after"; every date here is >= after's
+            keep &= (dates[lo:hi] > np.datetime64(after[0], "D")) | (self.column("user_id")[lo:hi] > after[1])
+        if user_ids:
+            keep &= np.isin(self.column("user_id")[lo:hi], list(user_ids))
+        if device_id is not None:
+            devices = self.meta["devices"]
+            if device_id not in devices:
+                return np.empty(0, dtype=np.int64)
+            keep &= self.column("device_id")[lo:hi] == devices.index(device_id)
+        if exclude is not None and len(exclude):
+            keep &= ~np.isin(self.keys()[lo:hi], exclude)
+
+        return lo + np.flatnonzero(keep)
+
+    def record(self, i):
+        offsets = self.column("slot_offsets")
+        device_code = int(self.column("device_id")[i])
+        return ArchivedRecord(
+            id=int(self.column("id")[i]),
+            name=self.meta["names"][int(self.column("name")[i])],
+            user_id=int(self.column("user_id")[i]),
+            slot_id=self.column("slot_values")[offsets[i]:offsets[i + 1]].tolist(),
+            date=self.column("date")[i].item(),
+            checked_in_time=_micros_to_time(self.column("checked_in_time")[i]),
+            checked_out_time=_micros_to_time(self.column("checked_out_time")[i]),
+            is_present=bool(self.column("is_present")[i]),
+            device_id=self.meta["devices"][device_code] if device_code >= 0 else None,
+            created_at=self.column("created_at")[i].item(),
+            updated_at=self.column("updated_at")[i].item()
+        )
+
+
+class AttendanceArchive:
+    """Directory of archived months with range reads across them"""
+
+    def __init__(self, directory):
+        self.directory = directory
+        self._open = {}  # month -> (meta mtime, ArchivedMonth)
+        self._lock = threading.Lock()
+
+    def _path(self, month):
+        return os.path.join(self.directory, month.strftime("%Y-%m"))
+
+    def months(self):
+        """Archived months (first days), oldest first"""
+        try:
+            names = os.listdir(self.directory)
+        except FileNotFoundError:
+            return []
+
+        months = []
+        for name in names:
+            try:
+                month = datetime.strptime(name, "%Y-%m").date()
+            except ValueError:
+                continue  # staging or retired directory
+            if os.path.exists(os.path.join(self.directory, name, "meta.json")):
+                months.append(month)
+        return sorted(months)
+
+    def boundary(self):
+        """First date served from the table, or None when nothing is archived"""
+        months = self.months()
+        return next_month(months[-1]) if months else None
+
+    def month(self, month):
+        """ArchivedMonth for month, or None; reopened when the month is rewritten"""
+        meta = os.path.join(self._path(month), "meta.json")
+        try:
+            mtime = os.stat(meta).st_mtime_ns
+        except FileNotFoundError:
+            return None
+
+        with self._lock:
+            cached = self._open.get(month)
+            if cached is None or cached[0] != mtime:
+                cached = (mtime, ArchivedMonth(self._path(month)))
+                self._open[month] = cached
+            return cached[1]
+
+    def superseded(self, db, start, end, boundary=None):
+        """
+        row_keys of the table rows in [start, end] dated before the boundary;
+        archived rows with these keys are stale and readers pass them as exclude
+        """
+        boundary = boundary or self.boundary()
+        if boundary is None or start >= boundary:
+            return np.empty(0, dtype=np.int64)
+
+        rows = db.execute(text(TABLE_KEYS_SQL), {
+            "start": start,
+            "end": min(end, boundary - timedelta(days=1))
+        }).all()
+        if not rows:
+            return np.empty(0, dtype=np.int64)
+        return np.sort(row_keys([row[0] for row in rows], [row[1] for row in rows]))
+
+    def records(self, start, end, user_ids=None, device_id=None, after=None, limit=None, exclude=None):
+        """Yield ArchivedRecord rows in [start, end] ordered by (date, user_id)"""
+        for month in self.months():
+            if month > end or next_month(month) <= start:
+                continue
+            archived = self.month(month)
+            if archived is None:
+                continue
+
+            for i in archived.select(start, end, user_ids, device_id, after, exclude):
+                if limit is not None:
+                    if limit <= 0:
+                        return
+                    limit -= 1
+                yield archived.record(int(i))
+
+    def count(self, start, end, exclude=None):
+        """Number of archived rows in [start, end], leaving out exclude"""
+        total = 0
+        for month in self.months():
+            if month > end or next_month(month) <= start:
+                continue
+            archived = self.month(month)
+            if archived is not None:
+                total += len(archived.select(start, end, exclude=exclude))
+        return total
+
+    def write_month(self, month, rows):
+        """Write rows (sorted by (date, user_id)) as month, replacing any earlier version"""
+        retired = self.publish_month(month, self.stage_month(month, rows))
+        if retired is not None:
+            shutil.rmtree(retired, ignore_errors=True)
+
+    def stage_month(self, month, rows):
+        """Write rows to a staging directory that readers do not see; returns its path"""
+        staging = f"{self._path(month)}.tmp-{uuid.uuid4().hex}"
+        os.makedirs(staging)
+
+        try:
+            columns, meta = encode_month(rows)
+            for name, array in columns.items():
+                with open(os.path.join(staging, f"{name}.npy"), "wb") as f:
+                    np.save(f, array)
+                    os.fsync(f.fileno())
+            with open(os.path.join(staging, "meta.json"), "w") as f:
+                json.dump(meta, f)
+                os.fsync(f.fileno())
+        except Exception:
+            shutil.rmtree(staging, ignore_errors=True)
+            raise
+
+        return staging
+
+    def publish_month(self, month, staging):
+        """
+        Move a staged month into place. Returns the path the earlier version
+        was moved to (None if there was none); the caller removes or restores it
+        """
+        final = self._path(month)
+        retired = None
+        if os.path.exists(final):
+            # Open memory maps keep reading the retired files until closed
+            retired = f"{final}.old-{uuid.uuid4().hex}"
+            os.replace(final, retired)
+        os.replace(staging, final)
+        return retired
+
+    def unpublish_month(self, month, retired):
+        """Undo publish_month: put back the earlier version, or remove the month"""
+        final = self._path(month)
+        dropped = f"{final}.old-{uuid.uuid4().hex}"
+        os.replace(final, dropped)
+        if retired is not None:
+            os.replace(retired, final)
+        shutil.rmtree(dropped, ignore_errors=True)
+
+    def archive_months(self, db, before):
+        """
+        Move every month ending on or before `before` out of attendance_records
+        Commits once per month; returns the archived months
+
+        A month's files are published just before the commit that takes its
+        rows out of the table, so the month is never in neither place. While
+        it is in both, readers let the table rows win. A failed month puts
+        back the files it replaced; after a crash before the commit the next
+        run archives the month again.
+        """
+        archived = []
+        months = [month for (month,) in db.execute(text(ARCHIVABLE_MONTHS_SQL), {"before": before})]
+        db.commit()
+
+        for month in months:
+            staging = None
+            published = False
+            try:
+                staging = self._archive_month(db, month)
+                if staging is not None:
+                    retired = self.publish_month(month, staging)
+                    published = True
+                db.commit()
+            except Exception:
+                db.rollback()
+                if published:
+                    self.unpublish_month(month, retired)
+                elif staging is not None:
+                    shutil.rmtree(staging, ignore_errors=True)
+                raise
+
+            if published:
+                if retired is not None:
+                    shutil.rmtree(retired, ignore_errors=True)
+                archived.append(month)
+
+        return archived
+
+    def _archive_month(self, db, month):
+        locked = db.execute(
+            text("SELECT pg_try_advisory_xact_lock(:key)"), {"key": ARCHIVE_LOCK_KEY}
+        ).scalar()
+        if not locked:
+            return None
+
+        bounds = {"start": month, "end": next_month(month)}
+        fingerprint = tuple(db.execute(text(MONTH_FINGERPRINT_SQL), bounds).one())
+        if not fingerprint[0]:
+            return None
+
+        rows = db.query(
+            AttendanceRecordDB.id,
+            AttendanceRecordDB.name,
+            AttendanceRecordDB.user_id,
+            AttendanceRecordDB.slot_id,
+            AttendanceRecordDB.date,
+            AttendanceRecordDB.checked_in_time,
+            AttendanceRecordDB.checked_out_time,
+            AttendanceRecordDB.is_present,
+            AttendanceRecordDB.device_id,
+            AttendanceRecordDB.created_at,
+            AttendanceRecordDB.updated_at
+        ).filter(
+            AttendanceRecordDB.date >= bounds["start"],
+            AttendanceRecordDB.date < bounds["end"]
+        ).order_by(AttendanceRecordDB.date, AttendanceRecordDB.user_id).all()
+
+        earlier = self.month(month)
+        if earlier is not None:
+            # Late rows folded into an archived month; the table's copy wins
+            keys = {(row.user_id, row.date) for row in rows}
+            kept = (earlier.record(i) for i in range(earlier.rows))
+            rows = sorted(
+                rows + [record for record in kept if (record.user_id, record.date) not in keys],
+                key=lambda row: (row.date, row.user_id)
+            )
+
+        staging = self.stage_month(month, rows)
+        try:
+            self._take_out_of_table(db, month, bounds, fingerprint)
+        except Exception:
+            shutil.rmtree(staging, ignore_errors=True)
+            raise
+
+        print(f"✓ Archived {len(rows)} attendance records of {month:%Y-%m}")
+        return staging
+
+    @staticmethod
+    def _take_out_of_table(db, month, bounds, fingerprint):
+        # Detaching waits for in-flight writers; the rollup triggers on the
+        # parent do not fire, so daily_attendance_summary keeps the month's counts
+        partition = f"attendance_records_p{month:%Y%m}"
+        if db.execute(text(PARTITION_ATTACHED_SQL), {"name": partition}).scalar():
+            db.execute(text(f'ALTER TABLE attendance_records DETACH PARTITION "{partition}"'))
+            detached = True
+        else:
+            detached = False
+
+        rest = tuple(db.execute(text(MONTH_FINGERPRINT_SQL), bounds).one())
+        if detached:
+            moved = tuple(db.execute(text(
+                f'SELECT count(*), max(id), max(updated_at) FROM "{partition}"'
+            )).one())
+            rest = _combine_fingerprints(moved, rest)
+
+        if rest != fingerprint:
+            raise RuntimeError(f"Attendance for {month:%Y-%m} changed while archiving; retrying next run")
+
+        if detached:
+            db.execute(text(f'DROP TABLE "{partition}"'))
+        db.execute(text(
+            "DELETE FROM attendance_records_default WHERE date >= :start AND date < :end"
+        ), bounds)
+
+
+def _combine_fingerprints(a, b):
+    """(count, max id, max updated_at) of two disjoint row sets"""
+    maxima = [max((v for v in pair if v is not None), default=None) for pair in zip(a[1:], b[1:])]
+    return (a[0] + b[0], *maxima)
+
+
+def paginate_with_archive(archive, query, start, end, limit, cursor=None):
+    """
+    paginate() over (date, user_id) for an attendance_records query already
+    filtered to [start, end], merged with the archived months. Table rows
+    replace archived rows with the same (user_id, date).
+    """
+    columns = [AttendanceRecordDB.date, AttendanceRecordDB.user_id]
+    cursor_types = [date.fromisoformat, int]
+
+    boundary = archive.boundary()
+    if boundary is None or start >= boundary:
+        return paginate(query, columns, cursor_types, limit, cursor)
+
+    after = decode_cursor(cursor, *cursor_types) if cursor else None
+    exclude = archive.superseded(query.session, start, end, boundary)
+    archived = archive.records(start, end, after=after, limit=limit + 1, exclude=exclude)
+
+    if after is not None:
+        query = query.filter(tuple_(*columns) > tuple_(*after))
+    rows = query.order_by(*columns).limit(limit + 1).all()
+
+    # No key is in both sources, so limit + 1 from each covers the page
+    records = list(itertools.islice(heapq.merge(archived, rows, key=record_key), limit + 1))
+    if len(records) > limit:
+        records = records[:limit]
+        return records, encode_cursor(records[-1].date, records[-1].user_id)
+    return records, None
+
+
+attendance_archive = AttendanceArchive(settings.ATTENDANCE_ARCHIVE_DIR)
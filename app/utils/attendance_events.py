@@ -0,0 +1,107 @@
+import asyncio
+import json
+import threading
+from datetime import date, time
+from app.utils.pg_listener import pg_listener
+from app.utils.wire_format import format_wire_date, format_wire_time
+
+# ==================== LIVE ATTENDANCE EVENTS ====================
+# attendance_records triggers NOTIFY the attendance_events channel when a
+# write commits (migration 0006), whichever worker made it. Each worker
+# receives them on its one LISTEN connection (app/utils/pg_listener.py)
+# and fans every event out to its own live feed clients, so the database
+# sees one listener per worker, not one poll per open dashboard.
+
+CHANNEL = "attendance_events"
+
+# Queued to a subscriber that fell behind; its feed ends after this
+OVERFLOW = (None, "event: overflow\ndata: {}\n\n")
+
+
+def sse_message(event, data):
+    """One Server-Sent Events message"""
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
+
+
+def _wire_event(event):
+    """Add the DD/MM / HH:MM renderings the other attendance endpoints return"""
+    record_date = date.fromisoformat(event["date"])
+    checked_in = event.get("checked_in_time")
+    checked_out = event.get("checked_out_time")
+
+    return {
+        **event,
+        "date": format_wire_date(record_date),
+        "iso_date": record_date.isoformat(),
+        "checked_in_time": format_wire_time(time.fromisoformat(checked_in)) if checked_in else None,
+        "checked_out_time": format_wire_time(time.fromisoformat(checked_out)) if checked_out else None,
+    }
+
+
+class AttendanceEventBus:
+    """
+    Fan attendance_events notifications out to live feed subscribers
+
+    Subscribers are asyncio queues of (iso_date, sse_message) pairs; each
+    event is encoded once and the same message is handed to every
+    subscriber's loop with call_soon_threadsafe. A subscriber whose queue
+    fills up (a stalled client) gets OVERFLOW and is dropped instead of
+    holding events back for others.
+    """
+
+    def __init__(self, listener, channel=CHANNEL):
+        self.listener = listener
+        self.channel = channel
+
+        self._subscribers = {}  # queue -> loop
+        self._lock = threading.Lock()
+
+        listener.listen(channel, self._publish)
+
+    def subscribe(self, maxsize):
+        """Register a queue on the running loop"""
+        queue = asyncio.Queue(maxsize=maxsize)
+
+        with self._lock:
+            self._subscribers[queue] = asyncio.get_running_loop()
+
+        self.listener.start()
+        return queue
+
+    def unsubscribe(self, queue):
+        with self._lock:
+            self._subscribers.pop(queue, None)
+
+    def subscriber_count(self):
+        with self._lock:
+            return len(self._subscribers)
+
+    def _publish(self, payload):
+        events = [
+            (event["iso_date"], sse_message(event["event"], event))
+            for event in map(_wire_event, json.loads(payload))
+        ]
+
+        with self._lock:
+            subscribers = list(self._subscribers.items())
+
+        for queue, loop in subscribers:
+            try:
+                loop.call_soon_threadsafe(self._deliver, queue, events)
+            except RuntimeError:
+                # Loop already closed
+                self.unsubscribe(queue)
+
+    def _deliver(self, queue, events):
+        for event in events:
+            try:
+                queue.put_nowait(event)
+            except asyncio.QueueFull:
+                self.unsubscribe(queue)
+                # Tell the client it missed events so it reloads the snapshot
+                queue.get_nowait()
+                queue.put_nowait(OVERFLOW)
+                return
+
+
+attendance_events = AttendanceEventBus(pg_listener)
@@ -0,0 +1,126 @@
+import csv
+import heapq
+import io
+import itertools
+import json
+import zlib
+from sqlalchemy import select
+from app.core.database import SessionLocal
+from app.models.attendance import AttendanceRecordDB
+from app.utils.wire_format import format_wire_date, format_wire_time
+
+# ==================== STREAMING ATTENDANCE EXPORT ====================
+# Rows come off a server-side cursor in batches of `batch_size` and are
+# encoded and yielded batch by batch, so memory stays flat whatever the
+# size of the export.
+
+EXPORT_FORMATS = {
+    "csv": "text/csv",
+    "ndjson": "application/x-ndjson",
+}
+
+EXPORT_COLUMNS = [
+    "user_id",
+    "name",
+    "date",
+    "iso_date",
+    "checked_in_time",
+    "checked_out_time",
+    "is_present",
+    "device_id",
+]
+
+
+def export_query(start, end, user_ids=None, device_id=None):
+    """Select the export columns for a date range, ordered by (date, user_id)"""
+    query = select(
+        AttendanceRecordDB.user_id,
+        AttendanceRecordDB.name,
+        AttendanceRecordDB.date,
+        AttendanceRecordDB.checked_in_time,
+        AttendanceRecordDB.checked_out_time,
+        AttendanceRecordDB.is_present,
+        AttendanceRecordDB.device_id,
+    ).where(
+        AttendanceRecordDB.date >= start,
+        AttendanceRecordDB.date <= end
+    )
+
+    if user_ids:
+        query = query.where(AttendanceRecordDB.user_id.in_(user_ids))
+    if device_id:
+        query = query.where(AttendanceRecordDB.device_id == device_id)
+
+    return query.order_by(AttendanceRecordDB.date, AttendanceRecordDB.user_id)
+
+
+def _export_values(row):
+    return (
+        row.user_id,
+        row.name,
+        format_wire_date(row.date),
+        row.date.isoformat(),
+        format_wire_time(row.checked_in_time),
+        format_wire_time(row.checked_out_time),
+        row.is_present,
+        row.device_id,
+    )
+
+
+def _encode_csv(rows, header=False):
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    if header:
+        writer.writerow(EXPORT_COLUMNS)
+    writer.writerows(_export_values(row) for row in rows)
+    return buffer.getvalue().encode()
+
+
+def _encode_ndjson(rows, header=False):
+    return "".join(
+        json.dumps(dict(zip(EXPORT_COLUMNS, _export_values(row)))) + "\n"
+        for row in rows
+    ).encode()
+
+
+def stream_attendance_export(query, export_format="csv", compress=False, batch_size=2000, archived=None):
+    """
+    Yield the encoded export of query, one batch at a time
+
+    archived, when given, is an iterable of archived rows (ordered by
+    (date, user_id), none sharing a key with query's rows) merged into the
+    output in order. Opens its own session: the response
+    body is produced after the endpoint has returned and its
+    request-scoped session is gone.
+    """
+    encode = _encode_csv if export_format == "csv" else _encode_ndjson
+    compressor = zlib.compressobj(wbits=31) if compress else None  # gzip container
+
+    db = SessionLocal()
+    try:
+        result = db.execute(query.execution_options(yield_per=batch_size))
+        if archived is None:
+            batches = result.partitions()
+        else:
+            merged = heapq.merge(archived, result, key=lambda row: (row.date, row.user_id))
+            batches = iter(lambda: list(itertools.islice(merged, batch_size)), [])
+
+        first = True
+        for rows in batches:
+            chunk = encode(rows, header=first)
+            first = False
+
+            if compressor:
+                chunk = compressor.compress(chunk)
+            if chunk:
+                yield chunk
+
+        if first and export_format == "csv":
+            # Empty export still gets its header row
+            chunk = encode([], header=True)
+            yield compressor.compress(chunk) if compressor else chunk
+
+        if compressor:
+            yield compressor.flush()
+    finally:
+        db.close()
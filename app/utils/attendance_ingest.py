@@ -0,0 +1,243 @@
+import csv
+import io
+from datetime import datetime
+from typing import List, NamedTuple, Optional
+from sqlalchemy import Integer, func, literal_column, select, text
+from sqlalchemy.dialects.postgresql import array, insert
+from app.models.attendance import AttendanceRecordDB
+from app.models.user import UserInformationDB
+from app.utils.wire_format import format_wire_date, format_wire_time, parse_wire_date, parse_wire_time
+
+
+def scan_row(name, user_id, slot_id, date, checked_in_time, checked_out_time=None, now=None, device_id=None):
+    """
+    Build the VALUES row for one scan (or several scans of the same user/day)
+
+    checked_out_time is only set when a batch already holds a later scan for
+    the same (user_id, date); a single scan leaves it empty. Dates and times
+    may be given in the device wire format (DD/MM, HH:MM).
+    """
+    now = now or datetime.now()
+
+    if not slot_id:
+        # Device did not send its slots - take them from the enrolled user.
+        # A user that is not enrolled keeps an empty array, as before.
+        slot_id = func.coalesce(
+            select(UserInformationDB.slot_id).where(
+                UserInformationDB.user_id == user_id
+            ).scalar_subquery(),
+            array([], type_=Integer)
+        )
+
+    return {
+        "name": name,
+        "user_id": user_id,
+        "slot_id": slot_id,
+        "date": parse_wire_date(date),
+        "checked_in_time": parse_wire_time(checked_in_time),
+        "checked_out_time": parse_wire_time(checked_out_time) if checked_out_time else None,
+        "is_present": True,
+        "device_id": device_id,
+        "created_at": now,
+        "updated_at": now,
+    }
+
+
+def build_scan_upsert(rows):
+    """
+    Single INSERT ... ON CONFLICT (user_id, date) DO UPDATE ... RETURNING
+
+    New (user_id, date) pairs are inserted as check-ins. Existing pairs only
+    get their check-out time moved to the latest scan. The returned rows carry
+    an `inserted` flag (xmax = 0) telling check-ins from check-outs.
+    Rows must not repeat a (user_id, date) pair within one statement.
+    """
+    stmt = insert(AttendanceRecordDB).values(rows)
+
+    stmt = stmt.on_conflict_do_update(
+        index_elements=[AttendanceRecordDB.user_id, AttendanceRecordDB.date],
+        set_={
+            "checked_out_time": func.coalesce(
+                stmt.excluded.checked_out_time,
+                stmt.excluded.checked_in_time
+            ),
+            "updated_at": stmt.excluded.updated_at,
+            # The record keeps the device of its check-in scan
+            "device_id": func.coalesce(AttendanceRecordDB.device_id, stmt.excluded.device_id),
+        }
+    )
+
+    return stmt.returning(
+        AttendanceRecordDB.name,
+        AttendanceRecordDB.user_id,
+        AttendanceRecordDB.slot_id,
+        AttendanceRecordDB.date,
+        AttendanceRecordDB.checked_in_time,
+        AttendanceRecordDB.checked_out_time,
+        AttendanceRecordDB.is_present,
+        literal_column("(xmax = 0)").label("inserted"),
+    )
+
+
+def attendance_record_dict(record):
+    """Serialize an attendance row the way the log endpoints return it"""
+    return {
+        "name": record.name,
+        "user_id": record.user_id,
+        "slot_id": record.slot_id,
+        "date": format_wire_date(record.date),
+        "iso_date": record.date.isoformat(),
+        "checked_in_time": format_wire_time(record.checked_in_time),
+        "checked_out_time": format_wire_time(record.checked_out_time),
+        "is_present": record.is_present
+    }
+
+
+# ==================== SET-BASED BULK INGESTION ====================
+
+class AttendanceRow(NamedTuple):
+    """One device log as it enters the bulk ingestion path"""
+    name: str
+    user_id: int
+    slot_id: Optional[List[int]]
+    date: str
+    time: str
+
+
+COPY_NULL = "\\N"
+
+CREATE_STAGING_SQL = """
+    CREATE TEMP TABLE attendance_staging (
+        seq INTEGER NOT NULL,
+        name VARCHAR NOT NULL,
+        user_id INTEGER NOT NULL,
+        slot_id INTEGER[],
+        date DATE NOT NULL,
+        time TIME NOT NULL
+    ) ON COMMIT DROP
+"""
+
+COPY_STAGING_SQL = (
+    "COPY attendance_staging (seq, name, user_id, slot_id, date, time) "
+    "FROM STDIN WITH (FORMAT csv, NULL '\\N')"
+)
+
+# Fill missing slot_ids with one join, fold repeated (user_id, date) logs into
+# one row (first log checks in, last log checks out), then merge everything
+# into attendance_records with a single INSERT ... ON CONFLICT.
+MERGE_STAGING_SQL = """
+    WITH fixed AS (
+        SELECT
+            s.seq,
+            s.name,
+            s.user_id,
+            s.date,
+            s.time,
+            coalesce(nullif(s.slot_id, '{}'), u.slot_id) AS slot_id,
+            u.user_id IS NOT NULL AS was_fixed
+        FROM attendance_staging s
+        LEFT JOIN user_information u
+            ON u.user_id = s.user_id
+           AND coalesce(cardinality(s.slot_id), 0) = 0
+    ),
+    grouped AS (
+        SELECT DISTINCT ON (user_id, date)
+            user_id,
+            date,
+            name,
+            slot_id,
+            time AS first_time,
+            last_value(time) OVER w AS last_time,
+            count(*) OVER w AS logs
+        FROM fixed
+        WHERE cardinality(slot_id) > 0
+        WINDOW w AS (
+            PARTITION BY user_id, date ORDER BY seq
+            ROWS BETWEEN UNBOUNDED PRECEDING AND UNBOUNDED FOLLOWING
+        )
+        ORDER BY user_id, date, seq
+    ),
+    merged AS (
+        INSERT INTO attendance_records (
+            name, user_id, slot_id, date, checked_in_time, checked_out_time,
+            is_present, device_id, created_at, updated_at
+        )
+        SELECT
+            name, user_id, slot_id, date, first_time,
+            CASE WHEN logs > 1 THEN last_time END,
+            TRUE, :device_id, :now, :now
+        FROM grouped
+        ON CONFLICT (user_id, date) DO UPDATE SET
+            checked_out_time = coalesce(excluded.checked_out_time, excluded.checked_in_time),
+            updated_at = excluded.updated_at,
+            device_id = coalesce(attendance_records.device_id, excluded.device_id)
+        RETURNING user_id, date, (xmax = 0) AS inserted
+    )
+    SELECT
+        (SELECT count(*) FROM fixed WHERE was_fixed) AS fixed,
+        (SELECT count(*) FROM fixed WHERE coalesce(cardinality(slot_id), 0) = 0) AS skipped,
+        count(*) FILTER (WHERE m.inserted) AS created,
+        coalesce(sum(g.logs), 0) - count(*) FILTER (WHERE m.inserted) AS updated
+    FROM merged m
+    JOIN grouped g USING (user_id, date)
+"""
+
+
+def _copy_buffer(rows):
+    """CSV for COPY; rows whose date or time cannot be parsed are left out"""
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    invalid = 0
+
+    for seq, row in enumerate(rows):
+        try:
+            log_date = parse_wire_date(row.date).isoformat()
+            log_time = parse_wire_time(row.time).isoformat()
+        except (ValueError, TypeError, AttributeError):
+            invalid += 1
+            continue
+
+        if row.slot_id is None:
+            slot_id = COPY_NULL
+        else:
+            slot_id = "{" + ",".join(str(int(s)) for s in row.slot_id) + "}"
+
+        writer.writerow((seq, row.name, int(row.user_id), slot_id, log_date, log_time))
+
+    buffer.seek(0)
+    return buffer, invalid
+
+
+def ingest_attendance_rows(db, rows, device_id=None):
+    """
+    Merge a batch of AttendanceRow into attendance_records set-based
+
+    The batch is COPYed into a temp table, missing slot_ids are fixed with one
+    join against user_information and the merge is a single statement.
+    device_id, when given, is recorded on the records the batch creates.
+    Runs inside the caller's transaction; the caller commits.
+    Returns the created/updated/fixed/skipped counters; logs with an
+    unparseable date or time count as skipped.
+    """
+    if not rows:
+        return {"created": 0, "updated": 0, "fixed": 0, "skipped": 0}
+
+    db.execute(text("DROP TABLE IF EXISTS attendance_staging"))
+    db.execute(text(CREATE_STAGING_SQL))
+
+    buffer, invalid = _copy_buffer(rows)
+
+    cursor = db.connection().connection.cursor()
+    try:
+        cursor.copy_expert(COPY_STAGING_SQL, buffer)
+    finally:
+        cursor.close()
+
+    result = db.execute(text(MERGE_STAGING_SQL), {"now": datetime.now(), "device_id": device_id}).one()
+
+    return {
+        "created": result.created,
+        "updated": result.updated,
+        "fixed": result.fixed,
+        "skipped": result.skipped + invalid
+    }
@@ -0,0 +1,181 @@
+import re
+import threading
+from datetime import date
+from sqlalchemy import text
+from app.core.config import settings
+from app.core.database import SessionLocal
+from app.utils.attendance_archive import attendance_archive
+from app.utils.response_cache import response_cache
+
+# ==================== ATTENDANCE PARTITIONS ====================
+# attendance_records is range-partitioned by month (migration 0010). Each
+# month lives in attendance_records_pYYYYMM; attendance_create_partition()
+# adds one and moves that month's rows out of the default partition.
+# Retention detaches (or drops) whole months instead of running DELETE.
+# daily_attendance_summary keeps the counts of retired months.
+
+PARTITION_NAME = re.compile(r"^attendance_records_p(\d{4})(\d{2})$")
+
+# Any value; only one worker at a time runs maintenance
+MAINTENANCE_LOCK_KEY = 7231010
+
+ENSURE_PARTITIONS_SQL = """
+    SELECT count(*) FILTER (WHERE attendance_create_partition(month::date))
+    FROM generate_series(
+        date_trunc('month', CAST(:today AS DATE)),
+        date_trunc('month', CAST(:today AS DATE)) + make_interval(months => :ahead),
+        interval '1 month'
+    ) AS month
+"""
+
+LIST_PARTITIONS_SQL = """
+    SELECT c.relname
+    FROM pg_inherits i
+    JOIN pg_class c ON c.oid = i.inhrelid
+    WHERE i.inhparent = 'attendance_records'::regclass
+"""
+
+
+def add_months(month, count):
+    index = month.year * 12 + month.month - 1 + count
+    return date(index // 12, index % 12 + 1, 1)
+
+
+def attached_partitions(db):
+    """{first day of month: partition name} for the attached month partitions"""
+    partitions = {}
+    for (name,) in db.execute(text(LIST_PARTITIONS_SQL)):
+        match = PARTITION_NAME.match(name)
+        if match:
+            partitions[date(int(match.group(1)), int(match.group(2)), 1)] = name
+    return partitions
+
+
+def ensure_partitions(db, months_ahead, today=None):
+    """Create the partitions of this month and the next months_ahead; returns how many were new"""
+    return db.execute(text(ENSURE_PARTITIONS_SQL), {
+        "today": today or date.today(),
+        "ahead": months_ahead
+    }).scalar()
+
+
+def apply_retention(db, keep_months, mode="detach", today=None):
+    """
+    Retire month partitions older than keep_months (counting this month)
+
+    mode "detach" leaves each month as a standalone table of the same name;
+    "drop" removes it. Returns the retired partition names.
+    """
+    if mode not in ("detach", "drop"):
+        raise ValueError(f"Unknown retention mode: {mode}")
+
+    cutoff = add_months((today or date.today()).replace(day=1), -(keep_months - 1))
+    retired = []
+
+    for month, name in sorted(attached_partitions(db).items()):
+        if month >= cutoff:
+            break
+        db.execute(text(f'ALTER TABLE attendance_records DETACH PARTITION "{name}"'))
+        if mode == "drop":
+            db.execute(text(f'DROP TABLE "{name}"'))
+        retired.append(name)
+
+    return retired
+
+
+def maintain_partitions(db, months_ahead, keep_months=0, mode="detach"):
+    """
+    Create upcoming partitions and apply retention (keep_months=0 keeps all)
+    Skipped (returns None) while another worker is doing the same
+    """
+    locked = db.execute(
+        text("SELECT pg_try_advisory_xact_lock(:key)"), {"key": MAINTENANCE_LOCK_KEY}
+    ).scalar()
+    if not locked:
+        return None
+
+    created = ensure_partitions(db, months_ahead)
+    retired = apply_retention(db, keep_months, mode) if keep_months > 0 else []
+    return {"created": created, "retired": retired}
+
+
+class PartitionMaintainer:
+    """
+    Runs maintain_partitions at start-up and every interval_hours, after
+    moving months past ATTENDANCE_ARCHIVE_AFTER_MONTHS to the archive
+    """
+
+    def __init__(self, session_factory, interval_hours):
+        self.session_factory = session_factory
+        self.interval = interval_hours * 3600
+
+        self._thread = None
+        self._stop = threading.Event()
+
+    def start(self):
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, name="attendance-partitions", daemon=True)
+            self._thread.start()
+
+    def close(self, timeout=5):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+
+    def _run(self):
+        while True:
+            self.run_once()
+            if self._stop.wait(self.interval):
+                return
+
+    def run_once(self):
+        # An archive failure must not hold back upcoming partitions or retention
+        if settings.ATTENDANCE_ARCHIVE_AFTER_MONTHS > 0:
+            self._archive()
+
+        db = self.session_factory()
+        try:
+            result = maintain_partitions(
+                db,
+                months_ahead=settings.ATTENDANCE_PARTITION_MONTHS_AHEAD,
+                keep_months=settings.ATTENDANCE_RETENTION_MONTHS,
+                mode=settings.ATTENDANCE_RETENTION_MODE
+            )
+            db.commit()
+        except Exception as e:
+            db.rollback()
+            print(f"❌ Attendance partition maintenance error: {str(e)}")
+            return None
+        finally:
+            db.close()
+
+        if result and (result["created"] or result["retired"]):
+            if result["retired"]:
+                response_cache.clear()
+            print(f"✓ Attendance partitions: {result['created']} created, retired {result['retired'] or 'none'}")
+        return result
+
+    def _archive(self):
+        this_month = date.today().replace(day=1)
+        db = self.session_factory()
+        try:
+            archived = attendance_archive.archive_months(
+                db, before=add_months(this_month, -(settings.ATTENDANCE_ARCHIVE_AFTER_MONTHS - 1))
+            )
+        except Exception as e:
+            db.rollback()
+            print(f"❌ Attendance archive error: {str(e)}")
+            # Months before the failed one may already have moved
+            response_cache.clear()
+            return
+        finally:
+            db.close()
+
+        if archived:
+            response_cache.clear()
+
+
+partition_maintainer = PartitionMaintainer(
+    SessionLocal,
+    interval_hours=settings.ATTENDANCE_PARTITION_CHECK_HOURS
+)
@@ -0,0 +1,160 @@
+import threading
+from datetime import datetime
+from sqlalchemy import delete, func, select
+from app.core.config import settings
+from app.core.database import SessionLocal
+from app.models.attendance import AttendancePurgeJobDB, AttendanceRecordDB
+from app.utils.response_cache import attendance_date_tags, response_cache
+
+
+def delete_user_attendance(db, user_id, max_record_id=None, limit=None):
+    """
+    Delete a user's attendance records with one DELETE ... RETURNING
+    limit bounds the batch (lowest ids first); returns [(date, count)]
+    """
+    if max_record_id is None and limit is None:
+        condition = AttendanceRecordDB.user_id == user_id
+    else:
+        ids = select(AttendanceRecordDB.id).where(AttendanceRecordDB.user_id == user_id)
+        if max_record_id is not None:
+            ids = ids.where(AttendanceRecordDB.id <= max_record_id)
+        if limit is not None:
+            ids = ids.order_by(AttendanceRecordDB.id).limit(limit)
+        condition = AttendanceRecordDB.id.in_(ids)
+
+    deleted = delete(AttendanceRecordDB).where(condition).returning(AttendanceRecordDB.date).cte("deleted")
+    return db.execute(
+        select(deleted.c.date, func.count()).group_by(deleted.c.date)
+    ).all()
+
+
+def purge_job_dict(job):
+    return {
+        "job_id": job.id,
+        "user_id": job.user_id,
+        "status": job.status,
+        "total_records": job.total_records,
+        "records_deleted": job.records_deleted,
+        "progress": round(job.records_deleted / job.total_records, 4) if job.total_records else 1.0,
+        "error_message": job.error_message,
+        "created_at": job.created_at.isoformat() if job.created_at else None,
+        "updated_at": job.updated_at.isoformat() if job.updated_at else None,
+        "completed_at": job.completed_at.isoformat() if job.completed_at else None
+    }
+
+
+class AttendancePurger:
+    """
+    Deletes queued users' attendance in bounded batches
+
+    Each batch is one short transaction that locks its job row with
+    SKIP LOCKED, so several workers can share the queue and a restart
+    simply resumes pending jobs. The pause between batches leaves room
+    for scan traffic.
+    """
+
+    def __init__(self, session_factory, batch_size, pause_seconds, poll_interval=30):
+        self.session_factory = session_factory
+        self.batch_size = batch_size
+        self.pause = pause_seconds
+        self.poll_interval = poll_interval
+
+        self._lock = threading.Lock()
+        self._wake = threading.Event()
+        self._stop = threading.Event()
+        self._thread = None
+
+    def enqueue(self, db, user_id):
+        """Queue a purge of user_id's current records; the caller commits, then calls start()"""
+        max_record_id, total = db.query(
+            func.max(AttendanceRecordDB.id),
+            func.count(AttendanceRecordDB.id)
+        ).filter(AttendanceRecordDB.user_id == user_id).one()
+
+        job = AttendancePurgeJobDB(
+            user_id=user_id,
+            max_record_id=max_record_id or 0,
+            total_records=total,
+            status="pending" if total else "completed",
+            completed_at=None if total else datetime.now()
+        )
+        db.add(job)
+        db.flush()
+        return job
+
+    def start(self):
+        """Start the purge thread (once) and wake it up"""
+        with self._lock:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name="attendance-purge", daemon=True)
+                self._thread.start()
+        self._wake.set()
+
+    def close(self, timeout=5):
+        self._stop.set()
+        self._wake.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+
+    def _run(self):
+        while not self._stop.is_set():
+            try:
+                worked = self.run_batch()
+            except Exception as e:
+                print(f"❌ Attendance purge error: {str(e)}")
+                worked = False
+
+            if worked:
+                self._stop.wait(self.pause)
+            else:
+                self._wake.wait(self.poll_interval)
+                self._wake.clear()
+
+    def run_batch(self):
+        """Purge one batch of the oldest pending job; False when there is none"""
+        db = self.session_factory()
+        try:
+            job = db.query(AttendancePurgeJobDB).filter_by(
+                status="pending"
+            ).order_by(AttendancePurgeJobDB.id).with_for_update(skip_locked=True).first()
+
+            if job is None:
+                db.rollback()
+                return False
+
+            try:
+                per_date = delete_user_attendance(
+                    db, job.user_id, max_record_id=job.max_record_id, limit=self.batch_size
+                )
+            except Exception as e:
+                db.rollback()
+                db.query(AttendancePurgeJobDB).filter_by(id=job.id).update({
+                    AttendancePurgeJobDB.status: "failed",
+                    AttendancePurgeJobDB.error_message: str(e),
+                    AttendancePurgeJobDB.updated_at: datetime.now()
+                }, synchronize_session=False)
+                db.commit()
+                raise
+
+            deleted = sum(count for _, count in per_date)
+            job.records_deleted += deleted
+            if deleted < self.batch_size:
+                job.status = "completed"
+                job.completed_at = datetime.now()
+            db.commit()
+
+            if per_date:
+                response_cache.invalidate(*attendance_date_tags(*(d for d, _ in per_date)))
+            return True
+        except Exception:
+            db.rollback()
+            raise
+        finally:
+            db.close()
+
+
+attendance_purger = AttendancePurger(
+    SessionLocal,
+    batch_size=settings.ATTENDANCE_PURGE_BATCH_SIZE,
+    pause_seconds=settings.ATTENDANCE_PURGE_PAUSE_SECONDS
+)
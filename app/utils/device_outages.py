@@ -0,0 +1,86 @@
+from sqlalchemy import DateTime, func, literal, or_, select, text
+from sqlalchemy.dialects.postgresql import insert
+from app.models.device import DeviceOutageDB, DeviceStatusDB
+
+# ==================== DEVICE OUTAGE INTERVALS ====================
+# An outage is one (device_id, started_at, ended_at) row. outage_sweeper
+# opens it when a device stays silent past OFFLINE_THRESHOLD_SECONDS; the
+# device's next heartbeat closes it. Every write is idempotent so several
+# workers can race on the same device.
+
+CLOSE_OUTAGES_SQL = """
+    UPDATE device_outages o
+    SET ended_at = greatest(h.first_seen, o.started_at)
+    FROM unnest(CAST(:device_ids AS VARCHAR[]), CAST(:first_seen AS TIMESTAMP[])) AS h(device_id, first_seen)
+    WHERE o.device_id = h.device_id
+      AND o.ended_at IS NULL
+"""
+
+
+def open_outage(db, device_id, started_at):
+    """Open an outage unless one is already open for the device"""
+    stmt = insert(DeviceOutageDB).values(device_id=device_id, started_at=started_at)
+    db.execute(stmt.on_conflict_do_nothing(
+        index_elements=[DeviceOutageDB.device_id],
+        index_where=DeviceOutageDB.ended_at.is_(None)
+    ))
+
+
+def close_outages(db, first_seen):
+    """
+    Close the open outages of devices that sent a heartbeat
+    first_seen maps device_id -> first heartbeat since the last close
+    """
+    if not first_seen:
+        return
+
+    device_ids = list(first_seen)
+    db.execute(text(CLOSE_OUTAGES_SQL), {
+        "device_ids": device_ids,
+        "first_seen": [first_seen[d] for d in device_ids]
+    })
+
+
+def open_missed_outages(db, online_since):
+    """
+    Open outages for devices already offline with none open, e.g. ones
+    that went silent while no worker was running
+    """
+    stale = select(
+        DeviceStatusDB.device_id,
+        DeviceStatusDB.last_seen
+    ).where(
+        DeviceStatusDB.last_seen < online_since,
+        ~select(DeviceOutageDB.id).where(
+            DeviceOutageDB.device_id == DeviceStatusDB.device_id,
+            DeviceOutageDB.ended_at.is_(None)
+        ).exists()
+    )
+
+    result = db.execute(
+        insert(DeviceOutageDB).from_select(["device_id", "started_at"], stale).on_conflict_do_nothing(
+            index_elements=[DeviceOutageDB.device_id],
+            index_where=DeviceOutageDB.ended_at.is_(None)
+        )
+    )
+    return result.rowcount
+
+
+def outages_in_window(db, device_id, window_start, window_end, now):
+    """
+    Outages of device_id overlapping [window_start, window_end), each clipped
+    to the window; open outages run until now
+    """
+    ended = func.coalesce(DeviceOutageDB.ended_at, literal(now, DateTime))
+    clipped_start = func.greatest(DeviceOutageDB.started_at, literal(window_start, DateTime))
+    clipped_end = func.least(ended, literal(window_end, DateTime))
+
+    return db.query(
+        DeviceOutageDB.started_at,
+        DeviceOutageDB.ended_at,
+        func.extract("epoch", clipped_end - clipped_start).label("offline_seconds")
+    ).filter(
+        DeviceOutageDB.device_id == device_id,
+        DeviceOutageDB.started_at < window_end,
+        or_(DeviceOutageDB.ended_at.is_(None), DeviceOutageDB.ended_at > window_start)
+    ).order_by(DeviceOutageDB.started_at).all()
@@ -1,9 +1,15 @@
-from datetime import datetime
+from datetime import datetime, timedelta
+from sqlalchemy import DateTime, Integer, String, any_, cast, func, literal, or_, select
+from sqlalchemy.dialects.postgresql import ARRAY
 from app.core.config import OFFLINE_THRESHOLD_SECONDS
+from app.models.device import DeviceStatusDB
 
-def calculate_device_status(device):
+def calculate_device_status(device, last_seen=None):
+    """last_seen overrides device.last_seen when it is newer (buffered heartbeat)"""
     now = datetime.now()
-    seconds_ago = int((now - device.last_seen).total_seconds())
+    if last_seen is None or last_seen < device.last_seen:
+        last_seen = device.last_seen
+    seconds_ago = int((now - last_seen).total_seconds())
 
     is_online = seconds_ago <= OFFLINE_THRESHOLD_SECONDS
     computed_status = "Online" if is_online else "Offline"
@@ -11,7 +17,67 @@ def calculate_device_status(device):
     return {
         "device_id": device.device_id,
         "status": computed_status,
-        "last_seen": device.last_seen,
+        "last_seen": last_seen,
         "last_seen_seconds_ago": seconds_ago,
         "is_online": is_online
     }
+
+# ==================== SQL-COMPUTED DEVICE STATUS ====================
+# Online/offline is derived from last_seen at read time; the stored status
+# column is never consulted or rewritten by reads. `now` comes from Python
+# because last_seen is written with Python's clock too.
+
+def device_status_query(db, buffered=None, now=None):
+    """
+    Query of device_status rows with their computed status, and the
+    matching "is online" filter condition
+
+    buffered maps device_id -> unflushed heartbeat (heartbeat_buffer) and is
+    joined in so a newer in-memory heartbeat wins over the stored last_seen.
+    The online condition is a range on last_seen (served by its index)
+    plus the buffered devices that are online on their heartbeat alone.
+    """
+    now = now or datetime.now()
+    buffered = buffered or {}
+    online_since = now - timedelta(seconds=OFFLINE_THRESHOLD_SECONDS)
+
+    device_ids = list(buffered)
+    heartbeats = select(
+        func.unnest(cast(device_ids, ARRAY(String))).label("device_id"),
+        func.unnest(cast([buffered[d] for d in device_ids], ARRAY(DateTime))).label("last_seen")
+    ).subquery("heartbeats")
+
+    # greatest() ignores the NULL of devices with no buffered heartbeat
+    last_seen = func.greatest(DeviceStatusDB.last_seen, heartbeats.c.last_seen)
+    seconds_ago = cast(
+        func.floor(func.extract("epoch", literal(now, DateTime) - last_seen)),
+        Integer
+    )
+
+    query = db.query(
+        DeviceStatusDB.id,
+        DeviceStatusDB.device_id,
+        DeviceStatusDB.last_seen,
+        last_seen.label("effective_last_seen"),
+        seconds_ago.label("last_seen_seconds_ago"),
+        (last_seen >= online_since).label("is_online")
+    ).outerjoin(heartbeats, heartbeats.c.device_id == DeviceStatusDB.device_id)
+
+    recent = [d for d in device_ids if buffered[d] >= online_since]
+    online = or_(
+        DeviceStatusDB.last_seen >= online_since,
+        DeviceStatusDB.device_id == any_(cast(recent, ARRAY(String)))
+    )
+
+    return query, online
+
+
+def device_status_dict(row):
+    """Serialize a device_status_query row like calculate_device_status"""
+    return {
+        "device_id": row.device_id,
+        "status": "Online" if row.is_online else "Offline",
+        "last_seen": row.effective_last_seen,
+        "last_seen_seconds_ago": row.last_seen_seconds_ago,
+        "is_online": row.is_online
+    }
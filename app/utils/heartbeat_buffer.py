@@ -0,0 +1,128 @@
+import threading
+from datetime import datetime
+from sqlalchemy import func
+from sqlalchemy.dialects.postgresql import insert
+from app.core.config import settings
+from app.core.database import SessionLocal
+from app.models.device import DeviceStatusDB
+from app.utils.device_outages import close_outages
+
+
+class HeartbeatBuffer:
+    """
+    In-memory last-seen map in front of device_status
+
+    Heartbeats only update the map; a background thread flushes it every
+    flush_interval seconds as one multi-row upsert. Reads merge last_seen()
+    so they are never staler than the latest heartbeat this worker saw.
+    Other workers' heartbeats become visible once they flush. The flush
+    also closes the open outages of the devices it writes, at the first
+    heartbeat of the batch.
+    """
+
+    def __init__(self, session_factory, flush_interval):
+        self.session_factory = session_factory
+        self.flush_interval = flush_interval
+
+        self._pending = {}  # device_id -> last heartbeat
+        self._first = {}  # device_id -> first heartbeat since the last flush
+        self._flushing = {}  # taken by the running flush, not yet committed
+        self._lock = threading.Lock()
+        self._thread = None
+        self._stop = threading.Event()
+
+    def record(self, device_id, when):
+        with self._lock:
+            if self._thread is None:
+                self._thread = threading.Thread(
+                    target=self._run, name="heartbeat-flush", daemon=True
+                )
+                self._thread.start()
+
+            if device_id not in self._pending:
+                self._first[device_id] = when
+            self._pending[device_id] = when
+
+    def last_seen(self, device_id):
+        """Latest unflushed heartbeat for device_id, or None"""
+        with self._lock:
+            return self._pending.get(device_id) or self._flushing.get(device_id)
+
+    def snapshot(self):
+        """All unflushed heartbeats as {device_id: last_seen}"""
+        with self._lock:
+            return {**self._flushing, **self._pending}
+
+    def close(self, timeout=5):
+        """Flush what is still buffered and stop the flusher thread"""
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+
+    def _run(self):
+        while not self._stop.wait(self.flush_interval):
+            self.flush()
+        self.flush()
+
+    def flush(self):
+        with self._lock:
+            if not self._pending:
+                return 0
+            self._flushing, self._pending = self._pending, {}
+            batch = self._flushing
+            first, self._first = self._first, {}
+
+        try:
+            written = self._write(batch, first)
+        except Exception as e:
+            print(f"❌ Heartbeat flush error: {str(e)}")
+            with self._lock:
+                # Put the batch back; the earlier first heartbeat and the later last one win
+                for device_id, when in batch.items():
+                    self._first[device_id] = first[device_id]
+                    if device_id not in self._pending:
+                        self._pending[device_id] = when
+                self._flushing = {}
+            return 0
+
+        with self._lock:
+            self._flushing = {}
+
+        return written
+
+    def _write(self, batch, first):
+        now = datetime.now()
+        # Sorted so concurrent flushes from several workers lock rows in the same order
+        rows = [
+            {"device_id": device_id, "status": "Online", "last_seen": when, "updated_at": now}
+            for device_id, when in sorted(batch.items())
+        ]
+
+        stmt = insert(DeviceStatusDB).values(rows)
+        stmt = stmt.on_conflict_do_update(
+            index_elements=[DeviceStatusDB.device_id],
+            set_={
+                "last_seen": func.greatest(DeviceStatusDB.last_seen, stmt.excluded.last_seen),
+                "status": stmt.excluded.status,
+                "updated_at": stmt.excluded.updated_at,
+            }
+        )
+
+        db = self.session_factory()
+        try:
+            db.execute(stmt)
+            close_outages(db, first)
+            db.commit()
+        except Exception:
+            db.rollback()
+            raise
+        finally:
+            db.close()
+
+        return len(rows)
+
+
+heartbeat_buffer = HeartbeatBuffer(
+    SessionLocal,
+    flush_interval=settings.HEARTBEAT_FLUSH_INTERVAL_SECONDS
+)
@@ -0,0 +1,175 @@
+import threading
+import time
+from concurrent.futures import Future
+from datetime import datetime
+from app.core.config import settings
+from app.core.database import SessionLocal
+from app.utils.attendance_ingest import build_scan_upsert, scan_row, attendance_record_dict
+from app.utils.response_cache import attendance_date_tags, response_cache
+from app.utils.wire_format import format_wire_time, parse_wire_date, parse_wire_time
+
+
+class AttendanceIngestQueue:
+    """
+    Group-commit queue for device scans
+
+    Scans are collected for up to max_wait_ms (or until max_batch scans are
+    waiting) and flushed as one multi-row upsert in one transaction. Every
+    submitted scan gets a Future resolving to (action, attendance_record).
+    """
+
+    def __init__(self, session_factory, max_batch, max_wait_ms):
+        self.session_factory = session_factory
+        self.max_batch = max_batch
+        self.max_wait = max_wait_ms / 1000
+
+        self._pending = []
+        self._oldest = None
+        self._cond = threading.Condition()
+        self._thread = None
+        self._closed = False
+
+    def submit(self, data):
+        """Queue one AttendanceLogRequest and return its Future"""
+        future = Future()
+
+        with self._cond:
+            if self._closed:
+                raise RuntimeError("Attendance queue is shut down")
+
+            if self._thread is None:
+                self._thread = threading.Thread(
+                    target=self._run, name="attendance-ingest", daemon=True
+                )
+                self._thread.start()
+
+            if not self._pending:
+                self._oldest = time.monotonic()
+            self._pending.append((data, future))
+
+            # Wake the flusher to start a new batch or to cut a full one
+            if len(self._pending) == 1 or len(self._pending) >= self.max_batch:
+                self._cond.notify()
+
+        return future
+
+    def close(self, timeout=5):
+        """Flush whatever is still waiting and stop the flusher thread"""
+        with self._cond:
+            self._closed = True
+            self._cond.notify()
+
+        if self._thread is not None:
+            self._thread.join(timeout)
+
+    def _run(self):
+        while True:
+            with self._cond:
+                while not self._pending and not self._closed:
+                    self._cond.wait()
+
+                if not self._pending:
+                    return
+
+                # Hold the batch open until it is full or the oldest scan times out
+                deadline = self._oldest + self.max_wait
+                while len(self._pending) < self.max_batch and not self._closed:
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        break
+                    self._cond.wait(remaining)
+
+                batch = self._pending[:self.max_batch]
+                del self._pending[:self.max_batch]
+                self._oldest = time.monotonic() if self._pending else None
+
+            try:
+                self._flush(batch)
+            except Exception as e:
+                print(f"❌ Attendance queue flush failed ({len(batch)} scans): {str(e)}")
+                for _, future in batch:
+                    if not future.done():
+                        future.set_exception(e)
+
+    def _flush(self, batch):
+        # Group scans by (user_id, date); one statement cannot touch a row twice
+        groups = {}
+        for data, future in batch:
+            groups.setdefault((data.id, parse_wire_date(data.date)), []).append((data, future))
+
+        now = datetime.now()
+        rows = []
+        for scans in groups.values():
+            first = scans[0][0]
+            last = scans[-1][0]
+            slot_id = next((d.slot_id for d, _ in scans if d.slot_id), None)
+
+            rows.append(scan_row(
+                first.name,
+                first.id,
+                slot_id,
+                first.date,
+                first.time,
+                last.time if len(scans) > 1 else None,
+                now=now,
+                device_id=first.device_id
+            ))
+
+        db = self.session_factory()
+        try:
+            try:
+                results = db.execute(build_scan_upsert(rows)).all()
+            except Exception as e:
+                db.rollback()
+                if len(rows) == 1:
+                    raise
+                print(f"❌ Attendance queue batch failed, retrying its {len(rows)} scans one by one: {str(e)}")
+                results = self._upsert_each(db, groups, rows)
+
+            db.commit()
+            response_cache.invalidate(*attendance_date_tags(*{r.date for r in results}))
+        except Exception:
+            db.rollback()
+            raise
+        finally:
+            db.close()
+
+        records = {(r.user_id, r.date): r for r in results}
+
+        for key, scans in groups.items():
+            if key not in records:
+                continue  # Failed on its own in _upsert_each
+            record = attendance_record_dict(records[key])
+
+            for index, (data, future) in enumerate(scans):
+                if index == 0 and records[key].inserted:
+                    future.set_result(("checked_in", {**record, "checked_out_time": None}))
+                else:
+                    # Report the record as it stood right after this scan
+                    future.set_result((
+                        "checked_out",
+                        {**record, "checked_out_time": format_wire_time(parse_wire_time(data.time))}
+                    ))
+
+    @staticmethod
+    def _upsert_each(db, groups, rows):
+        """
+        Upsert each (user_id, date) group in its own savepoint, so one bad
+        scan fails only its own futures and the rest of the batch commits
+        """
+        results = []
+        for scans, row in zip(groups.values(), rows):
+            try:
+                with db.begin_nested():
+                    results.extend(db.execute(build_scan_upsert([row])).all())
+            except Exception as e:
+                for _, future in scans:
+                    future.set_exception(e)
+        return results
+
+
+attendance_queue = AttendanceIngestQueue(
+    SessionLocal,
+    max_batch=settings.ATTENDANCE_QUEUE_MAX_BATCH,
+    max_wait_ms=settings.ATTENDANCE_QUEUE_MAX_WAIT_MS
+)
@@ -0,0 +1,76 @@
+import json
+import zlib
+
+# Longest accepted NDJSON line; keeps a malformed upload from growing the buffer
+MAX_LINE_BYTES = 64 * 1024
+
+
+async def iter_ndjson(request):
+    """
+    Yield (line_number, object) pairs from an NDJSON request body
+
+    The body is read incrementally from request.stream(). Gzip is decoded on
+    the fly when the request carries Content-Encoding: gzip. Lines that are
+    not valid JSON are yielded as (line_number, ValueError).
+    """
+    decoder = None
+    if "gzip" in request.headers.get("content-encoding", "").lower():
+        decoder = zlib.decompressobj(16 + zlib.MAX_WBITS)
+
+    buffer = b""
+    line_number = 0
+
+    async for piece in _decoded_pieces(request, decoder):
+        buffer += piece
+        lines = buffer.split(b"\n")
+        buffer = lines.pop()
+
+        if len(buffer) > MAX_LINE_BYTES:
+            raise ValueError(f"Line {line_number + len(lines) + 1} exceeds {MAX_LINE_BYTES} bytes")
+
+        for line in lines:
+            line_number += 1
+            item = _parse_line(line)
+            if item is not None:
+                yield line_number, item
+
+    line_number += 1
+    item = _parse_line(buffer)
+    if item is not None:
+        yield line_number, item
+
+
+async def _decoded_pieces(request, decoder):
+    async for chunk in request.stream():
+        if decoder is None:
+            yield chunk
+            continue
+
+        # Cap every inflate step so a small gzip body cannot expand all at once
+        yield _inflate(decoder.decompress, chunk, MAX_LINE_BYTES)
+        while decoder.unconsumed_tail:
+            yield _inflate(decoder.decompress, decoder.unconsumed_tail, MAX_LINE_BYTES)
+
+    if decoder is not None:
+        yield _inflate(decoder.flush)
+        if not decoder.eof:
+            raise ValueError("Truncated gzip body")
+
+
+def _inflate(step, *args):
+    # zlib.error is not a ValueError; the endpoint answers ValueError with 400
+    try:
+        return step(*args)
+    except zlib.error as e:
+        raise ValueError(f"Invalid gzip body: {str(e)}")
+
+
+def _parse_line(line):
+    line = line.strip()
+    if not line:
+        return None
+
+    try:
+        return json.loads(line)
+    except ValueError as e:
+        return ValueError(f"Invalid JSON: {str(e)}")
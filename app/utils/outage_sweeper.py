@@ -0,0 +1,126 @@
+import heapq
+import threading
+from datetime import datetime, timedelta
+from app.core.config import OFFLINE_THRESHOLD_SECONDS
+from app.core.database import SessionLocal
+from app.models.device import DeviceStatusDB
+from app.utils.device_outages import open_missed_outages, open_outage
+from app.utils.heartbeat_buffer import heartbeat_buffer
+
+
+class OutageSweeper:
+    """
+    Detect devices going offline from a heap of heartbeat deadlines
+
+    Each device this worker hears from has one heap entry due at
+    last heartbeat + OFFLINE_THRESHOLD_SECONDS. Heartbeats only move the
+    device's latest time; when an entry comes due the sweeper reschedules
+    it if a later heartbeat arrived, otherwise it re-reads that one device
+    (another worker may have heard from it) and opens an outage. No pass
+    over the whole device table is ever needed after start-up.
+    """
+
+    def __init__(self, session_factory, threshold_seconds):
+        self.session_factory = session_factory
+        self.threshold = timedelta(seconds=threshold_seconds)
+
+        self._heap = []  # (deadline, device_id)
+        self._latest = {}  # device_id -> latest heartbeat; present while scheduled
+        self._cond = threading.Condition()
+        self._thread = None
+        self._stop = threading.Event()
+
+    def heartbeat(self, device_id, when):
+        with self._cond:
+            scheduled = device_id in self._latest
+            if not scheduled or when > self._latest[device_id]:
+                self._latest[device_id] = when
+            if not scheduled:
+                heapq.heappush(self._heap, (when + self.threshold, device_id))
+                self._cond.notify()
+
+    def start(self):
+        """Open outages missed while down, schedule online devices and start sweeping"""
+        if self._thread is not None:
+            return
+
+        now = datetime.now()
+        db = self.session_factory()
+        try:
+            opened = open_missed_outages(db, now - self.threshold)
+            online = db.query(DeviceStatusDB.device_id, DeviceStatusDB.last_seen).filter(
+                DeviceStatusDB.last_seen >= now - self.threshold
+            ).all()
+            db.commit()
+        except Exception as e:
+            db.rollback()
+            print(f"❌ Outage sweeper start-up error: {str(e)}")
+            opened, online = 0, []
+        finally:
+            db.close()
+
+        for device_id, last_seen in online:
+            self.heartbeat(device_id, last_seen)
+
+        self._thread = threading.Thread(target=self._run, name="outage-sweeper", daemon=True)
+        self._thread.start()
+        print(f"✓ Outage sweeper tracking {len(online)} online devices ({opened} missed outages opened)")
+
+    def close(self, timeout=5):
+        self._stop.set()
+        with self._cond:
+            self._cond.notify()
+        if self._thread is not None:
+            self._thread.join(timeout)
+
+    def _run(self):
+        while not self._stop.is_set():
+            with self._cond:
+                now = datetime.now()
+                due = []
+                while self._heap and self._heap[0][0] <= now:
+                    due.append(heapq.heappop(self._heap)[1])
+
+                if not due:
+                    wait = (self._heap[0][0] - now).total_seconds() if self._heap else None
+                    self._cond.wait(wait)
+                    continue
+
+                # Devices with a newer heartbeat just move further down the heap
+                expired = []
+                for device_id in due:
+                    deadline = self._latest[device_id] + self.threshold
+                    if deadline > now:
+                        heapq.heappush(self._heap, (deadline, device_id))
+                    else:
+                        expired.append((device_id, self._latest.pop(device_id)))
+
+            for device_id, last_seen in expired:
+                try:
+                    self._check(device_id, last_seen, now)
+                except Exception as e:
+                    print(f"❌ Outage check error for {device_id}: {str(e)}")
+
+    def _check(self, device_id, last_seen, now):
+        db = self.session_factory()
+        try:
+            stored = db.query(DeviceStatusDB.last_seen).filter_by(device_id=device_id).scalar()
+            candidates = [last_seen, stored, heartbeat_buffer.last_seen(device_id)]
+            last_seen = max(t for t in candidates if t is not None)
+
+            if last_seen + self.threshold > now:
+                # Heard from by another worker: keep watching
+                self.heartbeat(device_id, last_seen)
+                return
+
+            open_outage(db, device_id, last_seen)
+            db.commit()
+            print(f"Device {device_id} offline since {last_seen.isoformat()}")
+        except Exception:
+            db.rollback()
+            raise
+        finally:
+            db.close()
+
+
+outage_sweeper = OutageSweeper(SessionLocal, OFFLINE_THRESHOLD_SECONDS)
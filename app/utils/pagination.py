@@ -0,0 +1,54 @@
+import base64
+import json
+from sqlalchemy import tuple_
+
+# ==================== KEYSET PAGINATION ====================
+# List endpoints page with an opaque cursor holding the sort key of the last
+# row returned. The next page is "sort key > cursor" against an index that
+# matches the sort order, so every page costs the same as the first.
+
+DEFAULT_PAGE_SIZE = 100
+MAX_PAGE_SIZE = 1000
+
+
+def encode_cursor(*values):
+    payload = json.dumps([v.isoformat() if hasattr(v, "isoformat") else v for v in values])
+    return base64.urlsafe_b64encode(payload.encode()).decode().rstrip("=")
+
+
+def decode_cursor(cursor, *types):
+    """Decode a cursor into a tuple, converting each value with its type"""
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        values = json.loads(base64.urlsafe_b64decode(padded))
+        if len(values) != len(types):
+            raise ValueError("wrong number of values")
+        return tuple(kind(value) for kind, value in zip(types, values))
+    except Exception:
+        raise ValueError("Invalid cursor")
+
+
+def paginate(query, columns, cursor_types, limit, cursor=None, descending=False, key=None):
+    """
+    Order query by columns, resume after cursor and fetch one page
+
+    columns may be SQL expressions; key(row) then gives the row's values for
+    them (by default each column's attribute of the row).
+    Returns (rows, next_cursor); next_cursor is None on the last page.
+    """
+    sort_key = tuple_(*columns)
+
+    if cursor:
+        values = tuple_(*decode_cursor(cursor, *cursor_types))
+        query = query.filter(sort_key < values if descending else sort_key > values)
+
+    order = [column.desc() for column in columns] if descending else columns
+    rows = query.order_by(*order).limit(limit + 1).all()
+
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        last = rows[-1]
+        next_cursor = encode_cursor(*(key(last) if key else (getattr(last, column.key) for column in columns)))
+
+    return rows, next_cursor
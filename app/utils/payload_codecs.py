@@ -0,0 +1,114 @@
+import json
+from typing import List, NamedTuple
+import msgpack
+from app.schemas.attendance import AttendanceBulkRequest
+from app.schemas.user import BulkSyncRequest
+from app.utils.attendance_ingest import AttendanceRow
+
+# ==================== DEVICE UPLOAD ENCODINGS ====================
+# application/json        {"logs": [{...}, ...]} / {"users": [{...}, ...]} (Pydantic-validated)
+# COLUMNAR_JSON           {"name": [...], "id": [...], "slot_id": [[...], ...], "date": [...], "time": [...]}
+# MSGPACK_TYPES           the same columnar map, MessagePack-encoded
+# Columnar bodies are decoded straight into row tuples, no model per row.
+
+COLUMNAR_JSON = "application/vnd.attendance.columnar+json"
+MSGPACK_TYPES = ("application/msgpack", "application/x-msgpack", "application/vnd.msgpack")
+
+
+class UserRow(NamedTuple):
+    """One SD-card user; same attribute names as BulkUserData"""
+    name: str
+    id: int
+    slot_id: List[int]
+    date: str
+    time: str
+
+
+def media_type(content_type):
+    return (content_type or "application/json").split(";")[0].strip().lower()
+
+
+def decode_attendance_payload(content_type, body):
+    """Decode a bulk attendance body into a list of AttendanceRow"""
+    columns = _columnar(content_type, body)
+
+    if columns is None:
+        logs = AttendanceBulkRequest.model_validate_json(body).logs
+        return [AttendanceRow(log.name, log.id, log.slot_id, log.date, log.time) for log in logs]
+
+    count = _row_count(columns, ("name", "id", "date", "time"))
+    slot_id = columns.get("slot_id") or [None] * count
+
+    _check_column(columns["name"], str, "name")
+    _check_column(columns["id"], int, "id")
+    _check_column(columns["date"], str, "date")
+    _check_column(columns["time"], str, "time")
+    _check_slots(slot_id, count, allow_missing=True)
+
+    return list(map(AttendanceRow, columns["name"], columns["id"], slot_id, columns["date"], columns["time"]))
+
+
+def decode_user_payload(content_type, body):
+    """Decode a user sync body into BulkUserData-like rows"""
+    columns = _columnar(content_type, body)
+
+    if columns is None:
+        return BulkSyncRequest.model_validate_json(body).users
+
+    count = _row_count(columns, ("name", "id", "slot_id", "date", "time"))
+
+    _check_column(columns["name"], str, "name")
+    _check_column(columns["id"], int, "id")
+    _check_column(columns["date"], str, "date")
+    _check_column(columns["time"], str, "time")
+    _check_slots(columns["slot_id"], count, allow_missing=False)
+
+    return list(map(UserRow, columns["name"], columns["id"], columns["slot_id"], columns["date"], columns["time"]))
+
+
+def _columnar(content_type, body):
+    kind = media_type(content_type)
+
+    if kind == COLUMNAR_JSON:
+        columns = json.loads(body)
+    elif kind in MSGPACK_TYPES:
+        try:
+            columns = msgpack.unpackb(body)
+        except Exception as e:
+            raise ValueError(f"Invalid MessagePack body: {str(e)}")
+    else:
+        return None
+
+    if not isinstance(columns, dict):
+        raise ValueError("Columnar body must be an object of field arrays")
+
+    return columns
+
+
+def _row_count(columns, required):
+    missing = [field for field in required if not isinstance(columns.get(field), list)]
+    if missing:
+        raise ValueError(f"Missing columns: {missing}")
+
+    lengths = {len(columns[field]) for field in required}
+    if len(lengths) != 1:
+        raise ValueError("All columns must have the same length")
+
+    return lengths.pop()
+
+
+def _check_column(values, kind, field):
+    # Checks element types without building anything per row
+    if not set(map(type, values)) <= {kind}:
+        raise ValueError(f"Column '{field}' must only contain {kind.__name__} values")
+
+
+def _check_slots(slot_id, count, allow_missing):
+    if len(slot_id) != count:
+        raise ValueError("All columns must have the same length")
+
+    for slots in slot_id:
+        if slots is None and allow_missing:
+            continue
+        if not isinstance(slots, list) or not set(map(type, slots)) <= {int}:
+            raise ValueError("Column 'slot_id' must contain lists of int")
@@ -0,0 +1,280 @@
+import json
+import threading
+from datetime import date, timedelta
+from functools import partial
+from typing import NamedTuple
+import numpy as np
+from sqlalchemy import text
+from app.models.user import UserInformationDB
+from app.utils.attendance_archive import attendance_archive, next_month
+from app.utils.pg_listener import pg_listener
+
+# ==================== PAYROLL ====================
+# salary is a daily rate. Pay for a date range is days present x rate;
+# hours come from checked_out_time - checked_in_time. Per-user totals are
+# one grouped aggregate over the table plus a NumPy pass over archived
+# months, merged with bincount. Totals of closed months are cached per
+# worker and applied to the current rates on every request.
+
+CHANNEL = "attendance_events"
+
+PAYROLL_AGGREGATE_SQL = """
+    SELECT
+        user_id,
+        count(*) FILTER (WHERE is_present) AS days_present,
+        coalesce(
+            sum(extract(epoch FROM checked_out_time - checked_in_time))
+                FILTER (WHERE is_present AND checked_out_time > checked_in_time),
+            0
+        ) / 3600.0 AS hours_worked
+    FROM attendance_records
+    WHERE date >= :start AND date <= :end
+    GROUP BY user_id
+"""
+
+# Moves with every insert and delete in the month (via the rollup triggers);
+# check-out updates arrive as attendance_events notifications instead
+MONTH_FINGERPRINT_SQL = """
+    SELECT coalesce(sum(total_records), 0), coalesce(sum(checked_out), 0), max(updated_at)
+    FROM daily_attendance_summary
+    WHERE date >= :start AND date < :end
+"""
+
+MICROS_PER_HOUR = 3_600_000_000
+
+
+class PayrollTotals(NamedTuple):
+    """Per-user totals as parallel arrays, user_ids sorted ascending"""
+    user_ids: np.ndarray
+    days_present: np.ndarray
+    hours_worked: np.ndarray
+
+
+EMPTY_TOTALS = PayrollTotals(
+    np.empty(0, dtype=np.int64),
+    np.empty(0, dtype=np.int64),
+    np.empty(0, dtype=np.float64)
+)
+
+
+def merge_totals(parts):
+    """Sum several PayrollTotals per user"""
+    parts = [part for part in parts if len(part.user_ids)]
+    if not parts:
+        return EMPTY_TOTALS
+    if len(parts) == 1:
+        return parts[0]
+
+    user_ids, positions = np.unique(
+        np.concatenate([part.user_ids for part in parts]), return_inverse=True
+    )
+    return PayrollTotals(
+        user_ids,
+        np.bincount(positions, weights=np.concatenate([part.days_present for part in parts]),
+                    minlength=len(user_ids)).astype(np.int64),
+        np.bincount(positions, weights=np.concatenate([part.hours_worked for part in parts]),
+                    minlength=len(user_ids))
+    )
+
+
+def table_totals(db, start, end):
+    """Totals over attendance_records for [start, end] in one grouped aggregate"""
+    rows = db.execute(text(PAYROLL_AGGREGATE_SQL), {"start": start, "end": end}).all()
+    if not rows:
+        return EMPTY_TOTALS
+
+    user_ids = np.fromiter((row[0] for row in rows), dtype=np.int64, count=len(rows))
+    order = np.argsort(user_ids)
+    return PayrollTotals(
+        user_ids[order],
+        np.fromiter((row[1] for row in rows), dtype=np.int64, count=len(rows))[order],
+        np.fromiter((float(row[2]) for row in rows), dtype=np.float64, count=len(rows))[order]
+    )
+
+
+def archived_totals(archived, start, end, exclude=None):
+    """Totals over one ArchivedMonth for [start, end], straight off its columns"""
+    positions = archived.select(start, end, exclude=exclude)
+    if not len(positions):
+        return EMPTY_TOTALS
+
+    present = np.asarray(archived.column("is_present"))[positions]
+    user_ids = np.asarray(archived.column("user_id"))[positions][present].astype(np.int64)
+    checked_in = np.asarray(archived.column("checked_in_time"))[positions][present]
+    checked_out = np.asarray(archived.column("checked_out_time"))[positions][present]
+
+    # -1 marks a NULL time; only complete, positive shifts count
+    worked = np.where(
+        (checked_in >= 0) & (checked_out > checked_in), checked_out - checked_in, 0
+    ) / MICROS_PER_HOUR
+
+    unique_ids, groups = np.unique(user_ids, return_inverse=True)
+    return PayrollTotals(
+        unique_ids,
+        np.bincount(groups, minlength=len(unique_ids)).astype(np.int64),
+        np.bincount(groups, weights=worked, minlength=len(unique_ids))
+    )
+
+
+def range_totals(db, start, end, archive=attendance_archive):
+    """
+    Totals for [start, end]: every table row, plus archived rows the table
+    does not also hold (a late row for an archived date wins over the archive)
+    """
+    parts = [table_totals(db, start, end)]
+    boundary = archive.boundary()
+
+    if boundary is not None and start < boundary:
+        exclude = archive.superseded(db, start, end, boundary)
+        for month in archive.months():
+            if month > end or next_month(month) <= start:
+                continue
+            archived = archive.month(month)
+            if archived is not None:
+                parts.append(archived_totals(archived, start, end, exclude))
+
+    return merge_totals(parts)
+
+
+class PayrollMonthCache:
+    """
+    Totals of closed months, kept until the month's attendance changes
+
+    An entry is trusted while the LISTEN connection stayed up since it was
+    computed (same listener generation), no attendance_events notification
+    for the month arrived (same month version) and the month's rollup
+    fingerprint is unchanged, which covers deletes.
+    """
+
+    def __init__(self, listener, channel=CHANNEL):
+        self.listener = listener
+
+        self._versions = {}  # month -> notifications seen
+        self._entries = {}  # month -> (generation, version, fingerprint, PayrollTotals)
+        self._lock = threading.Lock()
+
+        self.hits = 0
+        self.misses = 0
+
+        listener.listen(channel, self._notify)
+
+    def totals(self, db, month, compute):
+        """PayrollTotals for a closed month; compute(db, start, end) runs on a miss"""
+        self.listener.start()
+        bounds = {"start": month, "end": next_month(month)}
+        fingerprint = tuple(db.execute(text(MONTH_FINGERPRINT_SQL), bounds).one())
+
+        with self._lock:
+            generation = self.listener.generation
+            connected = self.listener.connected
+            version = self._versions.get(month, 0)
+
+            entry = self._entries.get(month)
+            if connected and entry and entry[:3] == (generation, version, fingerprint):
+                self.hits += 1
+                return entry[3]
+            self.misses += 1
+
+        totals = compute(db, month, bounds["end"] - timedelta(days=1))
+
+        with self._lock:
+            if (
+                connected
+                and self.listener.connected
+                and self.listener.generation == generation
+                and self._versions.get(month, 0) == version
+            ):
+                self._entries[month] = (generation, version, fingerprint, totals)
+
+        return totals
+
+    def stats(self):
+        with self._lock:
+            return {
+                "listener_connected": self.listener.connected,
+                "cached_months": len(self._entries),
+                "hits": self.hits,
+                "misses": self.misses
+            }
+
+    def _notify(self, payload):
+        months = {
+            date.fromisoformat(event["date"]).replace(day=1)
+            for event in json.loads(payload)
+        }
+        with self._lock:
+            for month in months:
+                self._versions[month] = self._versions.get(month, 0) + 1
+                self._entries.pop(month, None)
+
+
+payroll_month_cache = PayrollMonthCache(pg_listener)
+
+
+def compute_payroll(db, start, end, today=None, cache=payroll_month_cache, archive=attendance_archive):
+    """
+    Days present, hours worked and gross pay for every user over [start, end]
+
+    Whole closed months come from the month cache, partial and open months
+    are aggregated on the spot. Returns (users, totals).
+    """
+    open_from = (today or date.today()).replace(day=1)
+
+    parts = []
+    segment_start = start
+    while segment_start <= end:
+        month = segment_start.replace(day=1)
+        segment_end = min(end, next_month(month) - timedelta(days=1))
+        whole_month = segment_start == month and segment_end == next_month(month) - timedelta(days=1)
+
+        if cache is not None and whole_month and month < open_from:
+            parts.append(cache.totals(db, month, partial(range_totals, archive=archive)))
+        else:
+            parts.append(range_totals(db, segment_start, segment_end, archive))
+        segment_start = segment_end + timedelta(days=1)
+
+    totals = merge_totals(parts)
+
+    roster = db.query(
+        UserInformationDB.user_id,
+        UserInformationDB.name,
+        UserInformationDB.salary
+    ).order_by(UserInformationDB.user_id).all()
+
+    # Every enrolled user, plus ids that only appear in attendance
+    roster_ids = np.fromiter((row.user_id for row in roster), dtype=np.int64, count=len(roster))
+    user_ids = np.union1d(roster_ids, totals.user_ids)
+
+    days = np.zeros(len(user_ids), dtype=np.int64)
+    hours = np.zeros(len(user_ids), dtype=np.float64)
+    found = np.searchsorted(user_ids, totals.user_ids)
+    days[found] = totals.days_present
+    hours[found] = totals.hours_worked
+
+    rates = np.full(len(user_ids), np.nan)
+    rates[np.searchsorted(user_ids, roster_ids)] = [
+        float(row.salary) if row.salary is not None else np.nan for row in roster
+    ]
+    gross = days * rates
+
+    names = {row.user_id: row.name for row in roster}
+    users = [
+        {
+            "user_id": int(user_id),
+            "name": names.get(int(user_id)),
+            "daily_rate": None if np.isnan(rates[i]) else float(rates[i]),
+            "days_present": int(days[i]),
+            "hours_worked": round(float(hours[i]), 2),
+            "gross_pay": None if np.isnan(gross[i]) else round(float(gross[i]), 2)
+        }
+        for i, user_id in enumerate(user_ids)
+    ]
+
+    summary = {
+        "users": len(users),
+        "days_present": int(days.sum()),
+        "hours_worked": round(float(hours.sum()), 2),
+        "gross_pay": round(float(np.nansum(gross)), 2),
+        "users_without_rate": int(np.isnan(rates).sum())
+    }
+    return users, summary
@@ -0,0 +1,104 @@
+import select
+import threading
+from app.core.database import engine
+
+# ==================== POSTGRES LISTEN CONNECTION ====================
+# One dedicated LISTEN connection per worker, shared by every in-process
+# consumer of NOTIFY channels (live attendance feed, sync trigger waits).
+
+
+class PgListener:
+    """
+    Background thread LISTENing on registered channels
+
+    Callbacks run on the listener thread with the notification payload.
+    `connected` is True while the LISTEN session is up; `generation` moves
+    on every (re)connect, since notifications sent while disconnected are
+    lost and anything derived from earlier ones must be re-read.
+    """
+
+    def __init__(self, engine, reconnect_delay=2):
+        self.engine = engine
+        self.reconnect_delay = reconnect_delay
+
+        self.connected = False
+        self.generation = 0
+
+        self._callbacks = {}  # channel -> [callback]
+        self._lock = threading.Lock()
+        self._thread = None
+        self._stop = threading.Event()
+
+    def listen(self, channel, callback):
+        """Register callback for channel; takes effect on the next (re)connect if already running"""
+        with self._lock:
+            self._callbacks.setdefault(channel, []).append(callback)
+
+    def start(self):
+        """Start the listener thread if it is not running"""
+        with self._lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._stop.clear()
+                self._thread = threading.Thread(
+                    target=self._run, name="pg-listener", daemon=True
+                )
+                self._thread.start()
+
+    def close(self, timeout=5):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+
+    def _run(self):
+        while not self._stop.is_set():
+            try:
+                self._listen()
+            except Exception as e:
+                print(f"❌ Postgres listener error: {str(e)}")
+                self._stop.wait(self.reconnect_delay)
+
+    def _listen(self):
+        # Detached from the pool: this connection lives as long as the listener
+        fairy = self.engine.raw_connection()
+        fairy.detach()
+        conn = fairy.dbapi_connection
+
+        try:
+            conn.autocommit = True
+            with self._lock:
+                channels = list(self._callbacks)
+
+            cursor = conn.cursor()
+            for channel in channels:
+                cursor.execute(f"LISTEN {channel}")
+            cursor.close()
+
+            self.generation += 1
+            self.connected = True
+            print(f"✓ Listening on {', '.join(channels)}")
+
+            while not self._stop.is_set():
+                # Wake up once a second to notice close()
+                if select.select([conn], [], [], 1) == ([], [], []):
+                    continue
+
+                conn.poll()
+                while conn.notifies:
+                    notify = conn.notifies.pop(0)
+                    self._dispatch(notify.channel, notify.payload)
+        finally:
+            self.connected = False
+            conn.close()
+
+    def _dispatch(self, channel, payload):
+        with self._lock:
+            callbacks = list(self._callbacks.get(channel, ()))
+
+        for callback in callbacks:
+            try:
+                callback(payload)
+            except Exception as e:
+                print(f"❌ {channel} notification handler error: {str(e)}")
+
+
+pg_listener = PgListener(engine)
@@ -0,0 +1,228 @@
+import argparse
+from datetime import datetime
+import numpy as np
+from sqlalchemy import text
+from sqlalchemy.dialects.postgresql import insert
+from app.core.database import SessionLocal
+from app.models.attendance import AttendancePresenceDB
+from app.utils.attendance_archive import attendance_archive, next_month
+
+# ==================== PRESENCE BITMAP INDEX ====================
+# attendance_presence holds one 31-bit bitmap per (user_id, month): bit d-1
+# is set when the user was present on day d. Triggers on attendance_records
+# (migration 0011) keep it current for every write path, and it keeps the
+# months that were archived or retired from the table. Per-user counts,
+# streaks and roster-wide set operations are bit operations over NumPy
+# arrays of these bitmaps.
+
+REBUILD_FROM_TABLE_SQL = """
+    INSERT INTO attendance_presence (user_id, month, days)
+    SELECT user_id, date_trunc('month', date)::date, bit_or(1 << (extract(day FROM date)::int - 1))
+    FROM attendance_records
+    WHERE is_present
+    GROUP BY 1, 2
+"""
+
+ARCHIVE_INSERT_BATCH = 5000
+
+
+def parse_month(value):
+    """YYYY-MM -> first day of that month"""
+    try:
+        return datetime.strptime(value, "%Y-%m").date()
+    except (TypeError, ValueError):
+        raise ValueError(f"Invalid month '{value}', expected YYYY-MM")
+
+
+def month_range(start, end):
+    """Months from start to end inclusive"""
+    months = []
+    month = start
+    while month <= end:
+        months.append(month)
+        month = next_month(month)
+    return months
+
+
+def popcount(days):
+    """Set bits per element of a uint32 array"""
+    if hasattr(np, "bitwise_count"):
+        return np.bitwise_count(days).astype(np.int32)
+    days = days - ((days >> 1) & 0x55555555)
+    days = (days & 0x33333333) + ((days >> 2) & 0x33333333)
+    return ((((days + (days >> 4)) & 0x0F0F0F0F) * 0x01010101) >> 24).astype(np.int32)
+
+
+def longest_streak(days):
+    """Longest run of consecutive set bits per element of a uint32 array"""
+    streak = np.zeros(days.shape, dtype=np.int32)
+    remaining = days.copy()
+    while remaining.any():
+        streak += remaining != 0
+        remaining &= remaining >> 1
+    return streak
+
+
+def day_list(bitmap):
+    """Days of the month set in one bitmap"""
+    return [day + 1 for day in range(31) if bitmap >> day & 1]
+
+
+def load_bitmaps(db, months, user_ids=None):
+    """
+    Bitmaps for months as (user_ids, matrix): matrix[i, j] is user_ids[i]'s
+    bitmap for months[j], 0 where there is no row
+    """
+    query = db.query(
+        AttendancePresenceDB.user_id,
+        AttendancePresenceDB.month,
+        AttendancePresenceDB.days
+    ).filter(AttendancePresenceDB.month.in_(months))
+    if user_ids is not None:
+        query = query.filter(AttendancePresenceDB.user_id.in_(user_ids))
+
+    rows = query.all()
+    if not rows:
+        return np.empty(0, dtype=np.int64), np.zeros((0, len(months)), dtype=np.uint32)
+
+    row_users = np.fromiter((row.user_id for row in rows), dtype=np.int64, count=len(rows))
+    month_index = {month: j for j, month in enumerate(months)}
+    row_months = np.fromiter((month_index[row.month] for row in rows), dtype=np.int64, count=len(rows))
+    row_days = np.fromiter((row.days for row in rows), dtype=np.uint32, count=len(rows))
+
+    users, positions = np.unique(row_users, return_inverse=True)
+    matrix = np.zeros((len(users), len(months)), dtype=np.uint32)
+    matrix[positions, row_months] = row_days
+    return users, matrix
+
+
+def working_days(matrix):
+    """Per month, the days on which anyone was present (OR over the roster)"""
+    if not len(matrix):
+        return np.zeros(matrix.shape[1], dtype=np.uint32)
+    return np.bitwise_or.reduce(matrix, axis=0)
+
+
+def user_presence(db, user_id, months):
+    """Per-month presence of one user"""
+    users, matrix = load_bitmaps(db, months, [user_id])
+    bitmaps = matrix[0] if len(users) else np.zeros(len(months), dtype=np.uint32)
+    counts = popcount(bitmaps)
+    streaks = longest_streak(bitmaps)
+
+    return [
+        {
+            "month": month.strftime("%Y-%m"),
+            "days_present": int(counts[j]),
+            "present_days": day_list(int(bitmaps[j])),
+            "longest_streak": int(streaks[j])
+        }
+        for j, month in enumerate(months)
+    ]
+
+
+def roster_presence(db, months):
+    """Days present and longest streak per user over months, plus the working days"""
+    users, matrix = load_bitmaps(db, months)
+    counts = popcount(matrix)
+    streaks = longest_streak(matrix)
+    worked = working_days(matrix)
+
+    return {
+        "working_days": int(popcount(worked).sum()),
+        "users": [
+            {
+                "user_id": int(user_id),
+                "days_present": int(counts[i].sum()),
+                "longest_streak": int(streaks[i].max()) if len(months) else 0
+            }
+            for i, user_id in enumerate(users)
+        ]
+    }
+
+
+def perfect_attendance(db, months):
+    """
+    Users present on every working day of months; a working day is one on
+    which anyone was present
+    """
+    users, matrix = load_bitmaps(db, months)
+    worked = working_days(matrix)
+    perfect = np.all((matrix & worked) == worked, axis=1)
+    return {
+        "working_days": int(popcount(worked).sum()),
+        "user_ids": [int(user_id) for user_id in users[perfect]]
+    }
+
+
+def archived_bitmaps(archived, month):
+    """(user_ids, bitmaps) of one ArchivedMonth, computed over its columns"""
+    present = np.asarray(archived.column("is_present"))
+    if not present.any():
+        return np.empty(0, dtype=np.int64), np.empty(0, dtype=np.uint32)
+
+    user_ids = np.asarray(archived.column("user_id"))[present].astype(np.int64)
+    days = (np.asarray(archived.column("date"))[present] - np.datetime64(month, "D")).astype(np.int64)
+    bits = np.left_shift(np.uint32(1), days.astype(np.uint32))
+
+    order = np.argsort(user_ids, kind="stable")
+    user_ids, bits = user_ids[order], bits[order]
+    starts = np.flatnonzero(np.r_[True, user_ids[1:] != user_ids[:-1]])
+    return user_ids[starts], np.bitwise_or.reduceat(bits, starts)
+
+
+def rebuild_presence(db, archive=attendance_archive):
+    """
+    Regenerate attendance_presence from attendance_records and the archive
+    Runs inside the caller's transaction; the caller commits
+    """
+    db.execute(text("LOCK TABLE attendance_presence IN EXCLUSIVE MODE"))
+    db.execute(text("DELETE FROM attendance_presence"))
+    from_table = db.execute(text(REBUILD_FROM_TABLE_SQL)).rowcount
+
+    from_archive = 0
+    for month in archive.months():
+        archived = archive.month(month)
+        if archived is None:
+            continue
+
+        user_ids, bitmaps = archived_bitmaps(archived, month)
+        for start in range(0, len(user_ids), ARCHIVE_INSERT_BATCH):
+            rows = [
+                {"user_id": int(user_id), "month": month, "days": int(days)}
+                for user_id, days in zip(
+                    user_ids[start:start + ARCHIVE_INSERT_BATCH],
+                    bitmaps[start:start + ARCHIVE_INSERT_BATCH]
+                )
+            ]
+            stmt = insert(AttendancePresenceDB).values(rows)
+            # Late rows for an archived month may still sit in the table
+            db.execute(stmt.on_conflict_do_update(
+                index_elements=[AttendancePresenceDB.user_id, AttendancePresenceDB.month],
+                set_={"days": AttendancePresenceDB.days.op("|")(stmt.excluded.days)}
+            ))
+            from_archive += len(rows)
+
+    return {"from_table": from_table, "from_archive": from_archive}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Attendance presence bitmap index")
+    parser.add_argument("command", choices=["rebuild"])
+    parser.parse_args()
+
+    db = SessionLocal()
+    try:
+        result = rebuild_presence(db)
+        db.commit()
+        print(f"✓ Presence index rebuilt: {result['from_table']} bitmaps from the table, "
+              f"{result['from_archive']} from the archive")
+    except Exception:
+        db.rollback()
+        raise
+    finally:
+        db.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,183 @@
+import threading
+import time
+from collections import OrderedDict
+from functools import wraps
+from app.core.config import settings
+from app.utils.wire_format import parse_wire_date
+
+# ==================== READ ENDPOINT RESPONSE CACHE ====================
+# In-process cache for read endpoints that admin dashboards poll. Entries
+# are bounded in number, expire after a TTL and are evicted least recently
+# used first. Each entry carries tags naming the data it was built from;
+# mutation endpoints invalidate those tags after they commit.
+#
+# Tags in use:
+#   "users"                   user_information
+#   "attendance"              attendance_records (any date)
+#   "attendance:YYYY-MM-DD"   attendance_records for one date
+
+
+class ResponseCache:
+    """Size-bounded TTL + LRU cache with tag invalidation and hit/miss counters"""
+
+    def __init__(self, max_entries, ttl_seconds, clock=time.monotonic):
+        self.max_entries = max_entries
+        self.ttl = ttl_seconds
+        self.clock = clock
+
+        self._entries = OrderedDict()  # key -> (expires_at, tags, value)
+        self._tagged = {}  # tag -> set of keys
+        self._invalidated_at = {}  # tag -> generation of its last invalidation
+        self._generation = 0
+        self._lock = threading.Lock()
+
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+
+    def generation(self):
+        """Mark taken before building a value; pass it to set() as since"""
+        with self._lock:
+            return self._generation
+
+    def get(self, key):
+        """Return (True, value) on a fresh hit, (False, None) otherwise"""
+        with self._lock:
+            entry = self._entries.get(key)
+
+            if entry is None:
+                self.misses += 1
+                return False, None
+
+            if entry[0] <= self.clock():
+                self._remove(key)
+                self.misses += 1
+                return False, None
+
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return True, entry[2]
+
+    def set(self, key, value, tags=(), since=None):
+        """
+        Store value under key
+
+        With since (a generation() mark), the value is dropped if any of its
+        tags was invalidated after the mark: it may predate that write.
+        """
+        with self._lock:
+            if since is not None and any(
+                self._invalidated_at.get(tag, -1) > since for tag in tags
+            ):
+                return
+
+            if key in self._entries:
+                self._remove(key)
+
+            self._entries[key] = (self.clock() + self.ttl, tuple(tags), value)
+            for tag in tags:
+                self._tagged.setdefault(tag, set()).add(key)
+
+            while len(self._entries) > self.max_entries:
+                self._remove(next(iter(self._entries)))
+                self.evictions += 1
+
+    def invalidate(self, *tags):
+        """Drop every entry carrying any of tags"""
+        with self._lock:
+            self._generation += 1
+
+            for tag in tags:
+                self._invalidated_at[tag] = self._generation
+
+                for key in list(self._tagged.get(tag, ())):
+                    self._remove(key)
+                    self.invalidations += 1
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._tagged.clear()
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "entries": len(self._entries),
+                "max_entries": self.max_entries,
+                "ttl_seconds": self.ttl,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_ratio": round(self.hits / lookups, 4) if lookups else None,
+                "evictions": self.evictions,
+                "invalidations": self.invalidations
+            }
+
+    def _remove(self, key):
+        _, tags, _ = self._entries.pop(key)
+        for tag in tags:
+            keys = self._tagged.get(tag)
+            if keys is not None:
+                keys.discard(key)
+                if not keys:
+                    del self._tagged[tag]
+
+
+def cached_response(tags, cache=None):
+    """
+    Cache a read endpoint's return value
+
+    tags is a tuple of tags or a callable taking the endpoint's keyword
+    arguments and returning them. The key is the endpoint name plus its
+    arguments, except the db session. Exceptions are never cached.
+    """
+    def decorator(endpoint):
+        @wraps(endpoint)
+        def wrapper(**kwargs):
+            store = cache or response_cache
+            if not settings.RESPONSE_CACHE_ENABLED:
+                return endpoint(**kwargs)
+
+            key = (endpoint.__name__,) + tuple(
+                sorted((name, _key_value(value)) for name, value in kwargs.items() if name != "db")
+            )
+
+            hit, value = store.get(key)
+            if hit:
+                return value
+
+            since = store.generation()
+            value = endpoint(**kwargs)
+            store.set(key, value, tags(**kwargs) if callable(tags) else tags, since=since)
+            return value
+
+        return wrapper
+
+    return decorator
+
+
+def _key_value(value):
+    return tuple(value) if isinstance(value, list) else value
+
+
+def attendance_date_tags(*dates):
+    """Tags to invalidate after writing attendance for dates"""
+    return ("attendance",) + tuple(f"attendance:{d.isoformat()}" for d in dates)
+
+
+def attendance_row_tags(rows):
+    """Tags to invalidate after ingesting a batch of attendance rows"""
+    dates = set()
+    for row in rows:
+        try:
+            dates.add(parse_wire_date(row.date))
+        except (ValueError, TypeError, AttributeError):
+            continue
+    return attendance_date_tags(*dates)
+
+
+response_cache = ResponseCache(
+    max_entries=settings.RESPONSE_CACHE_MAX_ENTRIES,
+    ttl_seconds=settings.RESPONSE_CACHE_TTL_SECONDS
+)
@@ -0,0 +1,109 @@
+import asyncio
+import threading
+from app.utils.pg_listener import pg_listener
+
+# ==================== SYNC TRIGGER WAITS ====================
+# attendance_sync_triggers NOTIFYs sync_triggers with the device_id whenever
+# a trigger is created or changes status (migration 0007). Devices long-poll
+# on an in-process waiter map woken by those notifications, and the last
+# pending-trigger lookup per device is kept until a notification says it
+# changed, so an idle device costs no queries at all.
+
+CHANNEL = "sync_triggers"
+
+
+class SyncTriggerWaits:
+    """
+    Per-device waiters and pending-trigger lookups, both driven by NOTIFY
+
+    A cached lookup is only trusted while the listener has stayed connected
+    since it was read (same listener generation) and no notification for
+    the device arrived in between (same device version).
+    """
+
+    def __init__(self, listener, channel=CHANNEL):
+        self.listener = listener
+
+        self._waiters = {}  # device_id -> {asyncio.Event: loop}
+        self._versions = {}  # device_id -> notifications seen
+        self._known = {}  # device_id -> (generation, version, pending)
+        self._lock = threading.Lock()
+
+        self.lookups = 0
+        self.queries = 0
+
+        listener.listen(channel, self._notify)
+
+    def register(self, device_id):
+        """Event set when the device's triggers change; call before lookup()"""
+        self.listener.start()
+        event = asyncio.Event()
+
+        with self._lock:
+            self._waiters.setdefault(device_id, {})[event] = asyncio.get_running_loop()
+
+        return event
+
+    def unregister(self, device_id, event):
+        with self._lock:
+            waiters = self._waiters.get(device_id)
+            if waiters is not None:
+                waiters.pop(event, None)
+                if not waiters:
+                    del self._waiters[device_id]
+
+    def lookup(self, device_id, fetch):
+        """
+        Pending trigger for device_id as returned by fetch(device_id)
+        fetch only runs when there is no trustworthy cached answer
+        """
+        self.listener.start()
+
+        with self._lock:
+            self.lookups += 1
+            generation = self.listener.generation
+            connected = self.listener.connected
+            version = self._versions.get(device_id, 0)
+
+            known = self._known.get(device_id)
+            if connected and known and known[:2] == (generation, version):
+                return known[2]
+
+        pending = fetch(device_id)
+
+        with self._lock:
+            self.queries += 1
+            if (
+                connected
+                and self.listener.connected
+                and self.listener.generation == generation
+                and self._versions.get(device_id, 0) == version
+            ):
+                self._known[device_id] = (generation, version, pending)
+
+        return pending
+
+    def stats(self):
+        with self._lock:
+            return {
+                "listener_connected": self.listener.connected,
+                "waiting_devices": len(self._waiters),
+                "lookups": self.lookups,
+                "queries": self.queries
+            }
+
+    def _notify(self, device_id):
+        with self._lock:
+            self._versions[device_id] = self._versions.get(device_id, 0) + 1
+            self._known.pop(device_id, None)
+            waiters = list(self._waiters.get(device_id, {}).items())
+
+        for event, loop in waiters:
+            try:
+                loop.call_soon_threadsafe(event.set)
+            except RuntimeError:
+                # Loop already closed
+                self.unregister(device_id, event)
+
+
+sync_trigger_waits = SyncTriggerWaits(pg_listener)
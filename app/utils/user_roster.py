@@ -0,0 +1,169 @@
+import threading
+import time
+from typing import NamedTuple, Optional, Tuple
+from datetime import datetime
+from sqlalchemy import text
+from app.core.config import settings
+from app.core.database import SessionLocal
+from app.models.user import UserInformationDB
+
+# ==================== IN-PROCESS USER ROSTER ====================
+# Devices look users up by slot or id on nearly every scan, while the
+# roster changes a few times a day. Each worker keeps the roster as plain
+# tuples keyed by user_id plus a slot -> user_id dict.
+#
+# roster_version (migration 0009) is bumped by a statement trigger on every
+# write to user_information. A worker re-reads that one row at most every
+# USER_ROSTER_VERSION_CHECK_SECONDS and reloads when another worker moved
+# it; its own writes patch the index in place.
+
+ROSTER_VERSION_SQL = "SELECT version FROM roster_version WHERE id = 1"
+
+
+class RosterEntry(NamedTuple):
+    name: str
+    user_id: int
+    slot_id: Tuple[int, ...]
+    date: str
+    time: str
+    salary: Optional[float]
+    created_at: datetime
+
+
+def roster_entry(user):
+    """RosterEntry from a UserInformationDB row (or any row with its columns)"""
+    return RosterEntry(
+        user.name,
+        user.user_id,
+        tuple(user.slot_id or ()),
+        user.date,
+        user.time,
+        float(user.salary) if user.salary is not None else None,
+        user.created_at
+    )
+
+
+class UserRoster:
+    """Lazily loaded user_id/slot index, validated against roster_version"""
+
+    def __init__(self, session_factory, check_interval):
+        self.session_factory = session_factory
+        self.check_interval = check_interval
+
+        self._by_user_id = None  # user_id -> RosterEntry; None until loaded
+        self._by_slot = {}  # slot_id -> user_id
+        self._version = None
+        self._checked_at = 0
+        self._lock = threading.Lock()
+
+        self.loads = 0
+
+    def by_user_id(self, user_id):
+        return self._current()[0].get(user_id)
+
+    def by_slot(self, slot_id):
+        by_user_id, by_slot = self._current()
+        user_id = by_slot.get(slot_id)
+        return by_user_id.get(user_id) if user_id is not None else None
+
+    def invalidate(self):
+        """Drop the index; the next lookup reloads it"""
+        with self._lock:
+            self._by_user_id = None
+
+    def patch(self, db, upsert=(), remove=()):
+        """
+        Apply this worker's own single-statement write after it committed
+
+        If roster_version moved by exactly that one write, the index is
+        patched and stays valid; otherwise another worker wrote too and the
+        index is dropped.
+        """
+        try:
+            version = db.execute(text(ROSTER_VERSION_SQL)).scalar()
+        except Exception as e:
+            # The write itself is committed; just fall back to a reload
+            db.rollback()
+            print(f"❌ Roster version read error: {str(e)}")
+            self.invalidate()
+            return
+
+        with self._lock:
+            if self._by_user_id is None:
+                return
+
+            if self._version is None or version != self._version + 1:
+                self._by_user_id = None
+                return
+
+            by_user_id = dict(self._by_user_id)
+            by_slot = dict(self._by_slot)
+
+            for user_id in remove:
+                entry = by_user_id.pop(user_id, None)
+                for slot in entry.slot_id if entry else ():
+                    by_slot.pop(slot, None)
+
+            for user in upsert:
+                entry = roster_entry(user)
+                previous = by_user_id.get(entry.user_id)
+                for slot in previous.slot_id if previous else ():
+                    by_slot.pop(slot, None)
+                by_user_id[entry.user_id] = entry
+                by_slot.update((slot, entry.user_id) for slot in entry.slot_id)
+
+            # Swap whole dicts so lock-free readers never see a half-applied patch
+            self._by_user_id, self._by_slot = by_user_id, by_slot
+            self._version = version
+
+    def stats(self):
+        by_user_id = self._by_user_id
+        return {
+            "loaded": by_user_id is not None,
+            "users": len(by_user_id) if by_user_id is not None else 0,
+            "slots": len(self._by_slot) if by_user_id is not None else 0,
+            "version": self._version,
+            "loads": self.loads
+        }
+
+    def _current(self):
+        by_user_id, by_slot = self._by_user_id, self._by_slot
+
+        if by_user_id is not None and time.monotonic() - self._checked_at < self.check_interval:
+            return by_user_id, by_slot
+
+        with self._lock:
+            db = self.session_factory()
+            try:
+                version = db.execute(text(ROSTER_VERSION_SQL)).scalar()
+
+                if self._by_user_id is None or version != self._version:
+                    # Version read first: a write landing mid-load only causes another reload
+                    rows = db.query(
+                        UserInformationDB.name,
+                        UserInformationDB.user_id,
+                        UserInformationDB.slot_id,
+                        UserInformationDB.date,
+                        UserInformationDB.time,
+                        UserInformationDB.salary,
+                        UserInformationDB.created_at
+                    ).all()
+
+                    by_user_id = {}
+                    by_slot = {}
+                    for row in rows:
+                        entry = roster_entry(row)
+                        by_user_id[entry.user_id] = entry
+                        by_slot.update((slot, entry.user_id) for slot in entry.slot_id)
+
+                    self._by_user_id, self._by_slot = by_user_id, by_slot
+                    self._version = version
+                    self.loads += 1
+
+                self._checked_at = time.monotonic()
+                return self._by_user_id, self._by_slot
+            finally:
+                db.close()
+
+
+user_roster = UserRoster(SessionLocal, settings.USER_ROSTER_VERSION_CHECK_SECONDS)
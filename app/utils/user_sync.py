@@ -0,0 +1,142 @@
+from sqlalchemy import Integer, any_, bindparam, delete, func, select
+from sqlalchemy.dialects.postgresql import ARRAY, insert
+from app.models.attendance import AttendanceRecordDB
+from app.models.user import UserInformationDB, FingerprintSlotDB
+
+INSERT_CHUNK_SIZE = 1000
+
+
+def sync_users(db, users):
+    """
+    Add SD-card users that are not in the database yet
+
+    users is a list of BulkUserData. Users whose id already exists are
+    skipped; users with an occupied slot are reported in error_details.
+    Only the ids and slots of this batch are looked up, so the cost follows
+    the batch size rather than the roster size.
+    Runs inside the caller's transaction; the caller commits.
+    """
+    new_users_added = 0
+    existing_users_skipped = 0
+    errors = 0
+    error_details = []
+
+    incoming_ids = list({u.id for u in users if getattr(u, "id", None) is not None})
+    incoming_slots = list({s for u in users for s in (getattr(u, "slot_id", None) or ())})
+
+    # Index probes on user_information.user_id and fingerprint_slots' primary key
+    existing_user_ids = set(
+        uid for (uid,) in db.query(UserInformationDB.user_id).filter(
+            UserInformationDB.user_id == any_(bindparam("ids", incoming_ids, type_=ARRAY(Integer)))
+        )
+    ) if incoming_ids else set()
+
+    all_existing_slots = set(
+        slot for (slot,) in db.query(FingerprintSlotDB.slot_id).filter(
+            FingerprintSlotDB.slot_id == any_(bindparam("slots", incoming_slots, type_=ARRAY(Integer)))
+        )
+    ) if incoming_slots else set()
+
+    new_users_to_add = []
+
+    # Earlier rows of the batch win over later ones, as when saved one by one
+    for idx, user_data in enumerate(users):
+        try:
+            # Check if user already exists
+            if user_data.id in existing_user_ids:
+                existing_users_skipped += 1
+                continue
+
+            # Check if ANY slot is already occupied
+            occupied = next((slot for slot in user_data.slot_id if slot in all_existing_slots), None)
+            if occupied is not None:
+                errors += 1
+                error_details.append({
+                    "index": idx,
+                    "user_id": user_data.id,
+                    "name": user_data.name,
+                    "error": f"Slot {occupied} already occupied"
+                })
+                continue
+
+            new_users_to_add.append({
+                "name": user_data.name,
+                "user_id": user_data.id,
+                "slot_id": list(user_data.slot_id),  # Array of slots
+                "date": user_data.date,
+                "time": user_data.time,
+                "salary": None
+            })
+
+            # Update tracking
+            existing_user_ids.add(user_data.id)
+            all_existing_slots.update(user_data.slot_id)
+
+        except Exception as e:
+            errors += 1
+            error_details.append({
+                "index": idx,
+                "user_id": user_data.id if hasattr(user_data, 'id') else None,
+                "error": str(e)
+            })
+
+    # Multi-row insert; a user added concurrently by another sync is skipped, not an error
+    for start in range(0, len(new_users_to_add), INSERT_CHUNK_SIZE):
+        chunk = new_users_to_add[start:start + INSERT_CHUNK_SIZE]
+        stmt = insert(UserInformationDB).values(chunk).on_conflict_do_nothing(
+            index_elements=[UserInformationDB.user_id]
+        ).returning(UserInformationDB.user_id)
+
+        inserted = len(db.execute(stmt).all())
+        new_users_added += inserted
+        existing_users_skipped += len(chunk) - inserted
+
+    return {
+        "total_received": len(users),
+        "new_users_added": new_users_added,
+        "existing_users_skipped": existing_users_skipped,
+        "errors": errors,
+        "error_details": error_details
+    }
+
+
+def reconcile_users(db, sd_user_ids, dry_run=False):
+    """
+    Delete users (and their attendance) that are not on the SD card
+
+    sd_user_ids is every user id the device still holds. Both deletes are
+    single anti-join statements, so a sensor wipe costs two statements
+    however many users it removes. With dry_run nothing is deleted and the
+    same counts are reported.
+    Runs inside the caller's transaction; the caller commits.
+    """
+    sd_ids = bindparam("sd_ids", sorted(set(sd_user_ids)), type_=ARRAY(Integer))
+    missing = ~(UserInformationDB.user_id == any_(sd_ids))
+    missing_user_ids = select(UserInformationDB.user_id).where(missing)
+
+    if dry_run:
+        user_ids = [uid for (uid,) in db.execute(missing_user_ids.order_by(UserInformationDB.user_id))]
+        attendance = select(AttendanceRecordDB.date).where(
+            AttendanceRecordDB.user_id.in_(missing_user_ids)
+        ).cte("attendance")
+    else:
+        # Attendance first, while its users are still there to anti-join against
+        attendance = delete(AttendanceRecordDB).where(
+            AttendanceRecordDB.user_id.in_(missing_user_ids)
+        ).returning(AttendanceRecordDB.date).cte("attendance")
+        user_ids = None
+
+    per_date = db.execute(
+        select(attendance.c.date, func.count()).group_by(attendance.c.date)
+    ).all()
+
+    if not dry_run:
+        user_ids = sorted(uid for (uid,) in db.execute(
+            delete(UserInformationDB).where(missing).returning(UserInformationDB.user_id)
+        ))
+
+    return {
+        "user_ids": user_ids,
+        "attendance_logs": sum(count for _, count in per_date),
+        "attendance_dates": [d for d, _ in per_date]
+    }
@@ -0,0 +1,87 @@
+from datetime import date, time, timedelta
+from functools import lru_cache
+
+# ==================== DEVICE DATE/TIME WIRE FORMAT ====================
+# Devices send dates as DD/MM (no year) and times as HH:MM or HH:MM:SS.
+# The database stores real DATE/TIME values; these helpers convert both ways.
+
+
+def parse_wire_date(value, today=None):
+    """
+    Parse DD/MM, DD/MM/YYYY or YYYY-MM-DD (or DD-MM) into a date
+
+    DD/MM takes the current year, unless that would put the date more than a
+    day in the future (a December log synced in January), in which case the
+    previous year is used.
+    """
+    if isinstance(value, date):
+        return value
+
+    return _parse_wire_date(value.strip(), today or date.today())
+
+
+@lru_cache(maxsize=1024)
+def _parse_wire_date(value, today):
+    # DD-MM is accepted too, since a slash cannot appear in a URL path segment
+    parts = value.replace("-", "/").split("/")
+
+    if len(parts) == 3 and len(parts[0]) == 4:
+        return date(int(parts[0]), int(parts[1]), int(parts[2]))
+    if len(parts) == 3:
+        return date(int(parts[2]), int(parts[1]), int(parts[0]))
+    if len(parts) != 2:
+        raise ValueError(f"Invalid date '{value}', expected DD/MM")
+
+    day, month = int(parts[0]), int(parts[1])
+
+    try:
+        parsed = date(today.year, month, day)
+    except ValueError:
+        # 29/02 outside a leap year can only mean an earlier year
+        parsed = None
+
+    if parsed is None or parsed > today + timedelta(days=1):
+        parsed = date(today.year - 1, month, day)
+
+    return parsed
+
+
+@lru_cache(maxsize=4096)
+def parse_wire_time(value):
+    """Parse HH:MM or HH:MM:SS into a time"""
+    if isinstance(value, time):
+        return value
+
+    parts = value.strip().split(":")
+    if len(parts) not in (2, 3):
+        raise ValueError(f"Invalid time '{value}', expected HH:MM or HH:MM:SS")
+
+    return time(*(int(part) for part in parts))
+
+
+def parse_wire_range(start, end, today=None):
+    """
+    Parse a start/end pair; a DD/MM range that wraps the new year
+    (e.g. 20/12 - 10/01) starts in the previous year
+    """
+    # Query bounds may lie in the future, so DD/MM always means this year here
+    year_end = date((today or date.today()).year, 12, 31)
+    start_date = parse_wire_date(start, year_end)
+    end_date = parse_wire_date(end, year_end)
+
+    if start_date > end_date and len(start.replace("-", "/").split("/")) == 2:
+        start_date = start_date.replace(year=end_date.year - 1)
+
+    return start_date, end_date
+
+
+def format_wire_date(value):
+    """date -> DD/MM"""
+    return value.strftime("%d/%m") if value else None
+
+
+def format_wire_time(value):
+    """time -> HH:MM, or HH:MM:SS when seconds are set"""
+    if value is None:
+        return None
+    return value.strftime("%H:%M:%S" if value.second else "%H:%M")
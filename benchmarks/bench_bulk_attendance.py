@@ -0,0 +1,135 @@
+"""
+Benchmark: bulk attendance ingestion, per-row ORM loop vs set-based merge
+
+Runs against the Postgres in DATABASE_URL inside a throwaway schema, so the
+real tables are never touched:
+
+    python -m benchmarks.bench_bulk_attendance
+"""
+import random
+import time
+from datetime import datetime
+from sqlalchemy import create_engine, text, tuple_
+from sqlalchemy.orm import sessionmaker
+from app.core.config import settings
+from app.core.database import Base
+from app.models.attendance import AttendanceRecordDB
+from app.models.user import UserInformationDB
+from app.utils.attendance_ingest import AttendanceRow, ingest_attendance_rows
+from app.utils.wire_format import parse_wire_date, parse_wire_time
+
+SCHEMA = "bench_bulk_attendance"
+SIZES = [1_000, 10_000, 100_000]
+USERS = 5_000
+
+
+def legacy_bulk_attendance(db, logs):
+    """The pre-COPY log_bulk_attendance loop, kept here as the baseline"""
+    all_users = db.query(UserInformationDB).all()
+    user_slots_map = {user.user_id: user.slot_id for user in all_users}
+
+    user_date_pairs = {(log.user_id, parse_wire_date(log.date)) for log in logs}
+    existing_records = db.query(AttendanceRecordDB).filter(
+        tuple_(AttendanceRecordDB.user_id, AttendanceRecordDB.date).in_(user_date_pairs)
+    ).all()
+    record_map = {(r.user_id, r.date): r for r in existing_records}
+
+    created = updated = skipped = fixed = 0
+
+    for log in logs:
+        key = (log.user_id, parse_wire_date(log.date))
+        slot_ids = log.slot_id
+
+        if not slot_ids:
+            if log.user_id in user_slots_map:
+                slot_ids = user_slots_map[log.user_id]
+                fixed += 1
+            else:
+                skipped += 1
+                continue
+
+        if key in record_map:
+            record = record_map[key]
+            record.checked_out_time = parse_wire_time(log.time)
+            record.updated_at = datetime.now()
+            updated += 1
+        else:
+            new_record = AttendanceRecordDB(
+                name=log.name,
+                user_id=log.user_id,
+                slot_id=slot_ids,
+                date=key[1],
+                checked_in_time=parse_wire_time(log.time),
+                checked_out_time=None,
+                is_present=True
+            )
+            db.add(new_record)
+            record_map[key] = new_record
+            created += 1
+
+    db.commit()
+    return {"created": created, "updated": updated, "fixed": fixed, "skipped": skipped}
+
+
+def set_based_bulk_attendance(db, logs):
+    counters = ingest_attendance_rows(db, logs)
+    db.commit()
+    return counters
+
+
+def make_logs(count):
+    """Two scans (in/out) per user per day, every tenth log without slot_ids"""
+    logs = []
+    day = 1
+    while len(logs) < count:
+        for user_id in range(1, USERS + 1):
+            for time_of_day in ("09:00", "17:30"):
+                slots = None if random.random() < 0.1 else [user_id * 4 + i for i in range(4)]
+                logs.append(AttendanceRow(f"User {user_id}", user_id, slots, f"{day:02d}/01", time_of_day))
+        day += 1
+    return logs[:count]
+
+
+def reset(engine):
+    with engine.begin() as conn:
+        conn.execute(text(f"DROP SCHEMA IF EXISTS {SCHEMA} CASCADE"))
+        conn.execute(text(f"CREATE SCHEMA {SCHEMA}"))
+        Base.metadata.create_all(bind=conn)
+        # attendance_records is partitioned; one catch-all partition is enough here
+        conn.execute(text("CREATE TABLE attendance_records_default PARTITION OF attendance_records DEFAULT"))
+        conn.execute(text(
+            "INSERT INTO user_information (name, user_id, slot_id, date, time, created_at) "
+            "SELECT 'User ' || g, g, ARRAY[g * 4, g * 4 + 1, g * 4 + 2, g * 4 + 3], '01/01', '09:00', now() "
+            "FROM generate_series(1, :users) g"
+        ), {"users": USERS})
+
+
+def main():
+    engine = create_engine(
+        settings.DATABASE_URL,
+        connect_args={"options": f"-csearch_path={SCHEMA}"}
+    )
+    Session = sessionmaker(bind=engine, autoflush=False)
+
+    print(f"{'logs':>8} {'loop (s)':>10} {'set-based (s)':>14} {'speedup':>8}")
+    for size in SIZES:
+        logs = make_logs(size)
+        timings = []
+
+        for ingest in (legacy_bulk_attendance, set_based_bulk_attendance):
+            reset(engine)
+            db = Session()
+            start = time.perf_counter()
+            counters = ingest(db, logs)
+            timings.append(time.perf_counter() - start)
+            db.close()
+            print(f"  {ingest.__name__}: {counters}")
+
+        print(f"{size:>8} {timings[0]:>10.3f} {timings[1]:>14.3f} {timings[0] / timings[1]:>7.1f}x")
+
+    with engine.begin() as conn:
+        conn.execute(text(f"DROP SCHEMA IF EXISTS {SCHEMA} CASCADE"))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,92 @@
+"""
+Benchmark: device heartbeats per second, row update per heartbeat vs buffered
+
+Runs against the Postgres in DATABASE_URL inside a throwaway schema, so the
+real tables are never touched:
+
+    python -m benchmarks.bench_heartbeats
+"""
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from sqlalchemy import create_engine, text
+from sqlalchemy.orm import sessionmaker
+from app.core.config import settings
+from app.core.database import Base
+from app.models.device import DeviceStatusDB
+from app.utils.heartbeat_buffer import HeartbeatBuffer
+
+SCHEMA = "bench_heartbeats"
+DEVICES = 1_000
+HEARTBEATS = 20_000
+CLIENTS = 8  # concurrent request threads, like a threadpool of sync endpoints
+
+
+def legacy_heartbeat(Session, device_id):
+    """The pre-buffer update_device_status body, kept here as the baseline"""
+    db = Session()
+    try:
+        current_time = datetime.now()
+        device = db.query(DeviceStatusDB).filter_by(device_id=device_id).first()
+
+        if device:
+            device.last_seen = current_time
+            device.status = "Online"
+            device.updated_at = current_time
+        else:
+            device = DeviceStatusDB(device_id=device_id, status="Online", last_seen=current_time)
+            db.add(device)
+
+        db.commit()
+        db.refresh(device)
+    finally:
+        db.close()
+
+
+def reset(engine):
+    with engine.begin() as conn:
+        conn.execute(text(f"DROP SCHEMA IF EXISTS {SCHEMA} CASCADE"))
+        conn.execute(text(f"CREATE SCHEMA {SCHEMA}"))
+        Base.metadata.create_all(bind=conn, tables=[DeviceStatusDB.__table__])
+
+
+def run(send):
+    device_ids = [f"ESP32_{i % DEVICES:05d}" for i in range(HEARTBEATS)]
+    start = time.perf_counter()
+    with ThreadPoolExecutor(CLIENTS) as pool:
+        list(pool.map(send, device_ids))
+    return time.perf_counter() - start
+
+
+def main():
+    engine = create_engine(
+        settings.DATABASE_URL,
+        pool_size=CLIENTS,
+        connect_args={"options": f"-csearch_path={SCHEMA}"}
+    )
+    Session = sessionmaker(bind=engine, autoflush=False)
+
+    reset(engine)
+    legacy = run(lambda device_id: legacy_heartbeat(Session, device_id))
+
+    reset(engine)
+    buffer = HeartbeatBuffer(Session, flush_interval=settings.HEARTBEAT_FLUSH_INTERVAL_SECONDS)
+    buffered = run(lambda device_id: buffer.record(device_id, datetime.now()))
+    # Include the flush that writes them out
+    start = time.perf_counter()
+    buffer.close()
+    buffered += time.perf_counter() - start
+
+    with engine.connect() as conn:
+        flushed = conn.execute(text("SELECT count(*) FROM device_status")).scalar()
+
+    print(f"{HEARTBEATS} heartbeats from {DEVICES} devices, {CLIENTS} clients")
+    print(f"  row update per heartbeat: {HEARTBEATS / legacy:>10.0f} heartbeats/s")
+    print(f"  buffered + batch flush:   {HEARTBEATS / buffered:>10.0f} heartbeats/s ({flushed} rows flushed)")
+
+    with engine.begin() as conn:
+        conn.execute(text(f"DROP SCHEMA IF EXISTS {SCHEMA} CASCADE"))
+
+
+if __name__ == "__main__":
+    main()
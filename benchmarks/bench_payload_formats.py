@@ -0,0 +1,62 @@
+"""
+Benchmark: device upload encodings, bytes on the wire and server parse time
+
+Compares the row-per-object JSON body against columnar JSON and columnar
+MessagePack, decoded the way the bulk endpoints decode them. No database:
+
+    python -m benchmarks.bench_payload_formats
+"""
+import gzip
+import json
+import time
+import msgpack
+from app.utils.payload_codecs import COLUMNAR_JSON, decode_attendance_payload
+
+SIZES = [1_000, 10_000, 50_000]
+REPEATS = 5
+
+
+def make_logs(count):
+    return [
+        {
+            "name": f"User {i % 500}",
+            "id": i % 500,
+            "slot_id": [(i % 500) * 4 + k for k in range(4)],
+            "date": f"{1 + i // 1000 % 28:02d}/03",
+            "time": "09:00" if i % 2 else "17:30",
+        }
+        for i in range(count)
+    ]
+
+
+def encodings(logs):
+    columns = {field: [log[field] for log in logs] for field in ("name", "id", "slot_id", "date", "time")}
+    return [
+        ("json rows", "application/json", json.dumps({"logs": logs}).encode()),
+        ("json columnar", COLUMNAR_JSON, json.dumps(columns).encode()),
+        ("msgpack columnar", "application/msgpack", msgpack.packb(columns)),
+    ]
+
+
+def parse_time(content_type, body):
+    best = None
+    for _ in range(REPEATS):
+        start = time.perf_counter()
+        decode_attendance_payload(content_type, body)
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best
+
+
+def main():
+    print(f"{'logs':>7} {'format':<18} {'bytes':>10} {'gzip bytes':>11} {'parse (ms)':>11}")
+    for size in SIZES:
+        for label, content_type, body in encodings(make_logs(size)):
+            print(
+                f"{size:>7} {label:<18} {len(body):>10} {len(gzip.compress(body)):>11} "
+                f"{parse_time(content_type, body) * 1000:>11.2f}"
+            )
+
+
+if __name__ == "__main__":
+    main()
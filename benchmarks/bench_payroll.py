@@ -0,0 +1,136 @@
+"""
+Benchmark: payroll for a 5,000-employee month
+
+Per-user query loop vs the grouped SQL aggregate, the NumPy pass over an
+archived month and the closed-month cache. Runs against the Postgres in
+DATABASE_URL inside a throwaway schema, so the real tables are never touched:
+
+    python -m benchmarks.bench_payroll
+"""
+import tempfile
+import time
+from datetime import date
+from sqlalchemy import create_engine, text
+from sqlalchemy.orm import sessionmaker
+from app.core.config import settings
+from app.core.database import Base
+from app.models.attendance import AttendanceRecordDB
+from app.models.user import UserInformationDB
+from app.utils.attendance_archive import AttendanceArchive
+from app.utils.payroll import PayrollMonthCache, archived_totals, compute_payroll, table_totals
+from app.utils.pg_listener import pg_listener
+
+SCHEMA = "bench_payroll"
+USERS = 5_000
+MONTH = date(2025, 3, 1)
+MONTH_END = date(2025, 3, 31)
+TODAY = date(2025, 6, 1)  # March is a closed month
+RUNS = 5
+
+
+def per_user_payroll(db, start, end):
+    """One query per employee, the spreadsheet-style baseline"""
+    payroll = []
+    for user in db.query(UserInformationDB).all():
+        records = db.query(AttendanceRecordDB).filter(
+            AttendanceRecordDB.user_id == user.user_id,
+            AttendanceRecordDB.date >= start,
+            AttendanceRecordDB.date <= end
+        ).all()
+        days = sum(1 for r in records if r.is_present)
+        hours = sum(
+            (r.checked_out_time.hour * 60 + r.checked_out_time.minute
+             - r.checked_in_time.hour * 60 - r.checked_in_time.minute) / 60
+            for r in records
+            if r.is_present and r.checked_in_time and r.checked_out_time and r.checked_out_time > r.checked_in_time
+        )
+        payroll.append((user.user_id, days, hours, days * float(user.salary or 0)))
+    return payroll
+
+
+def reset(engine):
+    """USERS employees, every weekday of MONTH, one in ten days absent"""
+    with engine.begin() as conn:
+        conn.execute(text(f"DROP SCHEMA IF EXISTS {SCHEMA} CASCADE"))
+        conn.execute(text(f"CREATE SCHEMA {SCHEMA}"))
+        Base.metadata.create_all(bind=conn)
+        conn.execute(text("CREATE TABLE attendance_records_default PARTITION OF attendance_records DEFAULT"))
+        conn.execute(text(
+            "INSERT INTO user_information (name, user_id, slot_id, date, time, salary, created_at) "
+            "SELECT 'User ' || g, g, ARRAY[g * 4], '01/01', '09:00', 50 + g % 100, now() "
+            "FROM generate_series(1, :users) g"
+        ), {"users": USERS})
+        conn.execute(text(
+            "INSERT INTO attendance_records (name, user_id, slot_id, date, checked_in_time, checked_out_time, "
+            "is_present, created_at, updated_at) "
+            "SELECT 'User ' || g, g, ARRAY[g * 4], d::date, "
+            "time '08:30' + (g % 60) * interval '1 minute', time '17:00' + (g % 90) * interval '1 minute', "
+            "true, now(), now() "
+            "FROM generate_series(1, :users) g, generate_series(CAST(:start AS DATE), CAST(:end AS DATE), interval '1 day') d "
+            "WHERE extract(isodow FROM d) < 6 AND (g + extract(day FROM d)::int) % 10 <> 0"
+        ), {"users": USERS, "start": MONTH, "end": MONTH_END})
+        conn.execute(text("ANALYZE"))
+
+
+def best_of(runs, fn):
+    timings = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        result = fn()
+        timings.append(time.perf_counter() - start)
+    return min(timings), result
+
+
+def main():
+    engine = create_engine(
+        settings.DATABASE_URL,
+        connect_args={"options": f"-csearch_path={SCHEMA}"}
+    )
+    Session = sessionmaker(bind=engine, autoflush=False)
+
+    reset(engine)
+    db = Session()
+    try:
+        rows = db.query(AttendanceRecordDB).count()
+        print(f"{USERS} employees, {rows} attendance records in {MONTH:%Y-%m}")
+
+        loop, _ = best_of(1, lambda: per_user_payroll(db, MONTH, MONTH_END))
+        print(f"  per-user query loop:        {loop:>8.3f} s")
+
+        # No archived months, so every run reads the throwaway schema only
+        empty_archive = AttendanceArchive(tempfile.mkdtemp())
+        aggregate, (users, summary) = best_of(
+            RUNS, lambda: compute_payroll(db, MONTH, MONTH_END, today=TODAY, cache=None, archive=empty_archive)
+        )
+        print(f"  grouped SQL aggregate:      {aggregate:>8.3f} s  "
+              f"({summary['users']} users, gross {summary['gross_pay']:.2f})")
+
+        archive = AttendanceArchive(tempfile.mkdtemp())
+        archive.write_month(MONTH, db.query(AttendanceRecordDB).order_by(
+            AttendanceRecordDB.date, AttendanceRecordDB.user_id
+        ).all())
+        month = archive.month(MONTH)
+        archived, totals = best_of(RUNS, lambda: archived_totals(month, MONTH, MONTH_END))
+        print(f"  NumPy pass over archive:    {archived:>8.3f} s  ({int(totals.days_present.sum())} days)")
+        assert totals.days_present.sum() == table_totals(db, MONTH, MONTH_END).days_present.sum()
+
+        cache = PayrollMonthCache(pg_listener)
+        pg_listener.start()
+        deadline = time.monotonic() + 5
+        while not pg_listener.connected and time.monotonic() < deadline:
+            time.sleep(0.05)
+        compute_payroll(db, MONTH, MONTH_END, today=TODAY, cache=cache, archive=empty_archive)
+        cached, _ = best_of(
+            RUNS, lambda: compute_payroll(db, MONTH, MONTH_END, today=TODAY, cache=cache, archive=empty_archive)
+        )
+        print(f"  closed month, cached:       {cached:>8.3f} s  ({cache.stats()})")
+    finally:
+        db.close()
+        pg_listener.close()
+
+    with engine.begin() as conn:
+        conn.execute(text(f"DROP SCHEMA IF EXISTS {SCHEMA} CASCADE"))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,122 @@
+"""
+Benchmark: user sync against a large roster, full-roster sets vs batch lookups
+
+Runs against the Postgres in DATABASE_URL inside a throwaway schema, so the
+real tables are never touched:
+
+    python -m benchmarks.bench_user_sync
+"""
+import time
+from sqlalchemy import create_engine, text
+from sqlalchemy.orm import sessionmaker
+from app.core.config import settings
+from app.core.database import Base
+from app.models.user import UserInformationDB
+from app.schemas.user import BulkUserData
+from app.utils.user_sync import sync_users
+
+SCHEMA = "bench_user_sync"
+ROSTER = 50_000
+SIZES = [10, 100, 1_000]
+SLOTS_PER_USER = 4
+
+
+def legacy_sync_users(db, users):
+    """The pre-batch-lookup sync_users, kept here as the baseline"""
+    existing_user_ids = set(uid[0] for uid in db.query(UserInformationDB.user_id).all())
+    all_existing_slots = set()
+    for (slots,) in db.query(UserInformationDB.slot_id).all():
+        all_existing_slots.update(slots or [])
+
+    added = skipped = errors = 0
+    new_users_to_add = []
+
+    for user_data in users:
+        if user_data.id in existing_user_ids:
+            skipped += 1
+            continue
+        if any(slot in all_existing_slots for slot in user_data.slot_id):
+            errors += 1
+            continue
+
+        new_users_to_add.append(UserInformationDB(
+            name=user_data.name,
+            user_id=user_data.id,
+            slot_id=user_data.slot_id,
+            date=user_data.date,
+            time=user_data.time,
+            salary=None
+        ))
+        existing_user_ids.add(user_data.id)
+        all_existing_slots.update(user_data.slot_id)
+
+    db.bulk_save_objects(new_users_to_add)
+    added = len(new_users_to_add)
+    return {"new_users_added": added, "existing_users_skipped": skipped, "errors": errors}
+
+
+def make_batch(size):
+    """Half existing users, a tenth with a taken slot, the rest new"""
+    users = []
+    for i in range(size):
+        if i % 2 == 0:
+            user_id = i + 1
+        else:
+            user_id = ROSTER + i + 1
+        slots = [user_id * SLOTS_PER_USER + s for s in range(SLOTS_PER_USER)]
+        if i % 10 == 1:
+            slots[0] = SLOTS_PER_USER  # owned by user 1
+        users.append(BulkUserData(name=f"User {user_id}", id=user_id, slot_id=slots, date="01/01", time="09:00"))
+    return users
+
+
+def reset(engine):
+    with engine.begin() as conn:
+        conn.execute(text(f"DROP SCHEMA IF EXISTS {SCHEMA} CASCADE"))
+        conn.execute(text(f"CREATE SCHEMA {SCHEMA}"))
+        Base.metadata.create_all(bind=conn)
+        conn.execute(text(
+            "INSERT INTO user_information (name, user_id, slot_id, date, time, created_at) "
+            "SELECT 'User ' || g, g, ARRAY(SELECT g * :per + s FROM generate_series(0, :per - 1) s), "
+            "'01/01', '09:00', now() FROM generate_series(1, :users) g"
+        ), {"users": ROSTER, "per": SLOTS_PER_USER})
+        # Migration 0008 keeps this in step via a trigger; here it is filled once
+        conn.execute(text(
+            "INSERT INTO fingerprint_slots (slot_id, user_id) "
+            "SELECT slot, user_id FROM user_information, unnest(slot_id) AS slot"
+        ))
+        conn.execute(text("ANALYZE"))
+
+
+def main():
+    engine = create_engine(
+        settings.DATABASE_URL,
+        connect_args={"options": f"-csearch_path={SCHEMA}"}
+    )
+    Session = sessionmaker(bind=engine, autoflush=False)
+
+    print(f"roster of {ROSTER} users")
+    print(f"{'batch':>8} {'full sets (s)':>14} {'batch lookups (s)':>18} {'speedup':>8}")
+    for size in SIZES:
+        users = make_batch(size)
+        timings = []
+
+        for sync in (legacy_sync_users, sync_users):
+            reset(engine)
+            db = Session()
+            start = time.perf_counter()
+            counters = sync(db, users)
+            db.commit()
+            timings.append(time.perf_counter() - start)
+            db.close()
+            print(f"  {sync.__name__}: added={counters['new_users_added']} "
+                  f"skipped={counters['existing_users_skipped']} errors={counters['errors']}")
+
+        print(f"{size:>8} {timings[0]:>14.3f} {timings[1]:>18.3f} {timings[0] / timings[1]:>7.1f}x")
+
+    with engine.begin() as conn:
+        conn.execute(text(f"DROP SCHEMA IF EXISTS {SCHEMA} CASCADE"))
+
+
+if __name__ == "__main__":
+    main()